@@ -0,0 +1,105 @@
+"""
+Benchmark of forked workers serving the agent tools from a `KnowledgeBase` or a `FrozenKnowledgeBase`.
+
+Each worker calls every tool of `tools.kb_query` on a sample of entities, as the agents do, and reports the private
+memory of its process (Linux only), i.e. the pages it copied from the parent or allocated, the pages shared with
+the parent being excluded. The time of each tool call is measured in the parent.
+
+Run from the repository root with `PYTHONPATH=src:benchmarks python benchmarks/bench_frozen_kb.py`.
+"""
+import argparse
+import multiprocessing
+import random
+import tempfile
+from pathlib import Path
+
+from bench_kb_loading import build_synthetic_kb, time_it
+from knowledge_base.models.frozen_knowledge_base import FrozenKnowledgeBase
+from tools.kb_query import find_connection, get_character_infos, get_entities_by_names, get_neighborhood, \
+    get_relationships_for, get_top_relationships, search_knowledge
+
+_kb = None  # Set in the parent before forking, as a worker would find it after a pre-fork load
+
+
+def _private_memory() -> float:
+    """Private memory of the process, in MiB."""
+    with open("/proc/self/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    return sum(int(fields[field].split()[0]) for field in ("Private_Clean", "Private_Dirty")) / 2 ** 10
+
+
+def _tool_calls(kb, name: str, other_name: str):
+    """The calls of the tools made by an agent asking about an entity."""
+    return {
+        "get_character_infos": lambda: get_character_infos(kb=kb, character_name=name),
+        "get_top_relationships": lambda: get_top_relationships(kb=kb, character_name=name),
+        "search_knowledge": lambda: search_knowledge(kb=kb, query=f"{name} linked to others"),
+        "get_entities_by_names": lambda: get_entities_by_names(kb=kb, entity_names=[name, other_name, "Nobody"]),
+        "get_relationships_for": lambda: get_relationships_for(kb=kb, entity_names=[name, other_name]),
+        "get_neighborhood": lambda: get_neighborhood(kb=kb, entity_name=name, hops=1),
+        "find_connection": lambda: find_connection(kb=kb, entity_name=name, other_entity_name=other_name),
+    }
+
+
+def _query_all(name_pairs) -> float:
+    before = _private_memory()
+    for name, other_name in name_pairs:
+        for call in _tool_calls(_kb, name, other_name).values():
+            call()
+    return _private_memory() - before
+
+
+def _worker_memory(kb, name_pairs, n_workers: int) -> float:
+    global _kb
+    _kb = kb
+    with multiprocessing.get_context("fork").Pool(n_workers) as pool:
+        growths = pool.map(_query_all, [name_pairs] * n_workers)
+    return max(growths)
+
+
+def _tool_timings(kb, name_pairs, repeat: int) -> dict:
+    """Mean time of each tool call over the sample, in ms, the best of `repeat` runs."""
+    timings = {}
+    for tool_name in _tool_calls(kb, *name_pairs[0]):
+        calls = [_tool_calls(kb, name, other_name)[tool_name] for name, other_name in name_pairs]
+        timings[tool_name] = time_it(lambda: [call() for call in calls], repeat) / len(calls) * 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entities", type=int, default=20_000)
+    parser.add_argument("--relationships", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sample", type=int, default=200, help="Number of entities asked about by each worker.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    kb = build_synthetic_kb(args.entities, args.relationships)
+    names = [entity.name for _, entity in kb.graph.nodes(data="entity")]
+    rng = random.Random(0)
+    name_pairs = [(rng.choice(names), rng.choice(names)) for _ in range(args.sample)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        frozen_path = Path(tmp_dir) / "kb.frozen"
+        write_time = time_it(lambda: FrozenKnowledgeBase.write(kb, frozen_path), 1)
+        open_time = time_it(lambda: FrozenKnowledgeBase.open(frozen_path), 3)
+        frozen_kb = FrozenKnowledgeBase.open(frozen_path)
+
+        print(f"\n{args.entities} entities, {args.relationships} relationships, {args.workers} forked workers "
+              f"asking about {args.sample} entities with every tool")
+        print(f"  Frozen file: {frozen_path.stat().st_size / 2 ** 20:.0f} MiB, "
+              f"written in {write_time:.2f}s, opened in {open_time * 1000:.2f}ms")
+        served_kbs = {"KnowledgeBase": kb, "FrozenKnowledgeBase": frozen_kb}
+        for name, served_kb in served_kbs.items():
+            growth = _worker_memory(served_kb, name_pairs, args.workers)
+            print(f"  {name:<24}private memory added per worker: {growth:.1f} MiB")
+        timings = {name: _tool_timings(served_kb, name_pairs, args.repeat) for name, served_kb in served_kbs.items()}
+        print(f"  {'Tool call (mean ms)':<24}{'KnowledgeBase':>16}{'FrozenKnowledgeBase':>22}")
+        for tool_name in timings["KnowledgeBase"]:
+            print(f"  {tool_name:<24}{timings['KnowledgeBase'][tool_name]:>16.3f}"
+                  f"{timings['FrozenKnowledgeBase'][tool_name]:>22.3f}")
+        frozen_kb.close()
+
+
+if __name__ == "__main__":
+    main()
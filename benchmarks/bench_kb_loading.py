@@ -0,0 +1,120 @@
+"""
+Benchmark of the `KnowledgeBase` snapshot loaders on a synthetic snapshot, in time and peak memory.
+
+Run from the repository root with `PYTHONPATH=src python benchmarks/bench_kb_loading.py`.
+"""
+import argparse
+import gc
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from knowledge_base.models.entities import Character, Place, Event
+from knowledge_base.models.knowledge_base import KnowledgeBase
+from knowledge_base.models.relationships import Relationship, RELATIONSHIP_TYPE_MISC
+
+
+def build_synthetic_kb(n_entities: int, n_relationships: int, seed: int = 0) -> KnowledgeBase:
+    rng = random.Random(seed)
+    entities = []
+    for i in range(n_entities):
+        description = f"Entity number {i} is linked to many others in the synthetic wiki. " * 5
+        match i % 3:
+            case 0:
+                entities.append(Character(
+                    name=f"Character {i}", description=description, aliases=[f"C{i}"], abilities=[],
+                    occupation=None, species="Human", physical_description={}, personality_traits=[],
+                ))
+            case 1:
+                entities.append(Place(name=f"Place {i}", description=description, location_type="Planet",
+                                      coordinates=None))
+            case _:
+                entities.append(Event(name=f"Event {i}", description=description, event_type=None))
+
+    relationships = [
+        Relationship(
+            source_entity_id=rng.choice(entities).id,
+            target_entity_id=rng.choice(entities).id,
+            relationship_type=RELATIONSHIP_TYPE_MISC,
+            description="One sentence mentioning the target of the link.",
+        )
+        for _ in range(n_relationships)
+    ]
+    kb = KnowledgeBase()
+    kb.add_entities(entities)
+    kb.add_relationships(relationships)
+    return kb
+
+
+def time_it(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func) -> float:
+    """Peak memory allocated while running `func`, in MiB."""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def retained_memory(func) -> float:
+    """Memory still allocated by `func` once it returned, held by its result, in MiB."""
+    tracemalloc.start()
+    result = func()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entities", type=int, default=5_000)
+    parser.add_argument("--relationships", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-peak-ratio", type=float, default=1.25,
+                        help="Fail if the peak memory of from_json_stream exceeds the memory of the loaded KB "
+                             "by more than this ratio.")
+    args = parser.parse_args()
+
+    kb = build_synthetic_kb(args.entities, args.relationships)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        kb.save_kb(Path(tmp_dir) / "kb.json", compress=True)
+        snapshot_path = Path(tmp_dir) / "kb.json.gz"
+
+        loaders = {
+            "from_json(trusted=False)": lambda: KnowledgeBase.from_json(snapshot_path),
+            "from_json(trusted=True)": lambda: KnowledgeBase.from_json(snapshot_path, trusted=True),
+            "from_json_stream(trusted=True)": lambda: KnowledgeBase.from_json_stream(snapshot_path, trusted=True),
+        }
+        timings = {name: time_it(loader, args.repeat) for name, loader in loaders.items()}
+        peaks = {name: peak_memory(loader) for name, loader in loaders.items()}
+        kb_size = retained_memory(lambda: build_synthetic_kb(args.entities, args.relationships))
+        loaded_kb_size = retained_memory(loaders["from_json_stream(trusted=True)"])
+
+    reference = timings["from_json(trusted=False)"]
+    print(f"\n{args.entities} entities, {args.relationships} relationships (best of {args.repeat})")
+    print(f"  Memory of the KB when built in place: {kb_size:.0f} MiB")
+    print(f"  Memory of the KB when loaded: {loaded_kb_size:.0f} MiB")
+    for name, timing in timings.items():
+        print(f"  {name:<32}{timing:.3f}s (x{reference / timing:.2f})  peak {peaks[name]:.0f} MiB")
+
+    # Regression check: streaming must not hold much more than the KB it loads
+    stream_peak_ratio = peaks["from_json_stream(trusted=True)"] / loaded_kb_size
+    if stream_peak_ratio > args.max_peak_ratio:
+        raise SystemExit(f"from_json_stream peaked at {stream_peak_ratio:.2f}x the loaded KB, "
+                         f"over the allowed {args.max_peak_ratio:.2f}x.")
+    print(f"  from_json_stream peak: {stream_peak_ratio:.2f}x the loaded KB (max {args.max_peak_ratio:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,8 @@ from agents.personalized_agent import PersonalizedAgent
 from agents.prompt_templates.emotional_chatting import EmotionalChattingParams
 from knowledge_base.models.entities import Character
 from knowledge_base.models.knowledge_base import KnowledgeBase
-from tools.kb_query import get_character_infos, get_all_relationships
+from tools.kb_query import get_character_infos, get_top_relationships, search_knowledge, get_entities_by_names, \
+    get_entities_by_ids, get_relationships_for, get_neighborhood, find_connection
 
 # Load the .env file
 load_dotenv()
@@ -34,12 +35,15 @@ empty_character_kwargs = dict(
     personality_traits=[]
 )
 
+# Template of the agents of the chat sessions, see AgentSessionPool
 chatting_agent = PersonalizedAgent(
     model=llm,
     # add your tools here (don't remove FinalAnswerTool())
     additional_authorized_imports=[],
-    tools=[FinalAnswerTool(), get_character_infos, get_all_relationships],
+    tools=[FinalAnswerTool(), get_character_infos, get_top_relationships, search_knowledge, get_entities_by_names,
+           get_entities_by_ids, get_relationships_for, get_neighborhood, find_connection],
     max_steps=4,
+    stream_outputs=True,  # The answer is shown as it is generated, see stream_agent_answer
     grammar=None,
     planning_interval=5,
     name="Character_Chat_Agent",
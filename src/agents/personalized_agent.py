@@ -1,5 +1,9 @@
+import copy
+
 from smolagents import *
 
+from tools.compact_text import contains_kb_models, to_compact_text
+
 
 class PersonalizedAgent(MultiStepAgent):
     def __init__(
@@ -128,6 +132,29 @@ class PersonalizedAgent(MultiStepAgent):
         return system_prompt
 
 
+    def spawn(self, state: dict[str, Any] | None = None) -> "PersonalizedAgent":
+        """
+        Cheap copy of the agent for another conversation, e.g. another chat session.
+
+        The model, tools, prompt templates and logger are shared with this agent, used as a template,
+        while the state, memory, monitor and Python executor are the copy's own.
+
+        Args:
+            state: Variables of the copy, added to a copy of the state of this agent.
+        """
+        agent = copy.copy(self)
+        agent.state = {**self.state, **(state or {})}
+        agent.task = None
+        agent.step_number = 0
+        agent.interrupt_switch = False
+        agent.memory = AgentMemory(self.system_prompt)
+        agent.monitor = Monitor(self.model, self.logger)
+        agent.step_callbacks = [
+            callback for callback in self.step_callbacks if callback != self.monitor.update_metrics
+        ] + [agent.monitor.update_metrics]
+        agent.python_executor = agent.create_python_executor()
+        return agent
+
     def _step_stream(self, memory_step: ActionStep) -> Generator[ChatMessageStreamDelta | FinalOutput]:
         """
         Perform one step in the ReAct framework: the agent thinks, acts, and observes the result.
@@ -246,7 +273,10 @@ class PersonalizedAgent(MultiStepAgent):
                 )
             raise AgentExecutionError(error_msg, self.logger)
 
-        truncated_output = truncate_content(str(output))
+        # Entities and relationships are written without their IDs nor empty fields, see to_compact_text,
+        # other outputs as they are, so the agent sees the exact values its code computed
+        compact_output = to_compact_text(output, max_length=None) if contains_kb_models(output) else str(output)
+        truncated_output = truncate_content(compact_output)
         observation += "Last output from code snippet:\n" + truncated_output
         memory_step.observations = observation
 
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from agents.personalized_agent import PersonalizedAgent
+
+
+class AgentSessionPool:
+    """
+    Agents of the chat sessions, keyed by session ID, so concurrent users never share a state nor a memory.
+
+    The agent of a session is spawned from `template` when the session first chats, sharing its model client,
+    tools and prompt templates, see `PersonalizedAgent.spawn`. A session runs one request at a time,
+    while different sessions run in parallel.
+    Sessions idle for more than `max_idle_time` seconds are evicted, and so are the least recently used idle
+    sessions beyond `max_sessions`. An evicted session gets a fresh agent at its next request.
+
+    Example:
+        >>> agent_pool = AgentSessionPool(chatting_agent, max_idle_time=30 * 60)
+        >>> with agent_pool.session(request.session_hash) as agent:
+        ...     answer = agent.run(message, reset=False)
+    """
+
+    def __init__(
+            self,
+            template: PersonalizedAgent,
+            max_idle_time: Optional[float] = 30 * 60,
+            max_sessions: Optional[int] = 100,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            template: Agent from which the agents of the sessions are spawned, its state being their initial state.
+            max_idle_time: Time after which an idle session is evicted, in seconds, never if None.
+            max_sessions: Maximum number of sessions kept, unlimited if None. Sessions running a request are kept
+                even beyond this number.
+            clock: Current time, in seconds.
+        """
+        self.template = template
+        self.max_idle_time = max_idle_time
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._agents: OrderedDict[str, PersonalizedAgent] = OrderedDict()  # Least recently used first
+        self._last_used: Dict[str, float] = {}
+        self._running: Counter[str] = Counter()  # Requests running or waiting, per session
+        self._session_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()  # Guards the dictionaries above, not held while a session runs
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._agents
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    @contextmanager
+    def session(
+            self,
+            session_id: str,
+            state: Union[Dict[str, Any], Callable[[], Dict[str, Any]], None] = None,
+    ) -> Iterator[PersonalizedAgent]:
+        """
+        Holds the agent of a session, spawned from the template if the session is new or was evicted.
+        Other requests of the same session wait until it is released.
+
+        Args:
+            session_id: ID of the session, e.g. the session hash of a Gradio request.
+            state: Variables added to the state of the agent of a new session, on top of the state of the template,
+                or a function returning them, only called for a new session. Give the choices of the user,
+                e.g. their character, so a session evicted while idle comes back as they left it.
+        """
+        with self._lock:
+            self._evict(self._clock(), room=0 if session_id in self._agents else 1)
+            agent = self._agents.get(session_id)
+            if agent is None:
+                agent = self._agents[session_id] = self.template.spawn(state() if callable(state) else state)
+                self._session_locks[session_id] = threading.Lock()
+            self._agents.move_to_end(session_id)
+            self._running[session_id] += 1
+            session_lock = self._session_locks[session_id]
+        try:
+            with session_lock:
+                yield agent
+        finally:
+            with self._lock:
+                self._running[session_id] -= 1
+                if not self._running[session_id]:
+                    del self._running[session_id]
+                self._last_used[session_id] = self._clock()
+
+    def evict_idle(self) -> List[str]:
+        """Evicts the sessions idle for too long, or beyond the maximum number of sessions, and returns their IDs."""
+        with self._lock:
+            return self._evict(self._clock())
+
+    def close(self, session_id: str) -> None:
+        """Evicts a session, e.g. when its browser tab is closed, unless it is running a request."""
+        with self._lock:
+            if session_id in self._agents and not self._running[session_id]:
+                self._remove(session_id)
+
+    def _evict(self, now: float, room: int = 0) -> List[str]:
+        """Evicts idle sessions, leaving `room` for new sessions within the maximum number of sessions."""
+        idle_ids = [session_id for session_id in self._agents if not self._running[session_id]]
+        evicted = []
+        if self.max_idle_time is not None:
+            evicted = [session_id for session_id in idle_ids
+                       if now - self._last_used.get(session_id, now) > self.max_idle_time]
+        if self.max_sessions is not None:
+            over_limit = len(self._agents) - len(evicted) + room - self.max_sessions
+            evicted += [session_id for session_id in idle_ids if session_id not in evicted][:max(over_limit, 0)]
+        for session_id in evicted:
+            self._remove(session_id)
+        return evicted
+
+    def _remove(self, session_id: str) -> None:
+        del self._agents[session_id]
+        del self._session_locks[session_id]
+        self._last_used.pop(session_id, None)
+        self._running.pop(session_id, None)
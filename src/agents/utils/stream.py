@@ -1,32 +1,172 @@
+from typing import Iterable, Iterator, NamedTuple
+
+from smolagents import ActionStep, ChatMessageStreamDelta, FinalAnswerStep, PlanningStep
+
+# The chatting agent writes its answer as `answer = "..."` before returning it, see emotional_chatting.py
+ANSWER_KEYWORD = 'answer = "'
+ANSWER_END_KEYWORD = '"\n'
+
+# Kinds of the events of `stream_agent_answer`
+ANSWER_CHUNK = "answer_chunk"
+STEP_DONE = "step_done"
+FINAL_ANSWER = "final_answer"
+
+
+class AnswerStreamEvent(NamedTuple):
+    """Event of the stream of the answer of an agent, see `stream_agent_answer`."""
+    kind: str
+    text: str
+
+
+# States of a `KeywordStreamFilter`
+_BEFORE_KEYWORD = "before_keyword"
+_IN_OUTPUT = "in_output"
+_AFTER_END_KEYWORD = "after_end_keyword"
+
+
+class KeywordStreamFilter:
+    """
+    Incremental extractor of the text between a keyword and an end keyword, from a stream of text chunks.
+
+    Each chunk is only scanned once, with what is kept of the previous ones: the end of the text that may be the
+    start of a keyword split across chunks, shorter than the keyword. So the filter takes a time linear in the
+    length of the stream, and a memory bounded by the length of the keywords.
+
+    Example:
+        >>> stream_filter = KeywordStreamFilter("Answer:", end_keyword="<end>")
+        >>> [stream_filter.feed(chunk) for chunk in ["Thought: hi. Ans", "wer: Hello", " there<e", "nd> bye"]]
+        ['', ' Hello', ' there', '']
+        >>> stream_filter.done
+        True
+
+    Call `flush` at the end of the stream, to get the end of the output held back while the end keyword is missing.
+    """
+
+    def __init__(self, keyword: str = "Answer:", end_keyword: str | None = None):
+        """
+        Args:
+            keyword: The keyword indicating the start of the output.
+            end_keyword: The keyword indicating the end of the output, the output lasting until the end of the stream
+                if None.
+        """
+        self.keyword = keyword
+        self.end_keyword = end_keyword or None
+        self._state = _BEFORE_KEYWORD
+        self._kept = ""  # End of the text fed, which may be the start of the keyword looked for
+
+    @property
+    def done(self) -> bool:
+        """Whether the end keyword was found, the rest of the stream being ignored."""
+        return self._state == _AFTER_END_KEYWORD
+
+    def feed(self, chunk: str) -> str:
+        """Scans the next chunk of the stream, and returns the part of the output it completes, possibly empty."""
+        if self._state == _AFTER_END_KEYWORD:
+            return ""
+        text = self._kept + chunk
+        if self._state == _BEFORE_KEYWORD:
+            keyword_index = text.find(self.keyword)
+            if keyword_index < 0:
+                self._kept = _keyword_start_at_end(text, self.keyword)
+                return ""
+            self._state = _IN_OUTPUT
+            text = text[keyword_index + len(self.keyword):]
+        if self.end_keyword is None:
+            self._kept = ""
+            return text
+        end_index = text.find(self.end_keyword)
+        if end_index >= 0:
+            self._state = _AFTER_END_KEYWORD
+            self._kept = ""
+            return text[:end_index]
+        self._kept = _keyword_start_at_end(text, self.end_keyword)
+        return text[:len(text) - len(self._kept)]
+
+    def flush(self) -> str:
+        """
+        Ends the stream, and returns the end of the output held back as the possible start of the end keyword,
+        e.g. when the stream is cut before its end keyword.
+        """
+        output = self._kept if self._state == _IN_OUTPUT else ""
+        self._kept = ""
+        return output
+
+
+def _keyword_start_at_end(text: str, keyword: str) -> str:
+    """The longest end of a text that is the start of a keyword, and not the whole keyword."""
+    for length in range(min(len(keyword) - 1, len(text)), 0, -1):
+        if text.endswith(keyword[:length]):
+            return text[-length:]
+    return ""
+
+
 def stream_agent_output(agent_output_stream, keyword = "Answer:", end_keyword:str | None = None):
     """
-    Buffers the agent output stream until "Answer:" is encountered,
-    then starts yielding the stream text.
+    Filters the agent output stream, yielding its text after "Answer:" is encountered,
+    until the end keyword if given, see `KeywordStreamFilter`.
 
     Parameters:
         agent_output_stream: An iterable stream of text from the AI agent.
         keyword: The keyword indicating the start of the agent's output.
         end_keyword: The keyword indicating the end of the agent's output.
     Yields:
-        str: Chunks of the agent's output stream after "Answer:" is encountered.
+        str: Chunks of the agent's output stream after "Answer:" is encountered, each part of the output once.
     """
-    buffer = ""
-
+    stream_filter = KeywordStreamFilter(keyword, end_keyword=end_keyword)
     for chunk in agent_output_stream:
-        buffer += chunk
-
-        # Check if the keyword is in the buffer
-        if keyword in buffer:
-            # Find the position of the keyword
-            keyword_index = buffer.index(keyword)
-
-            # Yield the part of the buffer after the keyword
-            output_after_keyword = buffer[keyword_index + len(keyword):]
-            if output_after_keyword:
-                yield output_after_keyword
-
-            # Keep the remaining part of the buffer that hasn't been yielded yet
-            buffer = buffer[keyword_index + len(keyword):]
-        else:
-            # If the keyword is not found, continue buffering
-            continue
+        output = stream_filter.feed(chunk)
+        if output:
+            yield output
+        if stream_filter.done:
+            return
+    output = stream_filter.flush()
+    if output:
+        yield output
+
+
+def stream_agent_answer(
+        agent_events: Iterable,
+        keyword: str = ANSWER_KEYWORD,
+        end_keyword: str | None = ANSWER_END_KEYWORD,
+) -> Iterator[AnswerStreamEvent]:
+    """
+    Streams the answer of an agent run with `stream=True` and streamed outputs, from the text the model generates.
+
+    The text of each step is filtered by `stream_agent_output`, its answer being yielded chunk by chunk as
+    ANSWER_CHUNK events. Every finished step is yielded as a STEP_DONE event, with its text: the chunks streamed
+    before it were a draft if the step did not end the run. The run ends with a FINAL_ANSWER event, whose text is
+    the answer returned by the agent, to show instead of the streamed chunks.
+
+    Example:
+        >>> for event in stream_agent_answer(agent.run("Who are you?", stream=True)):
+        ...     print(event.text if event.kind == ANSWER_CHUNK else "", end="")
+        I am Hari Seldon, the founder of psychohistory.
+    """
+    events = iter(agent_events)
+    step_end = []  # The event following the text of the current step
+
+    def step_text() -> Iterator[str]:
+        for event in events:
+            if not isinstance(event, ChatMessageStreamDelta):
+                step_end.append(event)
+                return
+            if event.content:
+                yield event.content
+
+    while True:
+        text = step_text()
+        for chunk in stream_agent_output(text, keyword=keyword, end_keyword=end_keyword):
+            yield AnswerStreamEvent(ANSWER_CHUNK, chunk)
+        for _ in text:  # The rest of the step, after the answer
+            pass
+        if not step_end:
+            return
+        event = step_end.pop()
+        if isinstance(event, FinalAnswerStep):
+            yield AnswerStreamEvent(FINAL_ANSWER, str(event.output))
+        elif isinstance(event, PlanningStep):
+            yield AnswerStreamEvent(STEP_DONE, event.plan)
+        elif isinstance(event, ActionStep):
+            step_parts = [event.model_output, event.observations, event.error and str(event.error)]
+            yield AnswerStreamEvent(STEP_DONE, "\n".join(part.strip() for part in step_parts if part))
+        # Other events are the outputs of the steps, also found in their ActionStep
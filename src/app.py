@@ -5,9 +5,13 @@ from PIL import Image
 from smolagents import MultiStepAgent
 
 from agents.character_chat import chatting_agent
+from agents.session_pool import AgentSessionPool
+from agents.utils.stream import ANSWER_CHUNK, STEP_DONE, stream_agent_answer
 from config import SRC_PATH
-from knowledge_base.models.knowledge_base import KnowledgeBase
-
+from knowledge_base.build_queue import BUILD_DONE, BUILD_FAILED, KnowledgeBaseBuildQueue
+from knowledge_base.models.entities import Character
+from knowledge_base.registry import KnowledgeBaseRegistry
+from knowledge_base.utils.period import Calendar, COMMON_ERAS
 from knowledge_base.utils.url import get_fandom_page_url
 from tools.scraping import get_figure_html_from_fandom_page, load_pil_image_from_url
 
@@ -21,92 +25,147 @@ def update_chat_known_data(agent: MultiStepAgent, dict_of_data: dict[str, Any])
     agent.state.update(dict_of_data)
 
 
-# Load the KnowledgeBase
+# Knowledge bases of the wikis, keyed by URL and loaded when first needed (snapshots written by save_kb)
 DEFAULT_FANDOM_URL = 'https://asimov.fandom.com/wiki/'
 DEFAULT_KB_PATH = SRC_PATH / 'static/kb_asimov.json.gz'
-kb = KnowledgeBase.from_json(DEFAULT_KB_PATH)
-update_chat_known_data(agent=chatting_agent, dict_of_data={"kb": kb})
+# Frozen mode: a knowledge base frozen by FrozenKnowledgeBase.write is mapped rather than loaded
+DEFAULT_FROZEN_KB_PATH = SRC_PATH / 'static/kb_asimov.frozen'
+# Dates of Asimov's works are in Galactic Era by default, the Foundation Era starting in 12,068 GE
+ASIMOV_CALENDAR = Calendar(eras={**COMMON_ERAS, "ge": (1, 0), "fe": (1, 12_067)}, default_era="ge")
+kb_registry = KnowledgeBaseRegistry(max_resident=3, memory_budget=4 * 2 ** 30)
+if DEFAULT_FROZEN_KB_PATH.exists():
+    kb_registry.register(DEFAULT_FANDOM_URL, DEFAULT_FROZEN_KB_PATH)
+    kb_registry.preload()  # Mapped here, before the server forks or spawns workers, which share its pages
+else:
+    kb_registry.register(DEFAULT_FANDOM_URL, DEFAULT_KB_PATH, calendar=ASIMOV_CALENDAR)
+# Knowledge bases of the other wikis are built in a worker process when their URL is first entered
+build_queue = KnowledgeBaseBuildQueue(SRC_PATH / 'static/built', registry=kb_registry)
+# Each browser session chats with its own agent, spawned from chatting_agent, playing the character it selected
+agent_pool = AgentSessionPool(chatting_agent, max_idle_time=30 * 60, max_sessions=100)
+MAX_CONCURRENT_CHATS = 16
+
+
+def select_knowledge_source(fandom_url: str) -> tuple[dict, gr.Timer]:
+    """
+    Lists the characters of the knowledge base of the given wiki in the character dropdown,
+    or starts building the knowledge base in the background, its progress being polled by the build timer.
+    """
+    if fandom_url not in kb_registry:
+        job = build_queue.submit(fandom_url)  # Registered at once if its snapshot was already built
+        if not job.finished:
+            gr.Info(f"Building the knowledge base of {job.url}, this may take a few minutes.")
+            return gr.update(), gr.Timer(active=True)
+    names = [character.name for character in kb_registry.get(fandom_url).get_entities_by_type(Character)]
+    return gr.update(choices=names, value=names[0] if names else None), gr.Timer(active=False)
+
+
+def refresh_build_status(fandom_url: str) -> tuple[str, dict, gr.Timer]:
+    """
+    Shows the progress of the build of the knowledge base of the given wiki,
+    and lists its characters in the character dropdown once it is built.
+    """
+    job = build_queue.status(fandom_url)
+    if job is None:
+        return "", gr.update(), gr.Timer(active=False)
+    if job.stage == BUILD_FAILED:
+        return f"Building the knowledge base of {job.url} failed: {job.error}", gr.update(), gr.Timer(active=False)
+    if job.stage == BUILD_DONE:
+        characters_update, timer_update = select_knowledge_source(fandom_url)
+        return "", characters_update, timer_update
+    return f"Building the knowledge base of {job.url}: {job.stage} ({job.progress:.0%})", gr.update(), gr.update()
+
+def character_state(character_name: str, base_url: str) -> dict[str, Any]:
+    """State of the agent playing the given character of the given wiki."""
+    kb = kb_registry.get(base_url)
+    return {
+        "character_name": character_name,
+        "character": kb.get_entity_by_name(character_name),
+        "character_context": kb.context_pack(character_name).to_text(),  # Saved in the snapshot
+        # Tools only see what the character can know, in the knowledge base resolved by the registry at each query
+        "kb": kb_registry.scoped_to(base_url, character_name),
+    }
 
-# Extract character names
-character_names = [
-    node_data.get('entity').name
-    for node, node_data in kb.graph.nodes(data=True)
-    if node_data.get('type') == 'Character'
-]
 
 # Placeholder for the agent's tool - This is a MOCK for the subtask's context.
 # The actual tool will be provided by the agent's environment.
-def get_character_image(character_name:str, base_url: str) -> Image:
+def get_character_image(character_name:str, base_url: str, request: gr.Request) -> Image:
+    """Makes the agent of the session play the given character, and returns the picture of the character."""
     page_url = get_fandom_page_url(character_name, base_url)
     image_url = get_figure_html_from_fandom_page(page_url)
-    update_chat_known_data(
-        agent=chatting_agent,
-        dict_of_data={
-            "character_name": character_name,
-            "character": kb.get_entity_by_name(character_name),
-        },
-    )
+    with agent_pool.session(request.session_hash) as agent:
+        update_chat_known_data(agent=agent, dict_of_data=character_state(character_name, base_url))
     return load_pil_image_from_url(image_url)
 
-# Determine default values
-if character_names:
-    default_character_name = character_names[0]
-    initial_pil_image_to_display = get_character_image(default_character_name, DEFAULT_FANDOM_URL)
-    update_chat_known_data(
-        agent=chatting_agent,
-        dict_of_data={
-            "character_name": default_character_name,
-            "character": kb.get_entity_by_name(default_character_name),
-        }
-    )
+def select_character(character_name: str, base_url: str, request: gr.Request) -> tuple[Image, tuple[str, str]]:
+    """
+    Makes the agent of the session play the given character, and returns its picture and the selection to keep
+    in the session state, to play the character again if the agent of the session is evicted.
+    """
+    return get_character_image(character_name, base_url, request), (character_name, base_url)
 
 
-def process_chat(message, current_chat_history):
+def process_chat(message, current_chat_history, show_thoughts, character_selection, request: gr.Request):
     """
-    Processes a chat message by appending it to the current chat history and generating a
-    simple echo response.
+    Processes a chat message by appending it to the current chat history and streaming the
+    response of the agent of the session as it is generated.
 
     Args:
     message (str): The user message to be processed.
     current_chat_history (list[dict[str, str]]): The existing chat history, where each entry
         contains a role ('user' or 'assistant') and its corresponding content.
+    show_thoughts (bool): Whether to show the intermediate steps of the agent, as collapsed messages.
+    character_selection (tuple[str, str] | None): The character chatted with and the URL of its wiki, played by
+        the agent of the session again if it was evicted while idle, None until a character is selected.
+    request (gr.Request): The request, whose session hash identifies the agent of the session.
 
-    Returns:
+    Yields:
     tuple[list[dict[str, str]], list[dict[str, str]], str]: A tuple containing the updated chat
         history for chatbot display, the updated history for state management, and an empty string
         for the chat input textbox.
     """
     new_chat_history = list(current_chat_history)
-
-    user_message_entry = {"role": "user", "content": message}
-    bot_response_content = chatting_agent.run(message, reset=False)
-
-    new_chat_history.append(user_message_entry)
-    new_chat_history.append({"role": "assistant", "content": str(bot_response_content)})
-
-    return new_chat_history, new_chat_history, ""
+    new_chat_history.append({"role": "user", "content": message})
+    answer_entry = {"role": "assistant", "content": ""}
+
+    with agent_pool.session(  # Other sessions are answered in parallel
+            request.session_hash,
+            state=lambda: character_state(*character_selection) if character_selection else None) as agent:
+        for event in stream_agent_answer(agent.run(message, stream=True, reset=False)):
+            if event.kind == ANSWER_CHUNK:
+                answer_entry["content"] += event.text
+            elif event.kind == STEP_DONE:
+                answer_entry["content"] = ""  # Streamed by a step that did not answer, a draft
+                if show_thoughts:
+                    new_chat_history.append({"role": "assistant", "content": event.text,
+                                             "metadata": {"title": "Thinking", "status": "done"}})
+            else:  # The final answer, rather than the streamed one, which may still be escaped as Python code
+                answer_entry["content"] = event.text
+            yield new_chat_history + [answer_entry], current_chat_history, ""
+
+    new_chat_history.append(answer_entry)
+    yield new_chat_history, new_chat_history, ""
+
+
+def close_session(request: gr.Request) -> None:
+    """Evicts the agent of a session whose browser tab was closed."""
+    agent_pool.close(request.session_hash)
 
 with gr.Blocks(title="Aware NPC Chat") as demo:
     gr.Markdown("# Aware NPC Chat")
     knowledge_source = gr.Text(DEFAULT_FANDOM_URL, label="Knowledge source (Fandom Wiki URL) :")
+    build_status = gr.Markdown()
+    build_timer = gr.Timer(2.0, active=False)  # Polls the knowledge base being built
 
     with gr.Row():
         with gr.Column():
-            # Add the character selection dropdown
-            character_dropdown = gr.Dropdown(
-                label="You are chatting with",
-                choices=character_names,
-                value=default_character_name
-            )
-            displayed_image_component = gr.Image(
-                type="pil",
-                label="Your interlocutor",
-                value=initial_pil_image_to_display
-            )
+            # Add the character selection dropdown, filled when the page is loaded, see demo.load
+            character_dropdown = gr.Dropdown(label="You are chatting with")
+            displayed_image_component = gr.Image(type="pil", label="Your interlocutor")
         with gr.Column(variant='panel'):
             chatbot_display = gr.Chatbot(label="Chat", type="messages")
 
     chat_history_state = gr.State([])
+    character_selection_state = gr.State(None)
 
     message_textbox = gr.Textbox(
         placeholder="Say something...",
@@ -114,19 +173,40 @@ with gr.Blocks(title="Aware NPC Chat") as demo:
     )
 
     submit_button = gr.Button("Send")
+    show_thoughts_checkbox = gr.Checkbox(False, label="Show the thoughts of your interlocutor")
 
     # Update functions
     submit_button.click(
         fn=process_chat,
-        inputs=[message_textbox, chat_history_state],
-        outputs=[chatbot_display, chat_history_state, message_textbox]
+        inputs=[message_textbox, chat_history_state, show_thoughts_checkbox, character_selection_state],
+        outputs=[chatbot_display, chat_history_state, message_textbox],
+        concurrency_limit=MAX_CONCURRENT_CHATS,
+    )
+
+    knowledge_source.submit(
+        fn=select_knowledge_source,
+        inputs=[knowledge_source],
+        outputs=[character_dropdown, build_timer]
+    )
+    build_timer.tick(
+        fn=refresh_build_status,
+        inputs=[knowledge_source],
+        outputs=[build_status, character_dropdown, build_timer]
     )
 
     # TODO : Add history/context cleaning
     character_dropdown.change(
-        fn=get_character_image,
+        fn=select_character,
         inputs=[character_dropdown, knowledge_source],
-        outputs=[displayed_image_component]
+        outputs=[displayed_image_component, character_selection_state]
+    )
+    # The characters of the default wiki, the first one being selected, which makes the session agent play it
+    demo.load(
+        fn=select_knowledge_source,
+        inputs=[knowledge_source],
+        outputs=[character_dropdown, build_timer]
     )
+    demo.unload(close_session)
 
-demo.launch()
+if __name__ == "__main__":  # Not when imported by the worker processes of the build queue
+    demo.launch()
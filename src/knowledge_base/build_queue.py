@@ -0,0 +1,227 @@
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Union
+
+from knowledge_base.index.vector import VectorIndex
+from knowledge_base.logger import logger
+from knowledge_base.parser.fandom import from_fandom
+from knowledge_base.registry import KnowledgeBaseRegistry
+from knowledge_base.utils.change_log import ChangeLog
+from knowledge_base.utils.url import get_fandom_base_url
+
+# Stages of a build before and after the stages of `from_fandom`, see `BUILD_STAGES`
+BUILD_QUEUED = "queued"
+BUILD_DONE = "done"
+BUILD_FAILED = "failed"
+
+
+class BuildJob(NamedTuple):
+    """State of the build of the knowledge base of a wiki, see `KnowledgeBaseBuildQueue`."""
+    url: str
+    stage: str
+    progress: float  # Share of the build done, from 0 to 1
+    snapshot_path: Path
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.stage in (BUILD_DONE, BUILD_FAILED)
+
+
+class KnowledgeBaseBuildQueue:
+    """
+    Builds the knowledge bases of Fandom wikis with `from_fandom`, in worker processes, and caches their snapshots
+    by URL in `snapshot_dir`.
+
+    `submit` returns at once, the progress of the build being read with `status`. Finished snapshots are registered
+    in `registry`, if given, and a wiki whose snapshot is cached is not built again unless asked to.
+    Each build runs in a fresh process, so the memory of the parsed dump is given back once it is done.
+
+    Example:
+        >>> build_queue = KnowledgeBaseBuildQueue("static/built", registry=registry)
+        >>> build_queue.submit("https://starwars.fandom.com/wiki/")  # Returns at once
+        >>> build_queue.status("https://starwars.fandom.com/").stage
+        'downloading'
+    """
+
+    def __init__(
+            self,
+            snapshot_dir: Union[str, Path],
+            registry: Optional[KnowledgeBaseRegistry] = None,
+            max_workers: int = 1,
+    ):
+        """
+        Args:
+            snapshot_dir: Directory of the snapshots of the built knowledge bases.
+            registry: Registry in which finished snapshots are registered.
+            max_workers: Maximum number of knowledge bases built at the same time.
+        """
+        self.snapshot_dir = Path(snapshot_dir)
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        self.registry = registry
+        self.max_workers = max_workers
+        self._context = multiprocessing.get_context("spawn")  # Workers do not inherit the knowledge bases in memory
+        self._progress_queue = self._context.Queue()  # (url, stage, progress) reported by the workers
+        self._executor = self._new_executor()
+        self._jobs: Dict[str, BuildJob] = {}
+        self._lock = threading.Lock()  # Guards the jobs
+        self._job_finished = threading.Condition(self._lock)
+        self._progress_listener = threading.Thread(target=self._listen_to_progress, daemon=True)
+        self._progress_listener.start()
+
+    def snapshot_path(self, fandom_url: str) -> Path:
+        """Path of the cached snapshot of a wiki, e.g. `kb_asimov_fandom_com.json.gz`."""
+        netloc = get_fandom_base_url(fandom_url).split("://", 1)[-1]
+        return self.snapshot_dir / f"kb_{re.sub(r'[^a-z0-9]+', '_', netloc)}.json.gz"
+
+    def submit(self, fandom_url: str, rebuild: bool = False) -> BuildJob:
+        """
+        Queues the build of the knowledge base of a wiki, unless it is being built or its snapshot is cached.
+
+        Args:
+            fandom_url: Any URL of the wiki, e.g. the URL of one of its pages.
+            rebuild: Whether to build the knowledge base again even if its snapshot is cached.
+
+        Returns:
+            BuildJob: The state of the build, already done if the snapshot is cached.
+        """
+        key = get_fandom_base_url(fandom_url)
+        snapshot_path = self.snapshot_path(key)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.finished:
+                return job
+            if not rebuild and snapshot_path.exists():
+                job = self._jobs[key] = BuildJob(key, BUILD_DONE, 1.0, snapshot_path)
+                if self.registry is not None and key not in self.registry:
+                    self.registry.register(key, snapshot_path)
+                return job
+            try:
+                future = self._submit_build(key, snapshot_path)
+            except BrokenProcessPool as e:
+                logger.error(f"Build of the knowledge base of {key} could not be queued: {e!r}")
+                job = self._jobs[key] = BuildJob(key, BUILD_FAILED, 0.0, snapshot_path, f"{type(e).__name__}: {e}")
+                self._job_finished.notify_all()
+                return job
+            job = self._jobs[key] = BuildJob(key, BUILD_QUEUED, 0.0, snapshot_path)
+        future.add_done_callback(lambda finished_future: self._on_build_finished(key, finished_future))
+        logger.info(f"Build of the knowledge base of {key} queued.")
+        return job
+
+    def status(self, fandom_url: str) -> Optional[BuildJob]:
+        """State of the last build of the knowledge base of a wiki, or None if it was never submitted."""
+        with self._lock:
+            return self._jobs.get(get_fandom_base_url(fandom_url))
+
+    def wait(self, fandom_url: str, timeout: Optional[float] = None) -> BuildJob:
+        """
+        Waits for the build of the knowledge base of a wiki to finish, for at most `timeout` seconds.
+
+        Raises:
+            KeyError: If the build of the knowledge base of the wiki was never submitted.
+        """
+        key = get_fandom_base_url(fandom_url)
+        with self._lock:
+            if key not in self._jobs:
+                raise KeyError(f"No build submitted for {key}.")
+            self._job_finished.wait_for(lambda: self._jobs[key].finished, timeout=timeout)
+            return self._jobs[key]
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops the workers, cancelling the queued builds, and waiting for the running ones if `wait`."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._progress_queue.put(None)
+        if wait:
+            self._progress_listener.join()
+
+    def __enter__(self) -> 'KnowledgeBaseBuildQueue':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(self._progress_queue,),
+            max_tasks_per_child=1,
+        )
+
+    def _submit_build(self, key: str, snapshot_path: Path) -> Future:
+        """
+        Submits a build to the workers, replacing them once if they are broken, e.g. after one was killed
+        for lack of memory, as a broken pool refuses all the builds submitted afterward.
+
+        Raises:
+            BrokenProcessPool: If the new workers are broken too.
+        """
+        try:
+            return self._executor.submit(_build_snapshot, key, snapshot_path)
+        except BrokenProcessPool:
+            logger.warning("Build workers broken, replacing them.")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+            return self._executor.submit(_build_snapshot, key, snapshot_path)
+
+    def _listen_to_progress(self) -> None:
+        while (message := self._progress_queue.get()) is not None:
+            key, stage, progress = message
+            with self._lock:
+                job = self._jobs.get(key)
+                if job is not None and not job.finished:
+                    self._jobs[key] = job._replace(stage=stage, progress=progress)
+
+    def _on_build_finished(self, key: str, future: Future) -> None:
+        try:
+            snapshot_path = future.result()
+        except Exception as e:
+            logger.error(f"Build of the knowledge base of {key} failed: {e!r}")
+            finished_job = dict(stage=BUILD_FAILED, error=f"{type(e).__name__}: {e}")
+        else:
+            if self.registry is not None:  # Before the build is seen as done, so its knowledge base can be loaded
+                self.registry.register(key, snapshot_path)
+            logger.info(f"Knowledge base of {key} built into {snapshot_path}.")
+            finished_job = dict(stage=BUILD_DONE, progress=1.0)
+        with self._lock:
+            self._jobs[key] = self._jobs[key]._replace(**finished_job)
+            self._job_finished.notify_all()
+
+
+_progress_queue: Optional[multiprocessing.Queue] = None  # Set in the worker processes by `_init_worker`
+
+
+def _init_worker(progress_queue: multiprocessing.Queue) -> None:
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def _build_snapshot(fandom_url: str, snapshot_path: Path) -> Path:
+    """Builds the knowledge base of a wiki, in a worker process, and writes its snapshot."""
+    last_reported = None
+
+    def report(stage: str, progress: float) -> None:
+        nonlocal last_reported
+        reported = (stage, round(progress, 2))  # Downloads report every chunk, the queue only gets percents
+        if reported != last_reported:
+            last_reported = reported
+            _progress_queue.put((fandom_url, *reported))
+
+    kb = from_fandom(fandom_url, progress=report if _progress_queue is not None else None)
+
+    # Written next to the cached snapshot and then moved over it, so a snapshot is never seen half written
+    name = snapshot_path.name.removesuffix(".gz").removesuffix(".json")
+    building_path = snapshot_path.with_name(f"{name}.building.json.gz")
+    building_path.unlink(missing_ok=True)
+    kb.save_kb(snapshot_path.with_name(f"{name}.building.json"), compress=True)  # Gzipped to `building_path`
+    os.replace(building_path, snapshot_path)
+    # Left by the previous build, if any
+    VectorIndex.path_for_snapshot(snapshot_path).unlink(missing_ok=True)
+    ChangeLog.for_snapshot(snapshot_path).clear()
+    return snapshot_path
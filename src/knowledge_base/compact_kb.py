@@ -0,0 +1,27 @@
+"""
+Folds the change log of a knowledge base snapshot into a new snapshot.
+
+Usage, from the `src` directory:
+    python -m knowledge_base.compact_kb static/kb_asimov.json.gz
+"""
+import argparse
+
+from knowledge_base.models.knowledge_base import KnowledgeBase
+from knowledge_base.utils.change_log import ChangeLog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("snapshot_path", help="Path to a snapshot written by KnowledgeBase.save_kb")
+    args = parser.parse_args()
+
+    change_log = ChangeLog.for_snapshot(args.snapshot_path)
+    if not change_log.exists():
+        print(f"No change log found at {change_log.path}, nothing to compact.")
+        return
+    print(f"Compacting {len(change_log)} changes from {change_log.path}")
+    KnowledgeBase.compact(args.snapshot_path)
+
+
+if __name__ == "__main__":
+    main()
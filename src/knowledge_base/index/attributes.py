@@ -0,0 +1,172 @@
+import bisect
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from knowledge_base.models.relationships import Relationship
+from knowledge_base.utils.period import Calendar, DEFAULT_CALENDAR, Interval, parse_period
+
+
+class IntervalIndex:
+    """
+    Index of intervals, e.g. the years of the `time_or_period` of entities, for overlap queries.
+
+    Intervals are kept sorted by start. The intervals overlapping a query start between the query start
+    minus the longest interval length and the query end, so a query only scans that slice.
+    """
+
+    def __init__(self):
+        self._intervals: List[Tuple[float, float, UUID]] = []  # (start, end, ID), sorted
+        self._interval_by_id: Dict[UUID, Interval] = {}
+        self._max_length = 0.0  # Never decreased by removals, it only has to be an upper bound
+
+    def __len__(self) -> int:
+        return len(self._interval_by_id)
+
+    def get(self, item_id: UUID) -> Optional[Interval]:
+        return self._interval_by_id.get(item_id)
+
+    def add(self, item_id: UUID, interval: Interval) -> None:
+        """Indexes the interval of an item. An interval already indexed for the item is replaced."""
+        self.remove(item_id)
+        start, end = interval
+        bisect.insort(self._intervals, (start, end, item_id))
+        self._interval_by_id[item_id] = interval
+        self._max_length = max(self._max_length, end - start)
+
+    def remove(self, item_id: UUID) -> None:
+        """Removes the interval of an item, if indexed."""
+        interval = self._interval_by_id.pop(item_id, None)
+        if interval is not None:
+            del self._intervals[bisect.bisect_left(self._intervals, (*interval, item_id))]
+
+    def overlapping(self, start: float, end: float) -> List[UUID]:
+        """IDs of the items whose interval overlaps [start, end], ordered by interval start."""
+        low = bisect.bisect_left(self._intervals, (start - self._max_length,))
+        high = bisect.bisect_right(self._intervals, (end, math.inf))
+        return [item_id for _, item_end, item_id in self._intervals[low:high] if item_end >= start]
+
+    @classmethod
+    def build(cls, intervals: Iterable[Tuple[UUID, Interval]]) -> 'IntervalIndex':
+        """Indexes the intervals of items with distinct IDs, sorting them once."""
+        index = cls()
+        index._interval_by_id = dict(intervals)
+        index._intervals = sorted((start, end, item_id) for item_id, (start, end) in index._interval_by_id.items())
+        index._max_length = max((end - start for start, end, _ in index._intervals), default=0.0)
+        return index
+
+
+class RelationshipIndex:
+    """
+    Secondary indexes of the relationships on their type, their depth and their `time_or_period`,
+    parsed in the calendar of the wiki.
+
+    A query starts from the smallest set of relationships matching one of its filters,
+    then checks the other filters on those relationships only.
+    """
+
+    def __init__(self, calendar: Calendar = DEFAULT_CALENDAR):
+        self.calendar = calendar
+        self._relationships: Dict[UUID, Relationship] = {}
+        self._ids_by_type: Dict[str, Dict[UUID, None]] = {}  # Dictionaries used as ordered sets
+        self._ids_by_depth: Dict[Optional[int], Dict[UUID, None]] = {}  # One bucket per depth value
+        self.periods = IntervalIndex()
+
+    def __len__(self) -> int:
+        return len(self._relationships)
+
+    def add(self, relationship: Relationship) -> None:
+        """Indexes a relationship. A relationship already indexed with the same ID is replaced."""
+        self.remove(relationship.id)
+        self._relationships[relationship.id] = relationship
+        self._ids_by_type.setdefault(relationship.relationship_type, {})[relationship.id] = None
+        self._ids_by_depth.setdefault(relationship.depth, {})[relationship.id] = None
+        interval = parse_period(relationship.time_or_period, self.calendar)
+        if interval is not None:
+            self.periods.add(relationship.id, interval)
+
+    def remove(self, relationship_id: UUID) -> None:
+        """Removes a relationship from the index, if indexed."""
+        relationship = self._relationships.pop(relationship_id, None)
+        if relationship is None:
+            return
+        for buckets, key in ((self._ids_by_type, relationship.relationship_type),
+                             (self._ids_by_depth, relationship.depth)):
+            bucket = buckets[key]
+            del bucket[relationship_id]
+            if not bucket:
+                del buckets[key]
+        self.periods.remove(relationship_id)
+
+    def find(
+            self,
+            relationship_type: Optional[str] = None,
+            min_depth: Optional[int] = None,
+            max_depth: Optional[int] = None,
+            period: Optional[Interval] = None,
+    ) -> List[Relationship]:
+        """
+        Returns the relationships matching all the given filters.
+
+        Args:
+            relationship_type: The type of the relationships, e.g. "FAMILY_OF".
+            min_depth: Minimum depth, relationships without depth are then excluded.
+            max_depth: Maximum depth, relationships without depth are then excluded.
+            period: Interval of years overlapping the parsed `time_or_period` of the relationships.
+        """
+        candidate_sets: List[Iterable[UUID]] = []
+        if relationship_type is not None:
+            candidate_sets.append(self._ids_by_type.get(relationship_type, {}))
+        if min_depth is not None or max_depth is not None:
+            low = min_depth if min_depth is not None else -math.inf
+            high = max_depth if max_depth is not None else math.inf
+            candidate_sets.append([
+                relationship_id
+                for depth, bucket in self._ids_by_depth.items()
+                if depth is not None and low <= depth <= high
+                for relationship_id in bucket
+            ])
+        if period is not None:
+            candidate_sets.append(self.periods.overlapping(*period))
+        if not candidate_sets:
+            return list(self._relationships.values())
+
+        smallest = min(candidate_sets, key=len)
+        results = []
+        for relationship_id in smallest:
+            relationship = self._relationships[relationship_id]
+            if relationship_type is not None and relationship.relationship_type != relationship_type:
+                continue
+            if min_depth is not None and (relationship.depth is None or relationship.depth < min_depth):
+                continue
+            if max_depth is not None and (relationship.depth is None or relationship.depth > max_depth):
+                continue
+            if period is not None:
+                interval = self.periods.get(relationship_id)
+                if interval is None or interval[1] < period[0] or interval[0] > period[1]:
+                    continue
+            results.append(relationship)
+        return results
+
+    @classmethod
+    def build(cls, relationships: Iterable[Relationship], calendar: Calendar = DEFAULT_CALENDAR) -> 'RelationshipIndex':
+        """Indexes relationships with distinct IDs, e.g. those of a loaded snapshot."""
+        index = cls(calendar)
+        ids_by_type, ids_by_depth = index._ids_by_type, index._ids_by_depth
+        intervals = []
+        for relationship in relationships:
+            index._relationships[relationship.id] = relationship
+            type_ids = ids_by_type.get(relationship.relationship_type)
+            if type_ids is None:
+                type_ids = ids_by_type[relationship.relationship_type] = {}
+            type_ids[relationship.id] = None
+            depth_ids = ids_by_depth.get(relationship.depth)
+            if depth_ids is None:
+                depth_ids = ids_by_depth[relationship.depth] = {}
+            depth_ids[relationship.id] = None
+            if relationship.time_or_period is not None:
+                interval = parse_period(relationship.time_or_period, calendar)
+                if interval is not None:
+                    intervals.append((relationship.id, interval))
+        index.periods = IntervalIndex.build(intervals)
+        return index
@@ -0,0 +1,159 @@
+from typing import Any, Dict, Iterable, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+
+from knowledge_base.models.relationships import Relationship
+
+# A relationship between entities linking to each other weighs this much more than a one-way link
+MUTUAL_LINK_FACTOR = 2.0
+
+
+class GraphScores:
+    """
+    Importance of the entities and relationships of a graph, for relevance ranking.
+
+    - `pagerank`: PageRank of the entities, following the relationships from source to target.
+    - `degree`: Number of relationships of the entities, in both directions, divided by the number of other entities.
+    - `relationship_weights`: Number of relationships linking the same two entities, in either direction,
+      multiplied by `MUTUAL_LINK_FACTOR` when both entities link to each other.
+
+    Scores are stored in arrays, in the order of the entity and relationship IDs given to `build`.
+    """
+
+    def __init__(self, entity_ids: Sequence[UUID], relationship_ids: Sequence[UUID],
+                 pagerank: np.ndarray, degree: np.ndarray, relationship_weights: np.ndarray):
+        self.entity_positions: Dict[UUID, int] = {entity_id: i for i, entity_id in enumerate(entity_ids)}
+        self.relationship_positions: Dict[UUID, int] = {
+            relationship_id: i for i, relationship_id in enumerate(relationship_ids)
+        }
+        self.pagerank = pagerank
+        self.degree = degree
+        self.relationship_weights = relationship_weights
+
+    def pagerank_of(self, entity_id: UUID) -> float:
+        """PageRank of an entity, 0 for an unknown entity."""
+        position = self.entity_positions.get(entity_id)
+        return float(self.pagerank[position]) if position is not None else 0.0
+
+    def degree_of(self, entity_id: UUID) -> float:
+        """Degree centrality of an entity, 0 for an unknown entity."""
+        position = self.entity_positions.get(entity_id)
+        return float(self.degree[position]) if position is not None else 0.0
+
+    def weight_of(self, relationship_id: UUID) -> float:
+        """Weight of a relationship, 0 for an unknown relationship."""
+        position = self.relationship_positions.get(relationship_id)
+        return float(self.relationship_weights[position]) if position is not None else 0.0
+
+    def importance(self, relationship: Relationship, entity_id: UUID) -> float:
+        """
+        Importance of a relationship for one of its entities: its weight times the PageRank of the other entity,
+        scaled so that an entity of average PageRank counts for 1.
+        """
+        other_id = (relationship.target_entity_id if relationship.source_entity_id == entity_id
+                    else relationship.source_entity_id)
+        return self.weight_of(relationship.id) * self.pagerank_of(other_id) * len(self.entity_positions)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-compatible dump of the scores, in the order of the IDs given to `build`, see `from_dict`."""
+        return dict(
+            pagerank=self.pagerank.tolist(),
+            degree=self.degree.tolist(),
+            relationship_weights=self.relationship_weights.tolist(),
+        )
+
+    @classmethod
+    def from_dict(cls, dumped_scores: Optional[Dict[str, Any]], entity_ids: Sequence[UUID],
+                  relationship_ids: Sequence[UUID]) -> Optional['GraphScores']:
+        """
+        Restores scores dumped by `to_dict`, given the IDs in the same order as when they were built.
+
+        Returns:
+            Optional[GraphScores]: The scores, or None if they are missing or do not match the given IDs.
+        """
+        try:
+            scores = cls(
+                entity_ids,
+                relationship_ids,
+                pagerank=np.asarray(dumped_scores["pagerank"], dtype=np.float64),
+                degree=np.asarray(dumped_scores["degree"], dtype=np.float64),
+                relationship_weights=np.asarray(dumped_scores["relationship_weights"], dtype=np.float64),
+            )
+        except (TypeError, KeyError, ValueError):
+            return None
+        if (len(scores.pagerank) != len(entity_ids) or len(scores.degree) != len(entity_ids)
+                or len(scores.relationship_weights) != len(relationship_ids)):
+            return None
+        return scores
+
+    @classmethod
+    def build(
+            cls,
+            entity_ids: Sequence[UUID],
+            relationships: Iterable[Relationship],
+            damping: float = 0.85,
+            tolerance: float = 1e-6,
+            max_iterations: int = 100,
+    ) -> 'GraphScores':
+        """
+        Computes the scores of a graph.
+        Relationships with an entity not in `entity_ids` are ignored, and get a weight of 0.
+
+        The graph is stored as arrays of source and target positions (a sparse adjacency matrix in coordinate
+        format), so each PageRank iteration is a handful of vectorized operations over the relationships.
+
+        Args:
+            entity_ids: IDs of the entities.
+            relationships: Relationships between the entities.
+            damping: Probability of following a relationship rather than jumping to a random entity.
+            tolerance: PageRank stops once the sum of the changes of the scores is below `tolerance` per entity.
+            max_iterations: Maximum number of PageRank iterations.
+        """
+        entity_ids = list(entity_ids)
+        positions = {entity_id: i for i, entity_id in enumerate(entity_ids)}
+        relationships = list(relationships)
+        n = len(entity_ids)
+        sources = np.fromiter((positions.get(r.source_entity_id, -1) for r in relationships),
+                              dtype=np.int64, count=len(relationships))
+        targets = np.fromiter((positions.get(r.target_entity_id, -1) for r in relationships),
+                              dtype=np.int64, count=len(relationships))
+        linked = (sources >= 0) & (targets >= 0)
+        sources, targets = sources[linked], targets[linked]
+
+        out_degree = np.bincount(sources, minlength=n).astype(np.float64)
+        in_degree = np.bincount(targets, minlength=n).astype(np.float64)
+        degree = (out_degree + in_degree) / max(n - 1, 1)
+        pagerank = _pagerank(sources, targets, out_degree, damping, tolerance, max_iterations)
+
+        # Relationships of a pair of entities share the code of the pair, whatever their direction
+        pair_codes = np.minimum(sources, targets) * n + np.maximum(sources, targets)
+        _, pair_of_relationships, relationships_per_pair = np.unique(
+            pair_codes, return_inverse=True, return_counts=True,
+        )
+        frequencies = relationships_per_pair[pair_of_relationships].astype(np.float64)
+        mutual = np.isin(targets * n + sources, sources * n + targets) & (sources != targets)
+        relationship_weights = np.zeros(len(relationships))
+        relationship_weights[linked] = frequencies * np.where(mutual, MUTUAL_LINK_FACTOR, 1.0)
+
+        return cls(entity_ids, [r.id for r in relationships], pagerank, degree, relationship_weights)
+
+
+def _pagerank(sources: np.ndarray, targets: np.ndarray, out_degree: np.ndarray,
+              damping: float, tolerance: float, max_iterations: int) -> np.ndarray:
+    """Power iteration of PageRank, the rank of entities without relationships being spread over all entities."""
+    n = len(out_degree)
+    if n == 0:
+        return np.zeros(0)
+    dangling = out_degree == 0
+    inverse_out_degree = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iterations):
+        flows = np.bincount(targets, weights=(rank * inverse_out_degree)[sources], minlength=n)
+        new_rank = damping * (flows + rank[dangling].sum() / n) + (1.0 - damping) / n
+        converged = np.abs(new_rank - rank).sum() < n * tolerance
+        rank = new_rank
+        if converged:
+            break
+    return rank
+
@@ -0,0 +1,127 @@
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+
+from knowledge_base.models.entities import Character, Entity, Event, Place
+from knowledge_base.models.relationships import Relationship
+from knowledge_base.utils.regex import split_sentences, strip_wikitext
+
+# Size of a context pack, small enough to be put in every prompt of the agent playing the character
+SUMMARY_LENGTH = 400
+MAX_RELATIONSHIPS = 8
+MAX_PLACES = 5
+MAX_EVENTS = 5
+_RELATIONSHIP_LENGTH = 160
+
+
+class ContextPack(NamedTuple):
+    """
+    Compact context of a character, for the prompt of the agent playing them: a summary of their description,
+    their aliases, and their most important relationships, places and events.
+    Packs are built from the knowledge base by `build`, and saved in its snapshot, see `KnowledgeBase.context_pack`.
+    """
+    name: str
+    summary: str
+    aliases: Tuple[str, ...] = ()
+    relationships: Tuple[str, ...] = ()  # Descriptions of the relationships, the most important first
+    places: Tuple[str, ...] = ()
+    events: Tuple[str, ...] = ()  # With their time or period, if known
+
+    def to_text(self) -> str:
+        """The pack as a few lines of text, the empty parts being left out."""
+        lines = [f"{self.name}, also known as {', '.join(self.aliases)}." if self.aliases else f"{self.name}."]
+        if self.summary:
+            lines.append(self.summary)
+        if self.places:
+            lines.append(f"Places: {', '.join(self.places)}.")
+        if self.events:
+            lines.append(f"Events: {', '.join(self.events)}.")
+        if self.relationships:
+            lines.append("Relationships:")
+            lines.extend(f"- {relationship}" for relationship in self.relationships)
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+    @classmethod
+    def from_dict(cls, dumped_pack: Mapping[str, Any]) -> 'ContextPack':
+        """
+        Restores a pack dumped by `to_dict`.
+
+        Raises:
+            TypeError: If the dumped pack is malformed.
+        """
+        return cls(**{
+            field: tuple(value) if isinstance(value, list) else value for field, value in dumped_pack.items()
+        })
+
+    @classmethod
+    def build(
+            cls,
+            entity: Entity,
+            ranked_relationships: Sequence[Relationship],
+            linked_entities: Mapping[UUID, Entity],
+    ) -> 'ContextPack':
+        """
+        Builds the pack of an entity.
+
+        Args:
+            entity: The entity, usually a character.
+            ranked_relationships: Relationships of the entity, in both directions, the most important first.
+            linked_entities: Entities at the other end of the relationships, by ID.
+        """
+        relationships: List[str] = []
+        places: Dict[str, None] = {}  # Ordered sets, as several relationships can lead to the same entity
+        events: Dict[str, None] = {}
+        for relationship in ranked_relationships:
+            other_id = (relationship.target_entity_id if relationship.source_entity_id == entity.id
+                        else relationship.source_entity_id)
+            other = linked_entities.get(other_id)
+            if other is None:
+                continue
+            if len(relationships) < MAX_RELATIONSHIPS:
+                relationships.append(_describe(relationship, entity, other))
+            if isinstance(other, Place) and len(places) < MAX_PLACES:
+                places[other.name] = None
+            elif isinstance(other, Event) and len(events) < MAX_EVENTS:
+                events[f"{other.name} ({other.time_or_period})" if other.time_or_period else other.name] = None
+        return cls(
+            name=entity.name,
+            summary=_first_sentences(strip_wikitext(entity.description or ""), SUMMARY_LENGTH),
+            aliases=tuple(entity.aliases) if isinstance(entity, Character) else (),
+            relationships=tuple(relationships),
+            places=tuple(places),
+            events=tuple(events),
+        )
+
+    @classmethod
+    def restore_all(cls, dumped_packs: Optional[Mapping[str, Any]],
+                    entity_ids: Sequence[UUID]) -> Dict[UUID, 'ContextPack']:
+        """Restores the packs dumped in a snapshot, keeping the ones of the given entities, none if malformed."""
+        known_ids = set(entity_ids)
+        try:
+            packs = {UUID(entity_id): cls.from_dict(dumped_pack) for entity_id, dumped_pack in dumped_packs.items()}
+        except (AttributeError, TypeError, ValueError):
+            return {}
+        return {entity_id: pack for entity_id, pack in packs.items() if entity_id in known_ids}
+
+
+def _describe(relationship: Relationship, entity: Entity, other: Entity) -> str:
+    description = _first_sentences(strip_wikitext(relationship.description or ""), _RELATIONSHIP_LENGTH)
+    if description:
+        return description
+    source, target = (entity, other) if relationship.source_entity_id == entity.id else (other, entity)
+    return f"{source.name} {relationship.relationship_type} {target.name}"
+
+
+def _first_sentences(text: str, max_length: int) -> str:
+    """The first sentences of a text within `max_length` characters, or the start of its first sentence, cut."""
+    summary = ""
+    for sentence in split_sentences(text):
+        candidate = f"{summary} {sentence}" if summary else sentence
+        if len(candidate) > max_length:
+            break
+        summary = candidate
+    if not summary and text:
+        summary = text[:max_length - 1] + "…"
+    return summary
@@ -0,0 +1,173 @@
+import heapq
+import math
+import re
+import sys
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+STOP_WORDS = frozenset("""
+a an and are as at be been but by for from had has have he her his in into is it its of on or she that the
+their them they this to was were which who will with
+""".split())
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Splits a text into lowercase word tokens, without stop words and single characters.
+    Wikitext markup (brackets, pipes, templates) is dropped along with the punctuation.
+    """
+    if not text:
+        return []
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+class DocumentRef(NamedTuple):
+    """Reference to an indexed entity, or relationship with its source and target entities."""
+    id: UUID
+    source_entity_id: Optional[UUID] = None
+    target_entity_id: Optional[UUID] = None
+
+    @property
+    def is_relationship(self) -> bool:
+        return self.source_entity_id is not None
+
+
+class FullTextIndex:
+    """
+    Inverted index over texts of the knowledge base, ranked with Okapi BM25.
+
+    Each document is an entity (name and description) or a relationship (description).
+    Postings map every term to the documents containing it with the term frequency, so a query
+    only visits the documents sharing at least one term with it. The terms of each document are kept too,
+    so removing a document only visits its own postings.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._refs: List[Optional[DocumentRef]] = []
+        self._lengths: List[int] = []
+        self._terms: List[Tuple[str, ...]] = []  # Distinct terms of each document, interned like the postings keys
+        self._doc_by_id: Dict[UUID, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_by_id)
+
+    def __contains__(self, document_id: UUID) -> bool:
+        return document_id in self._doc_by_id
+
+    def add(self, ref: DocumentRef, text: Optional[str]) -> None:
+        """Indexes a document. A document already indexed with the same ID is replaced."""
+        self.remove(ref.id)
+        tokens = tokenize(text)
+        term_frequencies = Counter(map(sys.intern, tokens))
+        doc = len(self._refs)
+        self._refs.append(ref)
+        self._lengths.append(len(tokens))
+        self._terms.append(tuple(term_frequencies))
+        self._doc_by_id[ref.id] = doc
+        self._total_length += len(tokens)
+        for term, frequency in term_frequencies.items():
+            self._postings.setdefault(term, {})[doc] = frequency
+
+    def remove(self, document_id: UUID) -> None:
+        """Removes a document from the index, if indexed, visiting the postings of its terms only."""
+        doc = self._doc_by_id.pop(document_id, None)
+        if doc is None:
+            return
+        for term in self._terms[doc]:
+            postings = self._postings[term]
+            del postings[doc]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths[doc]
+        self._refs[doc] = None
+        self._lengths[doc] = 0
+        self._terms[doc] = ()
+
+    def search(self, text: str, k: int = 10) -> List[Tuple[DocumentRef, float]]:
+        """
+        Returns the `k` documents with the best BM25 score for the query, best first.
+        """
+        number_of_docs = len(self._doc_by_id)
+        if not number_of_docs or k <= 0:
+            return []
+        average_length = self._total_length / number_of_docs or 1.0
+
+        k1, lengths = self.k1, self._lengths
+        base_norm, length_factor = k1 * (1 - self.b), k1 * self.b / average_length
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(text)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (number_of_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            weight = idf * (k1 + 1)
+            for doc, frequency in postings.items():
+                length_norm = base_norm + length_factor * lengths[doc]
+                scores[doc] = scores.get(doc, 0.0) + weight * frequency / (frequency + length_norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self._refs[doc], score) for doc, score in best]
+
+    def to_dict(self, document_ids: List[UUID]) -> Dict[str, Any]:
+        """
+        JSON-compatible dump of the index.
+
+        Documents are numbered following `document_ids`, e.g. the order of the entities and relationships
+        in a snapshot, so that references do not have to be dumped with the index, see `from_dict`.
+        """
+        new_doc = {self._doc_by_id[document_id]: new for new, document_id in enumerate(document_ids)}
+        if len(new_doc) != len(self._doc_by_id):
+            raise ValueError("The given document IDs do not match the indexed documents.")
+        return dict(
+            k1=self.k1,
+            b=self.b,
+            lengths=[self._lengths[doc] for doc in new_doc],
+            postings={
+                term: [value for doc, frequency in postings.items() for value in (new_doc[doc], frequency)]
+                for term, postings in self._postings.items()
+            },
+        )
+
+    @classmethod
+    def from_dict(cls, dumped_index: Dict[str, Any], refs: List[DocumentRef]) -> 'FullTextIndex':
+        """
+        Restores an index dumped by `to_dict`.
+
+        Args:
+            dumped_index: The dumped index.
+            refs: References to the indexed documents, in the order of the `document_ids` given to `to_dict`.
+        """
+        if len(refs) != len(dumped_index["lengths"]):
+            raise ValueError(f"{len(refs)} references given for {len(dumped_index['lengths'])} dumped documents.")
+        index = cls(k1=dumped_index["k1"], b=dumped_index["b"])
+        index._refs = list(refs)
+        index._lengths = list(dumped_index["lengths"])
+        index._doc_by_id = {ref.id: doc for doc, ref in enumerate(index._refs)}
+        index._total_length = sum(index._lengths)
+        index._postings = {
+            sys.intern(term): dict(zip(flat_postings[::2], flat_postings[1::2]))
+            for term, flat_postings in dumped_index["postings"].items()
+        }
+        terms: List[List[str]] = [[] for _ in index._refs]
+        for term, postings in index._postings.items():
+            for doc in postings:
+                terms[doc].append(term)
+        index._terms = list(map(tuple, terms))
+        return index
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[DocumentRef, Optional[str]]], **kwargs) -> 'FullTextIndex':
+        index = cls(**kwargs)
+        for ref, text in documents:
+            index.add(ref, text)
+        return index
@@ -0,0 +1,119 @@
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+
+_NON_ALPHANUMERIC = re.compile(r"[\W_]+")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercases a name, strips its accents and punctuation, e.g. "Ébling  Mis!" becomes "ebling mis"."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALPHANUMERIC.sub(" ", without_accents.lower()).strip()
+
+
+def trigrams(normalized_name: str) -> Set[str]:
+    """
+    Character trigrams of each word of a normalized name, words being padded like in PostgreSQL pg_trgm
+    so that short words and word boundaries still produce trigrams.
+    """
+    return {
+        padded[i:i + 3]
+        for word in normalized_name.split()
+        for padded in (f"  {word} ",)
+        for i in range(len(padded) - 2)
+    }
+
+
+class NameIndex:
+    """
+    Trigram index over entity names and aliases, for typo-tolerant name resolution.
+
+    Each name is split into character trigrams, and postings map every trigram to the names containing it.
+    A query only counts the trigrams it shares with the names of its postings, then ranks names by
+    Dice similarity: 2 * shared / (query trigrams + name trigrams).
+    Counting and scoring run on NumPy arrays, so a query costs a few vectorized passes over its postings.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._posting_arrays: Dict[str, np.ndarray] = {}  # Lazily built from the postings sets
+        self._labels: List[Optional[Tuple[str, UUID]]] = []  # Name and entity ID
+        self._gram_counts = np.zeros(1024, dtype=np.int32)  # Number of trigrams of each label, 0 once removed
+        self._labels_by_entity: Dict[UUID, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._labels_by_entity)
+
+    def add(self, entity_id: UUID, names: Iterable[str]) -> None:
+        """Indexes the names of an entity. Names already indexed for the entity are replaced."""
+        self.remove(entity_id)
+        label_ids = []
+        for name in dict.fromkeys(names):  # Drops duplicates, keeps order
+            grams = trigrams(normalize_name(name))
+            if not grams:
+                continue
+            label_id = len(self._labels)
+            self._labels.append((name, entity_id))
+            if label_id == len(self._gram_counts):
+                self._gram_counts = np.concatenate([self._gram_counts, np.zeros_like(self._gram_counts)])
+            self._gram_counts[label_id] = len(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(label_id)
+                self._posting_arrays.pop(gram, None)
+            label_ids.append(label_id)
+        self._labels_by_entity[entity_id] = label_ids
+
+    def remove(self, entity_id: UUID) -> None:
+        """Removes the names of an entity, if indexed."""
+        for label_id in self._labels_by_entity.pop(entity_id, []):
+            name, _ = self._labels[label_id]
+            for gram in trigrams(normalize_name(name)):
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(label_id)
+                    self._posting_arrays.pop(gram, None)
+                    if not postings:
+                        del self._postings[gram]
+            self._labels[label_id] = None
+            self._gram_counts[label_id] = 0
+
+    def resolve(self, query: str, max_results: int = 5, min_score: float = 0.3) -> List[Tuple[UUID, str, float]]:
+        """
+        Returns the entities with a name or alias similar to the query, most similar first.
+
+        Args:
+            query: A possibly misspelled name, e.g. "Hary Seldom".
+            max_results: Maximum number of entities returned.
+            min_score: Minimum similarity, between 0 and 1, of the returned names.
+
+        Returns:
+            List[Tuple[UUID, str, float]]: Entity IDs, with their best matching name and its similarity.
+        """
+        query_grams = trigrams(normalize_name(query))
+        arrays = [self._posting_array(gram) for gram in query_grams if gram in self._postings]
+        if not arrays:
+            return []
+        shared_counts = np.bincount(np.concatenate(arrays))
+        label_ids = np.flatnonzero(shared_counts)
+        scores = 2 * shared_counts[label_ids] / (len(query_grams) + self._gram_counts[label_ids])
+        kept = scores >= min_score
+        label_ids, scores = label_ids[kept], scores[kept]
+
+        results: Dict[UUID, Tuple[str, float]] = {}
+        for position in np.argsort(-scores, kind="stable"):
+            name, entity_id = self._labels[label_ids[position]]
+            if entity_id not in results:  # Names are visited by decreasing score, the first one is the best
+                results[entity_id] = (name, float(scores[position]))
+                if len(results) == max_results:
+                    break
+        return [(entity_id, name, score) for entity_id, (name, score) in results.items()]
+
+    def _posting_array(self, gram: str) -> np.ndarray:
+        array = self._posting_arrays.get(gram)
+        if array is None:
+            array = self._posting_arrays[gram] = np.fromiter(self._postings[gram], dtype=np.int64)
+        return array
@@ -0,0 +1,188 @@
+import math
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from uuid import UUID
+
+import numpy as np
+
+from knowledge_base.index.full_text import DocumentRef, tokenize
+
+# Maps a batch of texts to a (number of texts, dimension) matrix of vectors
+Embedder = Callable[[Sequence[str]], np.ndarray]
+
+
+def embedder_name(embedder: Embedder) -> str:
+    """Name identifying the vectors of an embedder, e.g. to check that persisted vectors can be reused."""
+    return getattr(embedder, "name", None) or getattr(embedder, "__qualname__", type(embedder).__qualname__)
+
+
+class HashingEmbedder:
+    """
+    Local embedder hashing the words and word pairs of a text into a fixed number of dimensions.
+
+    No vocabulary is learned and no model is downloaded: a feature is mapped to a dimension and a sign
+    by its CRC32, so the vectors of a text never change between runs or machines.
+    Similar texts are texts sharing words; embedders capturing meaning can be plugged instead,
+    see `KnowledgeBase.set_embedder`.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+        self.name = f"hashing-{dimension}"
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+            for feature, count in Counter(features).items():
+                hashed = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if hashed & 0x80000000 else -1.0
+                vectors[row, hashed % self.dimension] += sign * (1.0 + math.log(count))
+        return vectors
+
+
+class VectorIndex:
+    """
+    Brute-force nearest neighbor index over the embeddings of entities and relationships.
+
+    Vectors are normalized and stored as the rows of one NumPy matrix, so a query is scored against
+    every document with a single matrix-vector product, ranked by cosine similarity.
+    """
+
+    def __init__(self, embedder: Embedder):
+        self.embedder = embedder
+        self._matrix: Optional[np.ndarray] = None  # Allocated at the first addition, grown by doubling
+        self._alive = np.zeros(0, dtype=bool)
+        self._refs: List[Optional[DocumentRef]] = []
+        self._row_by_id: Dict[UUID, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._row_by_id)
+
+    def __contains__(self, document_id: UUID) -> bool:
+        return document_id in self._row_by_id
+
+    def add(self, ref: DocumentRef, text: Optional[str]) -> None:
+        """Indexes a document. A document already indexed with the same ID is replaced."""
+        self.add_many([(ref, text)])
+
+    def add_many(self, documents: Sequence[Tuple[DocumentRef, Optional[str]]]) -> None:
+        """Indexes documents, embedding their texts in one batch."""
+        if not documents:
+            return
+        vectors = np.asarray(self.embedder([text or "" for _, text in documents]), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self._append(
+            [ref for ref, _ in documents],
+            np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0),
+        )
+
+    def _append(self, refs: List[DocumentRef], vectors: np.ndarray) -> None:
+        """Appends rows of already normalized vectors."""
+        for ref in refs:
+            self.remove(ref.id)
+
+        start, end = len(self._refs), len(self._refs) + len(refs)
+        if self._matrix is None:
+            self._matrix = np.zeros((max(end, 1024), vectors.shape[1]), dtype=np.float32)
+            self._alive = np.zeros(len(self._matrix), dtype=bool)
+        elif end > len(self._matrix):
+            capacity = max(end, 2 * len(self._matrix))
+            self._matrix = np.concatenate([self._matrix, np.zeros((capacity - len(self._matrix), vectors.shape[1]),
+                                                                  dtype=np.float32)])
+            self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+        self._matrix[start:end] = vectors
+        self._alive[start:end] = True
+        self._refs.extend(refs)
+        self._row_by_id.update((ref.id, row) for row, ref in enumerate(refs, start=start))
+
+    def remove(self, document_id: UUID) -> None:
+        """Removes a document from the index, if indexed."""
+        row = self._row_by_id.pop(document_id, None)
+        if row is None:
+            return
+        self._refs[row] = None
+        self._alive[row] = False
+        self._matrix[row] = 0.0
+
+    def search(self, text: str, k: int = 10) -> List[Tuple[DocumentRef, float]]:
+        """
+        Returns the `k` documents the most similar to the query, best first.
+        """
+        if not self._row_by_id or k <= 0:
+            return []
+        query = np.asarray(self.embedder([text]), dtype=np.float32)[0]
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        size = len(self._refs)
+        scores = self._matrix[:size] @ (query / norm)
+        scores[~self._alive[:size]] = -np.inf
+
+        k = min(k, len(self._row_by_id))
+        best = np.argpartition(-scores, k - 1)[:k] if k < size else np.arange(size)
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self._refs[row], float(scores[row])) for row in best if self._alive[row]]
+
+    @staticmethod
+    def path_for_snapshot(snapshot_path: Union[str, Path]) -> Path:
+        """
+        Returns the path of the vectors stored next to a snapshot, e.g. `kb_asimov.vectors.npz`
+        for `kb_asimov.json.gz` or `kb_asimov.json`.
+        """
+        snapshot_path = Path(snapshot_path)
+        name = snapshot_path.name.removesuffix(".gz").removesuffix(".json")
+        return snapshot_path.with_name(f"{name}.vectors.npz")
+
+    def save(self, path: Path, document_ids: List[UUID]) -> None:
+        """
+        Saves the vectors in a NumPy archive, ordered following `document_ids`, see `load`.
+        """
+        if set(document_ids) != self._row_by_id.keys():
+            raise ValueError("The given document IDs do not match the indexed documents.")
+        rows = [self._row_by_id[document_id] for document_id in document_ids]
+        vectors = self._matrix[rows] if rows else np.zeros((0, 0), dtype=np.float32)
+        with path.open('wb') as f:
+            np.savez(f, vectors=vectors, document_ids=_ids_to_array(document_ids),
+                     embedder=np.array(embedder_name(self.embedder)))
+
+    @classmethod
+    def load(cls, path: Path, embedder: Embedder, refs: List[DocumentRef]) -> Optional['VectorIndex']:
+        """
+        Restores the vectors saved by `save`.
+
+        Returns:
+            Optional[VectorIndex]: The index, or None when the vectors are missing or were not computed
+                by the same embedder for the given documents, e.g. after the snapshot was rewritten without them.
+        """
+        if not path.exists():
+            return None
+        with np.load(path) as archive:
+            if (str(archive["embedder"]) != embedder_name(embedder)
+                    or not np.array_equal(archive["document_ids"], _ids_to_array(ref.id for ref in refs))):
+                return None
+            vectors = archive["vectors"]
+        index = cls(embedder)
+        if refs:
+            index._append(list(refs), vectors)
+        return index
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[DocumentRef, Optional[str]]], embedder: Embedder,
+              batch_size: int = 1024) -> 'VectorIndex':
+        index = cls(embedder)
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) == batch_size:
+                index.add_many(batch)
+                batch = []
+        index.add_many(batch)
+        return index
+
+
+def _ids_to_array(document_ids: Iterable[UUID]) -> np.ndarray:
+    return np.array([document_id.bytes for document_id in document_ids], dtype="S16")
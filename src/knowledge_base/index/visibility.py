@@ -0,0 +1,90 @@
+from typing import Dict, Iterable, List, Sequence
+from uuid import UUID
+
+import numpy as np
+
+from knowledge_base.models.entities import Entity
+from knowledge_base.models.relationships import Relationship
+
+
+class GraphPositions:
+    """
+    Positions of the entities and relationships of a version of the graph in the bitsets of `KnowledgeMask`.
+    """
+
+    def __init__(self, entity_ids: Iterable[UUID], relationship_ids: Iterable[UUID]):
+        self.entity_positions: Dict[UUID, int] = {entity_id: i for i, entity_id in enumerate(entity_ids)}
+        self.relationship_positions: Dict[UUID, int] = {
+            relationship_id: i for i, relationship_id in enumerate(relationship_ids)
+        }
+
+    def bitset(self, positions: Dict[UUID, int], ids: Iterable[UUID]) -> np.ndarray:
+        """Packed bitset, 8 items per byte, with the bits of the given IDs set."""
+        flags = np.zeros(len(positions), dtype=bool)
+        flags[np.fromiter((positions[item_id] for item_id in ids), dtype=np.int64)] = True
+        return np.packbits(flags)
+
+
+def _test_bits(bits: np.ndarray, positions: Dict[UUID, int], ids: Sequence[UUID]) -> np.ndarray:
+    """Vectorized test of the bits of the given IDs, False for IDs without position."""
+    indices = np.fromiter((positions.get(item_id, -1) for item_id in ids), dtype=np.int64, count=len(ids))
+    flags = indices >= 0
+    known = indices[flags]
+    flags[flags] = (bits[known >> 3] >> (7 - (known & 7))) & 1
+    return flags
+
+
+class KnowledgeMask:
+    """
+    What a character can know of the knowledge base, as one bit per entity and one bit per relationship.
+
+    Masks of the same graph version can be combined with `&` (shared knowledge) and `|`, and lists
+    of query results are filtered with vectorized bit tests rather than per-item reachability checks.
+    """
+
+    def __init__(self, positions: GraphPositions, entity_bits: np.ndarray, relationship_bits: np.ndarray):
+        self.positions = positions
+        self.entity_bits = entity_bits
+        self.relationship_bits = relationship_bits
+
+    @property
+    def entity_count(self) -> int:
+        return int(np.unpackbits(self.entity_bits).sum())
+
+    @property
+    def relationship_count(self) -> int:
+        return int(np.unpackbits(self.relationship_bits).sum())
+
+    def knows_entity(self, entity_id: UUID) -> bool:
+        return bool(self.entity_flags([entity_id])[0])
+
+    def entity_flags(self, entity_ids: Sequence[UUID]) -> np.ndarray:
+        """Boolean array telling which of the entities are known."""
+        return _test_bits(self.entity_bits, self.positions.entity_positions, entity_ids)
+
+    def relationship_flags(self, relationship_ids: Sequence[UUID]) -> np.ndarray:
+        """Boolean array telling which of the relationships are known."""
+        return _test_bits(self.relationship_bits, self.positions.relationship_positions, relationship_ids)
+
+    def filter_entities(self, entities: Sequence[Entity]) -> List[Entity]:
+        flags = self.entity_flags([entity.id for entity in entities])
+        return [entity for entity, known in zip(entities, flags) if known]
+
+    def filter_relationships(self, relationships: Sequence[Relationship]) -> List[Relationship]:
+        flags = self.relationship_flags([relationship.id for relationship in relationships])
+        return [relationship for relationship, known in zip(relationships, flags) if known]
+
+    def _combine(self, other: 'KnowledgeMask', operator) -> 'KnowledgeMask':
+        if other.positions is not self.positions:
+            raise ValueError("Masks computed on different versions of the knowledge base cannot be combined.")
+        return KnowledgeMask(
+            self.positions,
+            operator(self.entity_bits, other.entity_bits),
+            operator(self.relationship_bits, other.relationship_bits),
+        )
+
+    def __and__(self, other: 'KnowledgeMask') -> 'KnowledgeMask':
+        return self._combine(other, np.bitwise_and)
+
+    def __or__(self, other: 'KnowledgeMask') -> 'KnowledgeMask':
+        return self._combine(other, np.bitwise_or)
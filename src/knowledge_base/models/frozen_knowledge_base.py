@@ -0,0 +1,810 @@
+import bisect
+import itertools
+import json
+import math
+import mmap
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from uuid import UUID
+
+import numpy as np
+
+from knowledge_base.index.context_packs import ContextPack
+from knowledge_base.index.full_text import tokenize
+from knowledge_base.index.fuzzy import normalize_name, trigrams
+from knowledge_base.index.visibility import GraphPositions, KnowledgeMask
+from knowledge_base.logger import logger
+from knowledge_base.models.entities import Entity
+from knowledge_base.models.knowledge_base import ENTITY_TYPE_MAP, ConnectionPath, KnowledgeBase, Neighborhood
+from knowledge_base.models.knowledge_view import KnowledgeView
+from knowledge_base.models.relationships import Relationship
+
+_MAGIC = b"KBFROZEN"
+_VERSION = 2
+_ALIGNMENT = 64
+_ENTITY_TYPES = list(ENTITY_TYPE_MAP)
+_NO_DEPTH = -1  # Depth of the relationships without depth in the depth array
+
+
+class FrozenKnowledgeBase:
+    """
+    Immutable knowledge base stored as flat arrays in one file, and read through a read-only memory map.
+
+    Entities and relationships are serialized as JSON blobs, indexed by offset arrays, and the graph is stored
+    as compressed sparse rows of outgoing and incoming relationships. No Python object is created per entity
+    when the file is opened: workers forked or spawned from a process share the mapped pages through the
+    page cache, and touching the data never triggers a copy-on-write, unlike objects whose reference counts
+    are updated on every read. Entities and relationships are only decoded when a query returns them.
+
+    The full-text and name indexes, the graph scores, and the types and depths of the relationships are frozen
+    as arrays too, so it answers the queries of the agent tools like a `KnowledgeBase`: lookups, `search`,
+    `resolve_name`, `relationships_for`, `top_relationships`, `neighborhood`, `explain_connection`,
+    `context_pack`, and `scoped_to` for the knowledge of a character. Semantic and period queries are not frozen.
+
+    Example:
+        >>> FrozenKnowledgeBase.write(kb, "kb_asimov.frozen")
+        >>> frozen_kb = FrozenKnowledgeBase.open("kb_asimov.frozen")  # In the parent, before forking workers
+        >>> frozen_kb.get_entity_by_name("Hari Seldon")
+        <Character id='...' name='Hari Seldon'>
+    """
+
+    def __init__(self, path: Path, mapped: mmap.mmap, header: Dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self._mmap = mapped
+        self._header = header
+        self._arrays = arrays
+        self._names = _BlobSequence(arrays["name_blob"], arrays["name_offsets"], arrays["names_sorted"])
+        self._terms = _BlobSequence(arrays["term_blob"], arrays["term_offsets"])
+        self._grams = _BlobSequence(arrays["gram_blob"], arrays["gram_offsets"])
+        self._relationship_type_codes = {name: code for code, name in enumerate(header["relationship_types"])}
+        self._positions = _FrozenPositions(
+            _IdPositions(arrays["sorted_entity_ids"], arrays["ids_sorted"]),
+            _IdPositions(arrays["sorted_relationship_ids"], arrays["relationship_ids_sorted"]),
+        )
+        # Built when first requested, by each process
+        self._knowledge_masks: Dict[Tuple[int, int, int], KnowledgeMask] = {}
+        self._context_packs: Dict[int, ContextPack] = {}
+
+    # --- Writing ---
+
+    @staticmethod
+    def write(kb: KnowledgeBase, file_path: Union[str, Path]) -> Path:
+        """Freezes a knowledge base into a file read by `open`, and returns its path."""
+        file_path = Path(file_path)
+        entities = [entity for _, entity in kb.graph.nodes(data="entity") if entity is not None]
+        position_by_id = {entity.id: position for position, entity in enumerate(entities)}
+        relationships, dangling_relationship_ids = [], []
+        for _, _, relationship in kb.graph.edges(data="relationship"):
+            if relationship.source_entity_id in position_by_id and relationship.target_entity_id in position_by_id:
+                relationships.append(relationship)
+            else:
+                dangling_relationship_ids.append(relationship.id)
+
+        entity_blob, entity_offsets = _pack_blobs(entity.model_dump_json().encode() for entity in entities)
+        name_blob, name_offsets = _pack_blobs(entity.name.encode() for entity in entities)
+        relationship_blob, relationship_offsets = _pack_blobs(
+            relationship.model_dump_json().encode() for relationship in relationships
+        )
+        entity_types = np.array([_ENTITY_TYPES.index(entity.__class__.__name__) for entity in entities], dtype=np.uint8)
+        entity_ids = np.array([entity.id.bytes for entity in entities], dtype="S16")
+        relationship_ids = np.array([relationship.id.bytes for relationship in relationships], dtype="S16")
+        relationship_types = sorted({relationship.relationship_type for relationship in relationships})
+        relationship_type_codes = np.array(
+            [relationship_types.index(relationship.relationship_type) for relationship in relationships],
+            dtype=np.int32,
+        )
+        relationship_depths = np.array(
+            [r.depth if r.depth is not None else _NO_DEPTH for r in relationships], dtype=np.int32,
+        )
+        sources = np.array([position_by_id[r.source_entity_id] for r in relationships], dtype=np.int32)
+        targets = np.array([position_by_id[r.target_entity_id] for r in relationships], dtype=np.int32)
+        out_offsets, out_relationships = _compressed_rows(sources, len(entities))
+        in_offsets, in_relationships = _compressed_rows(targets, len(entities))
+        type_offsets, entities_by_type = _compressed_rows(entity_types.astype(np.int32), len(_ENTITY_TYPES))
+        scores = kb.graph_scores
+
+        ids_order = np.argsort(entity_ids, kind="stable")
+        relationship_ids_order = np.argsort(relationship_ids, kind="stable")
+        arrays = dict(
+            entity_ids=entity_ids,
+            sorted_entity_ids=entity_ids[ids_order],
+            ids_sorted=ids_order.astype(np.int32),
+            entity_types=entity_types,
+            entity_blob=entity_blob,
+            entity_offsets=entity_offsets,
+            name_blob=name_blob,
+            name_offsets=name_offsets,
+            names_sorted=np.array(sorted(range(len(entities)), key=lambda i: entities[i].name), dtype=np.int32),
+            type_offsets=type_offsets,
+            entities_by_type=entities_by_type,
+            relationship_blob=relationship_blob,
+            relationship_offsets=relationship_offsets,
+            relationship_ids=relationship_ids,
+            sorted_relationship_ids=relationship_ids[relationship_ids_order],
+            relationship_ids_sorted=relationship_ids_order.astype(np.int32),
+            relationship_type_codes=relationship_type_codes,
+            relationship_depths=relationship_depths,
+            relationship_sources=sources,
+            relationship_targets=targets,
+            out_offsets=out_offsets,
+            out_relationships=out_relationships,
+            in_offsets=in_offsets,
+            in_relationships=in_relationships,
+            pagerank=np.array([scores.pagerank_of(entity.id) for entity in entities], dtype=np.float64),
+            relationship_weights=np.array([scores.weight_of(r.id) for r in relationships], dtype=np.float64),
+            **_freeze_full_text_index(kb, entities, relationships, dangling_relationship_ids),
+            **_freeze_name_index(entities),
+        )
+
+        header = dict(
+            version=_VERSION,
+            entity_types=_ENTITY_TYPES,
+            relationship_types=relationship_types,
+            full_text=dict(k1=kb.full_text_index.k1, b=kb.full_text_index.b,
+                           total_length=int(arrays["document_lengths"].sum())),
+            arrays={},
+        )
+        position = 0
+        for name, array in arrays.items():
+            header["arrays"][name] = dict(dtype=array.dtype.str, count=len(array), offset=position)
+            position = _aligned(position + array.nbytes)
+        header_bytes = json.dumps(header).encode()
+        data_start = _aligned(len(_MAGIC) + 8 + len(header_bytes))
+
+        with file_path.open('wb') as f:
+            f.write(_MAGIC + len(header_bytes).to_bytes(8, "little") + header_bytes)
+            for name, array in arrays.items():
+                f.seek(data_start + header["arrays"][name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(data_start + position)  # Empty arrays at the end still have their offset in the file
+        return file_path
+
+    # --- Reading ---
+
+    @classmethod
+    def open(cls, file_path: Union[str, Path]) -> 'FrozenKnowledgeBase':
+        """
+        Maps a file written by `write` in memory. Only the header is read, the arrays are views of the mapping.
+
+        Raises:
+            ValueError: If the file is not a frozen knowledge base of a supported version.
+        """
+        file_path = Path(file_path)
+        with file_path.open('rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{file_path} is not a frozen knowledge base.")
+        header_length = int.from_bytes(mapped[len(_MAGIC):len(_MAGIC) + 8], "little")
+        header = json.loads(mapped[len(_MAGIC) + 8:len(_MAGIC) + 8 + header_length])
+        if header["version"] != _VERSION or header["entity_types"] != _ENTITY_TYPES:
+            raise ValueError(f"Unsupported frozen knowledge base version or entity types in {file_path}.")
+
+        data_start = _aligned(len(_MAGIC) + 8 + header_length)
+        arrays = {
+            name: np.frombuffer(mapped, dtype=np.dtype(spec["dtype"]), count=spec["count"],
+                                offset=data_start + spec["offset"])
+            for name, spec in header["arrays"].items()
+        }
+        return cls(file_path, mapped, header, arrays)
+
+    def __reduce__(self):
+        # Spawned workers map the same file again rather than receiving a copy of the data
+        return self.__class__.open, (self.path,)
+
+    def close(self) -> None:
+        self._arrays = {}
+        self._names = self._terms = self._grams = self._positions = None
+        self._knowledge_masks = {}  # Their positions are views of the mapping too
+        self._mmap.close()
+
+    def __enter__(self) -> 'FrozenKnowledgeBase':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._arrays["ids_sorted"])
+
+    @property
+    def number_of_relationships(self) -> int:
+        return len(self._arrays["relationship_sources"])
+
+    def _entity_at(self, position: int) -> Entity:
+        start, end = self._arrays["entity_offsets"][position:position + 2]
+        entity_class = ENTITY_TYPE_MAP[_ENTITY_TYPES[self._arrays["entity_types"][position]]]
+        return entity_class.model_validate_json(self._arrays["entity_blob"][start:end].tobytes())
+
+    def _entity_id_at(self, position: int) -> UUID:
+        return UUID(bytes=self._arrays["entity_ids"][position:position + 1].tobytes())  # Items drop trailing zeros
+
+    def _relationship_at(self, index: int) -> Relationship:
+        start, end = self._arrays["relationship_offsets"][index:index + 2]
+        return Relationship.model_validate_json(self._arrays["relationship_blob"][start:end].tobytes())
+
+    def _other_end(self, index: int, position: int) -> int:
+        """Position of the entity at the other end of a relationship from the given entity."""
+        source = int(self._arrays["relationship_sources"][index])
+        return int(self._arrays["relationship_targets"][index]) if source == position else source
+
+    def _position_of(self, entity_id: Union[str, UUID]) -> int:
+        entity_id = UUID(entity_id) if isinstance(entity_id, str) else entity_id
+        position = self._positions.entity_positions.get(entity_id)
+        if position is None:
+            raise KeyError(f"Entity id {entity_id} not found in KB.")
+        return position
+
+    def _position_of_name(self, name: str) -> Optional[int]:
+        found = bisect.bisect_left(self._names, name)
+        if found == len(self._names) or self._names[found] != name:
+            return None
+        return int(self._arrays["names_sorted"][found])
+
+    def _find_position(self, entity: Union[Entity, UUID, str]) -> Optional[int]:
+        """Position of an entity given as an entity, an ID, or a name (or the string of an ID), None if unknown."""
+        if isinstance(entity, Entity):
+            entity = entity.id
+        elif isinstance(entity, str):
+            position = self._position_of_name(entity)
+            if position is not None:
+                return position
+            try:
+                entity = UUID(entity)
+            except ValueError:
+                return None
+        return self._positions.entity_positions.get(entity)
+
+    def _resolve_position(self, entity: Union[Entity, UUID, str]) -> int:
+        """
+        Same as `_find_position`, but raises a KeyError suggesting the closest names for an unknown entity.
+        """
+        position = self._find_position(entity)
+        if position is None:
+            if isinstance(entity, str):
+                candidates = [candidate_name for _, candidate_name, _ in self.resolve_name(entity, max_results=3)]
+                suggestion = f" Did you mean one of {candidates}?" if candidates else ""
+                raise KeyError(f"Entity '{entity}' not found in KB.{suggestion}")
+            raise KeyError(f"Entity id {entity.id if isinstance(entity, Entity) else entity} not found in KB.")
+        return position
+
+    def _resolve_entity_id(self, entity: Union[Entity, UUID, str]) -> UUID:
+        """Same as `KnowledgeBase._resolve_entity_id`, used by `KnowledgeView`."""
+        return self._entity_id_at(self._resolve_position(entity))
+
+    def get_entity_by_id(self, entity_id: Union[str, UUID]) -> Entity:
+        """
+        Raises:
+            KeyError: If the entity ID is not found in the knowledge base.
+        """
+        return self._entity_at(self._position_of(entity_id))
+
+    def get_entity_by_name(self, name: str) -> Entity:
+        """
+        Raises:
+            KeyError: If the entity name is not found in the knowledge base. The message suggests
+                the closest names, see `resolve_name`.
+        """
+        position = self._position_of_name(name)
+        if position is None:
+            candidates = [candidate_name for _, candidate_name, _ in self.resolve_name(name, max_results=3)]
+            suggestion = f" Did you mean one of {candidates}?" if candidates else ""
+            raise KeyError(f"Entity name '{name}' not found in KB.{suggestion}")
+        return self._entity_at(position)
+
+    def get_entities_by_type(self, entity_type: Union[str, type[Entity]]) -> List[Entity]:
+        type_name = entity_type if isinstance(entity_type, str) else entity_type.__name__
+        if type_name not in _ENTITY_TYPES:
+            return []
+        code = _ENTITY_TYPES.index(type_name)
+        start, end = self._arrays["type_offsets"][code:code + 2]
+        return [self._entity_at(int(position)) for position in self._arrays["entities_by_type"][start:end]]
+
+    def get_entities_by_names(self, names: Iterable[str]) -> Dict[str, Entity]:
+        """Same as `KnowledgeBase.get_entities_by_names`: the entity of each exact name found, in order."""
+        entities = {}
+        for name in names:
+            position = self._position_of_name(name)
+            if position is not None:
+                entities[name] = self._entity_at(position)
+        return entities
+
+    def get_entities_by_ids(self, entity_ids: Iterable[Union[str, UUID]]) -> Dict[UUID, Entity]:
+        """Same as `KnowledgeBase.get_entities_by_ids`: unknown and malformed IDs are left out."""
+        entities = {}
+        for entity_id in entity_ids:
+            if isinstance(entity_id, str):
+                try:
+                    entity_id = UUID(entity_id)
+                except ValueError:
+                    continue
+            position = self._positions.entity_positions.get(entity_id)
+            if position is not None:
+                entities[entity_id] = self._entity_at(position)
+        return entities
+
+    # --- Text queries ---
+
+    def search(self, text: str, k: int = 10) -> List[Tuple[Union[Entity, Relationship], float]]:
+        """
+        Same as `KnowledgeBase.search`: BM25 search over the names and descriptions of entities and
+        the descriptions of relationships, through the frozen postings of their terms.
+        """
+        lengths = self._arrays["document_lengths"]
+        number_of_docs = len(lengths)
+        if not number_of_docs or k <= 0:
+            return []
+        full_text = self._header["full_text"]
+        k1, b = full_text["k1"], full_text["b"]
+        average_length = full_text["total_length"] / number_of_docs or 1.0
+        base_norm, length_factor = k1 * (1 - b), k1 * b / average_length
+
+        docs, contributions = [], []
+        for term in set(tokenize(text)):
+            found = _find_key(self._terms, term)
+            if found is None:
+                continue
+            start, end = self._arrays["term_posting_offsets"][found:found + 2]
+            term_docs = self._arrays["term_docs"][start:end]
+            frequencies = self._arrays["term_frequencies"][start:end].astype(np.float64)
+            idf = math.log(1 + (number_of_docs - len(term_docs) + 0.5) / (len(term_docs) + 0.5))
+            length_norm = base_norm + length_factor * lengths[term_docs]
+            docs.append(term_docs)
+            contributions.append(idf * (k1 + 1) * frequencies / (frequencies + length_norm))
+        if not docs:
+            return []
+        scores = np.bincount(np.concatenate(docs), weights=np.concatenate(contributions), minlength=number_of_docs)
+        matched_docs = np.flatnonzero(scores)
+        if len(matched_docs) > k:  # Only the k best are sorted
+            matched_docs = matched_docs[np.argpartition(-scores[matched_docs], k - 1)[:k]]
+        best = matched_docs[np.lexsort((matched_docs, -scores[matched_docs]))]
+
+        number_of_entities = len(self)
+        return [
+            (self._entity_at(doc) if doc < number_of_entities else self._relationship_at(doc - number_of_entities),
+             float(scores[doc]))
+            for doc in best.tolist()
+        ]
+
+    def resolve_name(self, query: str, max_results: int = 5,
+                     min_score: float = 0.3) -> List[Tuple[Entity, str, float]]:
+        """
+        Same as `KnowledgeBase.resolve_name`: the entities whose name or alias shares the most trigrams
+        with the query, by Dice similarity, see `NameIndex`.
+        """
+        query_grams = trigrams(normalize_name(query))
+        postings = []
+        for gram in query_grams:
+            found = _find_key(self._grams, gram)
+            if found is not None:
+                start, end = self._arrays["gram_posting_offsets"][found:found + 2]
+                postings.append(self._arrays["gram_labels"][start:end])
+        if not postings:
+            return []
+        shared_counts = np.bincount(np.concatenate(postings))
+        label_ids = np.flatnonzero(shared_counts)
+        scores = 2 * shared_counts[label_ids] / (len(query_grams) + self._arrays["label_gram_counts"][label_ids])
+        kept = scores >= min_score
+        label_ids, scores = label_ids[kept], scores[kept]
+
+        results: Dict[int, Tuple[str, float]] = {}
+        label_offsets, label_blob = self._arrays["label_offsets"], self._arrays["label_blob"]
+        for i in np.argsort(-scores, kind="stable").tolist():
+            label_id = int(label_ids[i])
+            position = int(self._arrays["label_entities"][label_id])
+            if position not in results:  # Names are visited by decreasing score, the first one is the best
+                start, end = label_offsets[label_id:label_id + 2]
+                results[position] = (label_blob[start:end].tobytes().decode(), float(scores[i]))
+                if len(results) == max_results:
+                    break
+        return [(self._entity_at(position), name, score) for position, (name, score) in results.items()]
+
+    # --- Graph queries ---
+
+    def _incident(
+            self,
+            position: int,
+            relationship_types: Optional[Iterable[str]] = None,
+            min_depth: Optional[int] = None,
+    ) -> List[int]:
+        """
+        Indices of the outgoing and incoming relationships of an entity, deepest first, among the given types
+        and with a depth of at least `min_depth` if given. Relationships are filtered without being decoded.
+        """
+        rows = [
+            rows[start:end]
+            for offsets, rows in ((self._arrays["out_offsets"], self._arrays["out_relationships"]),
+                                  (self._arrays["in_offsets"], self._arrays["in_relationships"]))
+            for start, end in (offsets[position:position + 2],)
+        ]
+        indices = np.array(list(dict.fromkeys(np.concatenate(rows).tolist())), dtype=np.int64)
+        depths = self._arrays["relationship_depths"][indices]
+        if relationship_types is not None:
+            codes = [self._relationship_type_codes.get(type_name, -1) for type_name in relationship_types]
+            kept = np.isin(self._arrays["relationship_type_codes"][indices], codes)
+            indices, depths = indices[kept], depths[kept]
+        if min_depth is not None:
+            kept = depths >= min_depth
+            indices, depths = indices[kept], depths[kept]
+        return indices[np.argsort(-depths, kind="stable")].tolist()
+
+    def get_relationships(self, entity: Union[Entity, UUID, str]) -> List[Relationship]:
+        """Outgoing then incoming relationships of an entity, given as an entity, its ID or its name."""
+        position = self._resolve_position(entity)
+        rows = [
+            rows[start:end].tolist()
+            for offsets, rows in ((self._arrays["out_offsets"], self._arrays["out_relationships"]),
+                                  (self._arrays["in_offsets"], self._arrays["in_relationships"]))
+            for start, end in (offsets[position:position + 2],)
+        ]
+        return [self._relationship_at(index) for index in dict.fromkeys(itertools.chain(*rows))]
+
+    def relationships_for(
+            self,
+            entities: Iterable[Union[Entity, UUID, str]],
+            relationship_types: Optional[Iterable[str]] = None,
+            min_depth: Optional[int] = None,
+    ) -> Dict[UUID, List[Relationship]]:
+        """Same as `KnowledgeBase.relationships_for`: unknown entities are left out."""
+        relationship_types = frozenset(relationship_types) if relationship_types is not None else None
+        relationships = {}
+        for entity in entities:
+            position = self._find_position(entity)
+            if position is None:
+                continue
+            entity_id = self._entity_id_at(position)
+            if entity_id not in relationships:
+                relationships[entity_id] = [
+                    self._relationship_at(index) for index in self._incident(position, relationship_types, min_depth)
+                ]
+        return relationships
+
+    def top_relationships(
+            self,
+            entity: Union[Entity, UUID, str],
+            k: Optional[int] = 10,
+            relationship_types: Optional[Iterable[str]] = None,
+            min_depth: Optional[int] = None,
+    ) -> List[Tuple[Relationship, float]]:
+        """
+        Same as `KnowledgeBase.top_relationships`, from the frozen graph scores.
+        Only the returned relationships are decoded.
+
+        Raises:
+            KeyError: If the entity is not found in the knowledge base.
+        """
+        position = self._resolve_position(entity)
+        indices = self._incident(position, relationship_types, min_depth)
+        others = [self._other_end(index, position) for index in indices]
+        importances = self._arrays["relationship_weights"][indices] * self._arrays["pagerank"][others] * len(self)
+        order = np.argsort(-importances, kind="stable")  # The deepest first on equal importance
+        order = order[:k] if k is not None else order
+        return [(self._relationship_at(indices[i]), float(importances[i])) for i in order.tolist()]
+
+    def neighborhood(
+            self,
+            entity: Union[Entity, UUID, str],
+            hops: int = 1,
+            relationship_types: Optional[Iterable[str]] = None,
+            min_depth: Optional[int] = None,
+            max_nodes: int = 50,
+    ) -> Neighborhood:
+        """
+        Same as `KnowledgeBase.neighborhood`.
+        """
+        center = self._resolve_position(entity)
+        relationship_types = frozenset(relationship_types) if relationship_types is not None else None
+
+        hops_by_position = {center: 0}
+        followed: Dict[int, None] = {}
+        queue = deque([center])
+        while queue:
+            position = queue.popleft()
+            hop = hops_by_position[position] + 1
+            if hop > hops:
+                break
+            for index in self._incident(position, relationship_types, min_depth):
+                other = self._other_end(index, position)
+                if other not in hops_by_position:
+                    if len(hops_by_position) >= max_nodes:
+                        continue
+                    hops_by_position[other] = hop
+                    queue.append(other)
+                followed[index] = None
+
+        return Neighborhood(
+            entities=tuple((self._entity_at(position), hop) for position, hop in hops_by_position.items()),
+            relationships=tuple(self._relationship_at(index) for index in followed),
+        )
+
+    def explain_connection(
+            self,
+            entity_a: Union[Entity, UUID, str],
+            entity_b: Union[Entity, UUID, str],
+            max_len: int = 4,
+            max_paths: int = 3,
+            max_visited: int = 10_000,
+    ) -> List[ConnectionPath]:
+        """
+        Same as `KnowledgeBase.explain_connection`, the search running on positions in the frozen graph.
+
+        Raises:
+            KeyError: If an entity is not found in the knowledge base.
+        """
+        position_a, position_b = self._resolve_position(entity_a), self._resolve_position(entity_b)
+        if position_a == position_b:
+            return [ConnectionPath(entities=(self._entity_at(position_a),), relationships=())]
+        return [
+            ConnectionPath(
+                entities=tuple(self._entity_at(position) for position in positions),
+                relationships=tuple(self._relationship_at(index) for index in indices),
+            )
+            for positions, indices in itertools.islice(
+                self._shortest_connections(position_a, position_b, max_len, max_visited), max_paths
+            )
+        ]
+
+    def _shortest_connections(
+            self, position_a: int, position_b: int, max_len: int, max_visited: int,
+    ) -> Iterator[Tuple[List[int], List[int]]]:
+        """Yields the shortest paths between two different entities, as their positions and relationship indices."""
+        # For each side: the distance of every reached entity, and the relationships reaching it at that distance
+        distances = ({position_a: 0}, {position_b: 0})
+        parents: Tuple[Dict[int, List[Tuple[int, int]]], ...] = ({position_a: []}, {position_b: []})
+        frontiers = ([position_a], [position_b])
+        depths = [0, 0]
+        meeting_positions: List[int] = []
+        while not meeting_positions:
+            if depths[0] + depths[1] >= max_len or not frontiers[0] or not frontiers[1]:
+                return
+            if len(distances[0]) + len(distances[1]) > max_visited:
+                logger.warning(f"Connection search in {self.path} stopped after {max_visited} entities.")
+                return
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            side_distances, side_parents, other_distances = distances[side], parents[side], distances[1 - side]
+            depths[side] += 1
+            next_frontier = []
+            for position in frontiers[side]:
+                for index in self._incident(position):
+                    other = self._other_end(index, position)
+                    if other not in side_distances:
+                        side_distances[other] = depths[side]
+                        side_parents[other] = [(index, position)]
+                        next_frontier.append(other)
+                    elif side_distances[other] == depths[side]:  # Another shortest way to this entity
+                        side_parents[other].append((index, position))
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+            meeting_positions = [position for position in next_frontier if position in other_distances]
+
+        for meeting_position in meeting_positions:
+            for positions_from_a, indices_from_a in _walk_back(parents[0], meeting_position):
+                for positions_from_b, indices_from_b in _walk_back(parents[1], meeting_position):
+                    yield positions_from_a[::-1] + positions_from_b[1:], indices_from_a[::-1] + indices_from_b
+
+    def context_pack(self, entity: Union[Entity, UUID, str]) -> ContextPack:
+        """
+        Same as `KnowledgeBase.context_pack`, built when first requested and kept by the process.
+
+        Raises:
+            KeyError: If the entity is not found in the knowledge base.
+        """
+        position = self._resolve_position(entity)
+        pack = self._context_packs.get(position)
+        if pack is None:
+            ranked_relationships = [relationship for relationship, _ in self.top_relationships(entity, k=None)]
+            linked_entities = self.get_entities_by_ids({
+                linked_id
+                for relationship in ranked_relationships
+                for linked_id in (relationship.source_entity_id, relationship.target_entity_id)
+            })
+            pack = self._context_packs[position] = ContextPack.build(
+                self._entity_at(position), ranked_relationships, linked_entities,
+            )
+        return pack
+
+    # --- Knowledge of the characters ---
+
+    def knowledge_of(
+            self,
+            character: Union[Entity, UUID, str],
+            max_hops: int = 2,
+            min_depth: int = 5,
+    ) -> KnowledgeMask:
+        """
+        Same as `KnowledgeBase.knowledge_of`, the bits following the positions of the frozen arrays.
+        Masks are kept by the process once computed.
+
+        Raises:
+            KeyError: If the character is not found in the knowledge base.
+        """
+        center = self._resolve_position(character)
+        mask_key = (center, max_hops, min_depth)
+        mask = self._knowledge_masks.get(mask_key)
+        if mask is not None:
+            return mask
+
+        known_entities = np.zeros(len(self), dtype=bool)
+        known_relationships = np.zeros(self.number_of_relationships, dtype=bool)
+        known_entities[center] = True
+        frontier = [center]
+        for hop in range(1, max_hops + 1):
+            next_frontier = []
+            for position in frontier:
+                for index in self._incident(position, min_depth=min_depth if hop > 1 else None):
+                    known_relationships[index] = True
+                    other = self._other_end(index, position)
+                    if not known_entities[other]:
+                        known_entities[other] = True
+                        next_frontier.append(other)
+            frontier = next_frontier
+
+        mask = self._knowledge_masks[mask_key] = KnowledgeMask(
+            self._positions, np.packbits(known_entities), np.packbits(known_relationships),
+        )
+        return mask
+
+    def scoped_to(self, character: Union[Entity, UUID, str], **knowledge_kwargs: Any) -> KnowledgeView:
+        """
+        Same as `KnowledgeBase.scoped_to`. The semantic and period queries of the view are not available.
+
+        Raises:
+            KeyError: If the character is not found in the knowledge base.
+        """
+        return KnowledgeView(self, character, **knowledge_kwargs)
+
+
+class _BlobSequence:
+    """
+    Sequence of the strings of a blob in a given order, or in the order of the blob, decoded on access,
+    e.g. for `bisect`.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, order: Optional[np.ndarray] = None):
+        self._blob, self._offsets, self._order = blob, offsets, order
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1 if self._order is None else len(self._order)
+
+    def __getitem__(self, index: int) -> str:
+        position = self._order[index] if self._order is not None else index
+        start, end = self._offsets[position:position + 2]
+        return self._blob[start:end].tobytes().decode()
+
+
+class _IdPositions:
+    """Read-only mapping of IDs to positions, searched in an array of sorted IDs, see `_FrozenPositions`."""
+
+    def __init__(self, sorted_ids: np.ndarray, positions_of_sorted_ids: np.ndarray):
+        self._sorted_ids, self._positions = sorted_ids, positions_of_sorted_ids
+
+    def __len__(self) -> int:
+        return len(self._sorted_ids)
+
+    def get(self, item_id: UUID, default: Optional[int] = None) -> Optional[int]:
+        key = np.array(item_id.bytes, dtype="S16")
+        found = int(np.searchsorted(self._sorted_ids, key))
+        if found == len(self._sorted_ids) or self._sorted_ids[found] != key:
+            return default
+        return int(self._positions[found])
+
+    def __getitem__(self, item_id: UUID) -> int:
+        position = self.get(item_id)
+        if position is None:
+            raise KeyError(item_id)
+        return position
+
+
+class _FrozenPositions(GraphPositions):
+    """Positions of the entities and relationships of a frozen knowledge base, without a dictionary per item."""
+
+    def __init__(self, entity_positions: _IdPositions, relationship_positions: _IdPositions):
+        self.entity_positions = entity_positions
+        self.relationship_positions = relationship_positions
+
+
+def _find_key(sorted_keys: Sequence[str], key: str) -> Optional[int]:
+    found = bisect.bisect_left(sorted_keys, key)
+    return found if found < len(sorted_keys) and sorted_keys[found] == key else None
+
+
+def _walk_back(parents: Dict[int, List[Tuple[int, int]]], position: int) -> Iterator[Tuple[List[int], List[int]]]:
+    """Yields every chain of parents from an entity back to the start of a breadth-first search."""
+    if not parents[position]:
+        yield [position], []
+        return
+    for index, parent in parents[position]:
+        for positions, indices in _walk_back(parents, parent):
+            yield [position] + positions, [index] + indices
+
+
+def _freeze_full_text_index(kb: KnowledgeBase, entities: List[Entity], relationships: List[Relationship],
+                            dangling_relationship_ids: List[UUID]) -> Dict[str, np.ndarray]:
+    """
+    Postings of the full-text index of a knowledge base, as arrays. Documents are numbered like the entities,
+    then like the relationships, after them. Relationships with an entity left out of the file are left out.
+    """
+    number_of_docs = len(entities) + len(relationships)
+    dumped_index = kb.full_text_index.to_dict(
+        [entity.id for entity in entities] + [r.id for r in relationships] + dangling_relationship_ids
+    )
+    postings = {}
+    for term, flat_postings in dumped_index["postings"].items():
+        kept = [(doc, frequency) for doc, frequency in zip(flat_postings[::2], flat_postings[1::2])
+                if doc < number_of_docs]
+        if kept:
+            postings[term] = kept
+    terms = sorted(postings)
+    term_blob, term_offsets = _pack_blobs(term.encode() for term in terms)
+    term_posting_offsets, flat_postings = _pack_postings([postings[term] for term in terms], width=2)
+    return dict(
+        document_lengths=np.array(dumped_index["lengths"][:number_of_docs], dtype=np.int32),
+        term_blob=term_blob,
+        term_offsets=term_offsets,
+        term_posting_offsets=term_posting_offsets,
+        term_docs=np.ascontiguousarray(flat_postings[:, 0]),
+        term_frequencies=np.ascontiguousarray(flat_postings[:, 1]),
+    )
+
+
+def _freeze_name_index(entities: List[Entity]) -> Dict[str, np.ndarray]:
+    """
+    Trigram postings of the names and aliases of the entities, as arrays, see `NameIndex`.
+    Each name of an entity is a label, and each trigram lists the labels containing it.
+    """
+    labels: List[Tuple[str, int, int]] = []  # Name, entity position and number of trigrams
+    labels_by_gram: Dict[str, List[int]] = {}
+    for position, entity in enumerate(entities):
+        for name in dict.fromkeys([entity.name, *getattr(entity, "aliases", [])]):
+            grams = trigrams(normalize_name(name))
+            if not grams:
+                continue
+            for gram in grams:
+                labels_by_gram.setdefault(gram, []).append(len(labels))
+            labels.append((name, position, len(grams)))
+    label_blob, label_offsets = _pack_blobs(name.encode() for name, _, _ in labels)
+    grams = sorted(labels_by_gram)
+    gram_blob, gram_offsets = _pack_blobs(gram.encode() for gram in grams)
+    gram_posting_offsets, gram_labels = _pack_postings([labels_by_gram[gram] for gram in grams], width=1)
+    return dict(
+        label_blob=label_blob,
+        label_offsets=label_offsets,
+        label_entities=np.array([position for _, position, _ in labels], dtype=np.int32),
+        label_gram_counts=np.array([gram_count for _, _, gram_count in labels], dtype=np.int32),
+        gram_blob=gram_blob,
+        gram_offsets=gram_offsets,
+        gram_posting_offsets=gram_posting_offsets,
+        gram_labels=gram_labels.ravel(),
+    )
+
+
+def _pack_blobs(blobs: Iterable[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenates byte strings, returns the bytes and the offsets of each string (one more than strings)."""
+    blobs = list(blobs)
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    np.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+    return np.frombuffer(b"".join(blobs), dtype=np.uint8), offsets
+
+
+def _pack_postings(postings: List[Sequence], width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Concatenates lists of postings, each posting being `width` integers: returns the offsets of each list
+    (one more than lists) and the postings, as a (number of postings, width) array.
+    """
+    offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+    np.cumsum([len(items) for items in postings], out=offsets[1:])
+    flat = np.fromiter(
+        (value for items in postings for item in items for value in (item if width > 1 else (item,))),
+        dtype=np.int32, count=int(offsets[-1]) * width,
+    )
+    return offsets, flat.reshape(-1, width)
+
+
+def _compressed_rows(row_of_items: np.ndarray, number_of_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Groups item indices by row: returns the offsets of each row (one more than rows) and the grouped items."""
+    offsets = np.zeros(number_of_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row_of_items, minlength=number_of_rows), out=offsets[1:])
+    return offsets, np.argsort(row_of_items, kind="stable").astype(np.int32)
+
+
+def _aligned(position: int) -> int:
+    return -(-position // _ALIGNMENT) * _ALIGNMENT
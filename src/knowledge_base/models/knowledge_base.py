@@ -1,27 +1,163 @@
+import functools
 import gzip
+import itertools
+import os
+import threading
+from collections import defaultdict
 
 import networkx as nx
-from typing import List, Dict, Optional, Any, Union, Mapping
+from typing import List, Dict, Optional, Any, Union, Mapping, TextIO, Tuple, NamedTuple, Iterable, Iterator, \
+    Hashable
 from uuid import UUID
 import json
 from pathlib import Path
 
+from pydantic import TypeAdapter
+
+from knowledge_base.index.attributes import IntervalIndex, RelationshipIndex
+from knowledge_base.index.centrality import GraphScores
+from knowledge_base.index.context_packs import ContextPack
+from knowledge_base.index.full_text import FullTextIndex, DocumentRef
+from knowledge_base.index.fuzzy import NameIndex
+from knowledge_base.index.vector import Embedder, HashingEmbedder, VectorIndex
+from knowledge_base.index.visibility import GraphPositions, KnowledgeMask
 from knowledge_base.logger import logger
 # Import all specific entity types for the factory in load_kb
 from knowledge_base.models.entities import Entity, Character, Place, Event, SpecialObject
+from knowledge_base.models.knowledge_view import KnowledgeView
 from knowledge_base.models.relationships import Relationship
+from knowledge_base.utils.change_log import ChangeLog, CHANGE_ADD_ENTITY, CHANGE_UPDATE_ENTITY, \
+    CHANGE_REMOVE_ENTITY, CHANGE_ADD_RELATIONSHIP, CHANGE_UPDATE_RELATIONSHIP, CHANGE_REMOVE_RELATIONSHIP
+from knowledge_base.utils.json_stream import iter_json_stream
+from knowledge_base.utils.lru_cache import LRUCache
+from knowledge_base.utils.period import Calendar, DEFAULT_CALENDAR, Interval, parse_period
+from knowledge_base.utils.rw_lock import ReadWriteLock
 from knowledge_base.utils.serializer import UUIDEncoder
 
+ENTITY_TYPE_MAP: Dict[str, type[Entity]] = {
+    "Character": Character,
+    "Place": Place,
+    "Event": Event,
+    "SpecialObject": SpecialObject,
+}
+
+# Batch validators used by the trusted loading path, a single call validates a whole list of dumped models.
+_ENTITY_LIST_ADAPTERS: Dict[str, TypeAdapter] = {
+    entity_type: TypeAdapter(List[entity_class]) for entity_type, entity_class in ENTITY_TYPE_MAP.items()
+}
+_RELATIONSHIP_LIST_ADAPTER = TypeAdapter(List[Relationship])
+
+# Paths of the arrays of a snapshot written by `save_kb`
+_SNAPSHOT_NODES_PATH = ("graph_data", "nodes")
+_SNAPSHOT_LINKS_PATH = ("graph_data", "links")
+# Other values of a snapshot growing with the KB, decoded item by item by `from_json_stream` too
+_SNAPSHOT_STREAMED_ARRAYS = {
+    ("full_text_index", "lengths"),
+    ("graph_scores", "pagerank"),
+    ("graph_scores", "degree"),
+    ("graph_scores", "relationship_weights"),
+}
+_SNAPSHOT_STREAMED_OBJECTS = {
+    ("graph_data", "graph", "entity_ids_by_type"),
+    ("map_entity_name_to_id",),
+    ("full_text_index", "postings"),
+    ("context_packs",),
+}
+
+
+class Neighborhood(NamedTuple):
+    """Entities reached from a center entity, with their number of hops, and the relationships followed."""
+    entities: Tuple[Tuple[Entity, int], ...]  # The center entity first, then by increasing number of hops
+    relationships: Tuple[Relationship, ...]
+
+
+class ConnectionPath(NamedTuple):
+    """Chain of entities, each one linked to the next by a relationship in either direction."""
+    entities: Tuple[Entity, ...]
+    relationships: Tuple[Relationship, ...]  # One less than the entities
+
+    def describe(self) -> List[str]:
+        """Description of each relationship of the path, or its type between the entity names if undescribed."""
+        descriptions = []
+        for first, second, relationship in zip(self.entities, self.entities[1:], self.relationships):
+            source, target = (first, second) if relationship.source_entity_id == first.id else (second, first)
+            descriptions.append(
+                relationship.description or f"{source.name} {relationship.relationship_type} {target.name}"
+            )
+        return descriptions
+
+
+def _reads(method):
+    """Runs a query of the knowledge base under its read lock."""
+    @functools.wraps(method)
+    def locked_method(self, *args, **kwargs):
+        self.lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_read()
+    return locked_method
+
+
+def _writes(method):
+    """Runs a mutation of the knowledge base under its write lock."""
+    @functools.wraps(method)
+    def locked_method(self, *args, **kwargs):
+        self.lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_write()
+    return locked_method
+
 
 class KnowledgeBase:
-    def __init__(self):
+    """
+    Knowledge graph of the entities of a fandom and their relationships, with its derived indexes.
+
+    It can be shared between threads, e.g. chats reading it while a background task enriches it: queries hold
+    the read lock, so they run concurrently and never see a half applied mutation, and mutations hold the write
+    lock. Several mutations are published at once by holding the write lock around them, see `lock`.
+
+    Query results are cached in `query_cache` until the next mutation, which increments `generation`.
+    """
+
+    def __init__(self, query_cache_size: int = 256, calendar: Calendar = DEFAULT_CALENDAR):
         """
         Initializes the Knowledge Base with an empty directed graph
         and an entity lookup dictionary.
+
+        Args:
+            query_cache_size (int): Maximum number of query results cached, see `query_cache`.
+            calendar (Calendar): Eras in which the dates of the wiki are written, to index the `time_or_period`
+                of its entities and relationships, see `parse_period`. It is saved in the snapshot.
         """
+        self.calendar = calendar
         self.graph = nx.MultiDiGraph()
         self.map_entity_name_to_id: Dict[str, UUID] = {}  # Stores entity objects by their ID (UUID as string)
+        # Entity IDs of each entity type, in insertion order (dictionaries used as ordered sets)
+        self.entity_ids_by_type: Dict[str, Dict[UUID, None]] = {entity_type: {} for entity_type in ENTITY_TYPE_MAP}
+        self.change_log: Optional[ChangeLog] = None  # Records mutations when attached, see `attach_change_log`
+        self.full_text_index: Optional[FullTextIndex] = FullTextIndex()  # None while loading a snapshot
+        self.name_index: Optional[NameIndex] = NameIndex()  # None while loading a snapshot
+        # None while loading a snapshot
+        self.relationship_index: Optional[RelationshipIndex] = RelationshipIndex(calendar)
+        self.entity_periods: Optional[IntervalIndex] = IntervalIndex()  # None while loading a snapshot
+        self.embedder: Embedder = HashingEmbedder()  # See `set_embedder`
+        self.vector_index: Optional[VectorIndex] = None  # Built at the first semantic search
+        # Results of the queries, keyed by the generation of the graph so that a mutation invalidates them all.
+        # Use `query_cache.stats()` to tune its size.
+        self.query_cache = LRUCache(max_size=query_cache_size)
+        self.generation = 0  # Incremented by every mutation of the graph
+        self._graph_positions: Optional[GraphPositions] = None  # Built by the first knowledge mask of the graph
+        self._graph_scores: Optional[GraphScores] = None  # Built when first needed, or restored from the snapshot
+        self._context_packs: Dict[UUID, ContextPack] = {}  # Built when first needed, or restored from the snapshot
+        # Knowledge masks of the characters, kept apart from `query_cache` so that other queries never evict them
+        self._knowledge_masks: Dict[Tuple[UUID, int, int], KnowledgeMask] = {}
+        self.lock = ReadWriteLock()  # Read lock held by queries, write lock by mutations
+        self._lazy_build_lock = threading.Lock()  # Indexes built by a query are built by one reader only
 
+    @_writes
     def add_entity(self, entity: Entity) -> None:
         """
         Adds an entity to the knowledge base.
@@ -32,14 +168,31 @@ class KnowledgeBase:
         if entity.id not in self.graph.nodes:
             self.graph.add_node(entity.id, type=entity.__class__.__name__, entity=entity)
             self.map_entity_name_to_id[entity.name] = entity.id
+            self._on_entity_added(entity)
+            self._record_change(CHANGE_ADD_ENTITY, **_dump_entity(entity))
 
+    @_writes
     def add_entities(self, entities: List[Entity]) -> None:
         """
-        A convenience method to add a list of entities.
+        Adds a list of entities in a single bulk graph insertion.
+
+        Follows the same rules as `add_entity`: already known IDs are skipped.
         """
+        new_entities: Dict[UUID, Entity] = {}
         for entity in entities:
-            self.add_entity(entity)
+            if entity.id not in self.graph.nodes and entity.id not in new_entities:
+                new_entities[entity.id] = entity
 
+        self.graph.add_nodes_from(
+            (entity.id, dict(type=entity.__class__.__name__, entity=entity))
+            for entity in new_entities.values()
+        )
+        self.map_entity_name_to_id.update((entity.name, entity.id) for entity in new_entities.values())
+        for entity in new_entities.values():
+            self._on_entity_added(entity)
+            self._record_change(CHANGE_ADD_ENTITY, **_dump_entity(entity))
+
+    @_writes
     def add_relationship(self, relationship: Relationship) -> None:
         """
         Adds a relationship (edge) to the graph.
@@ -65,8 +218,14 @@ class KnowledgeBase:
         # attributes of later ones might overwrite earlier ones
         # unless we use MultiDiGraph or unique keys for each edge.
         # Let's use relationship.id as the key to allow multiple distinct relationships.
+        previous = self._get_relationship(source_id, target_id, relationship.id)
         self.graph.add_edge(source_id, target_id, key=relationship.id, relationship=relationship)
+        if previous is not None:
+            self._on_relationship_removed(previous)
+        self._on_relationship_added(relationship)
+        self._record_change(CHANGE_ADD_RELATIONSHIP, relationship=relationship.model_dump(mode="json"))
 
+    @_writes
     def add_relationships(self, relationships: List[Relationship]) -> None:
         """
         A convenience method to add a list of relationships.
@@ -74,6 +233,974 @@ class KnowledgeBase:
         for relationship in relationships:
             self.add_relationship(relationship)
 
+    @_writes
+    def update_entity(self, entity: Entity) -> None:
+        """
+        Replaces an entity of the knowledge base by a new version with the same ID.
+
+        Raises:
+            KeyError: If the entity ID is not found in the knowledge base.
+        """
+        if entity.id not in self.graph.nodes:
+            raise KeyError(f"Entity id {entity.id} not found in KB.")
+        node_data = self.graph.nodes[entity.id]
+        previous = node_data["entity"]
+        if self.map_entity_name_to_id.get(previous.name) == entity.id:
+            del self.map_entity_name_to_id[previous.name]
+        node_data.update(type=entity.__class__.__name__, entity=entity)
+        self.map_entity_name_to_id[entity.name] = entity.id
+        self._on_entity_removed(previous)
+        self._on_entity_added(entity)
+        self._record_change(CHANGE_UPDATE_ENTITY, **_dump_entity(entity))
+
+    @_writes
+    def remove_entity(self, entity_id: Union[str, UUID]) -> None:
+        """
+        Removes an entity and all its relationships from the knowledge base.
+        Removing an unknown entity does nothing.
+        """
+        entity_id = UUID(entity_id) if isinstance(entity_id, str) else entity_id
+        if entity_id not in self.graph.nodes:
+            logger.warning(f"Entity id {entity_id} not found in KB. Nothing to remove.")
+            return
+        entity = self.graph.nodes[entity_id].get("entity")
+        if entity is not None and self.map_entity_name_to_id.get(entity.name) == entity_id:
+            del self.map_entity_name_to_id[entity.name]
+        incident_relationships = [
+            relationship
+            for edges in (self.graph.out_edges(entity_id, data="relationship"),
+                          self.graph.in_edges(entity_id, data="relationship"))
+            for _, _, relationship in edges
+        ]
+        self.graph.remove_node(entity_id)
+        for relationship in incident_relationships:
+            self._on_relationship_removed(relationship)
+        if entity is not None:
+            self._on_entity_removed(entity)
+        self._record_change(CHANGE_REMOVE_ENTITY, id=str(entity_id))
+
+    @_writes
+    def update_relationship(self, relationship: Relationship) -> None:
+        """
+        Replaces a relationship of the knowledge base by a new version with the same ID and entities.
+        To link other entities, remove the relationship and add a new one.
+
+        Raises:
+            KeyError: If the relationship is not found between its source and target entities.
+        """
+        source_id, target_id = relationship.source_entity_id, relationship.target_entity_id
+        if not self.graph.has_edge(source_id, target_id, key=relationship.id):
+            raise KeyError(f"Relationship id {relationship.id} not found between {source_id} and {target_id}.")
+        edge_data = self.graph.edges[source_id, target_id, relationship.id]
+        previous, edge_data["relationship"] = edge_data["relationship"], relationship
+        self._on_relationship_removed(previous)
+        self._on_relationship_added(relationship)
+        self._record_change(CHANGE_UPDATE_RELATIONSHIP, relationship=relationship.model_dump(mode="json"))
+
+    @_writes
+    def remove_relationship(self, relationship: Relationship) -> None:
+        """
+        Removes a relationship from the knowledge base. Removing an unknown relationship does nothing.
+        """
+        if not self.graph.has_edge(relationship.source_entity_id, relationship.target_entity_id,
+                                   key=relationship.id):
+            logger.warning(f"Relationship id {relationship.id} not found in KB. Nothing to remove.")
+            return
+        stored = self._get_relationship(relationship.source_entity_id, relationship.target_entity_id,
+                                        relationship.id)
+        self.graph.remove_edge(relationship.source_entity_id, relationship.target_entity_id, key=relationship.id)
+        self._on_relationship_removed(stored)
+        self._record_change(CHANGE_REMOVE_RELATIONSHIP, relationship=relationship.model_dump(mode="json"))
+
+    def _get_relationship(self, source_id: UUID, target_id: UUID, relationship_id: UUID) -> Optional[Relationship]:
+        edge_data = self.graph.get_edge_data(source_id, target_id, key=relationship_id)
+        return edge_data["relationship"] if edge_data is not None else None
+
+    # --- Derived indexes ---
+    # Every mutation of the graph goes through the hooks below to keep the indexes up to date.
+    # Snapshot loaders insert in bulk without them, then restore the indexes at once with `_restore_indexes`.
+
+    def _on_graph_changed(self) -> None:
+        self.generation += 1  # Results cached for the previous generations are never read again, and age out
+        self._graph_positions = None
+        self._graph_scores = None
+        self._context_packs = {}
+        self._knowledge_masks = {}
+
+    def _cache_key(self, query: str, *arguments: Hashable) -> Tuple[Hashable, ...]:
+        """Key of the result of a query in `query_cache`, for the current generation of the graph."""
+        return self.generation, query, *arguments
+
+    def _on_entity_added(self, entity: Entity) -> None:
+        self._on_graph_changed()
+        self.entity_ids_by_type.setdefault(entity.__class__.__name__, {})[entity.id] = None
+        if self.full_text_index is not None:
+            self.full_text_index.add(*_entity_document(entity))
+        if self.name_index is not None:
+            self.name_index.add(entity.id, _entity_names(entity))
+        if self.entity_periods is not None:
+            _index_entity_period(self.entity_periods, entity, self.calendar)
+        if self.vector_index is not None:
+            self.vector_index.add(*_entity_document(entity))
+
+    def _on_entity_removed(self, entity: Entity) -> None:
+        self._on_graph_changed()
+        self.entity_ids_by_type.get(entity.__class__.__name__, {}).pop(entity.id, None)
+        if self.full_text_index is not None:
+            self.full_text_index.remove(entity.id)
+        if self.name_index is not None:
+            self.name_index.remove(entity.id)
+        if self.entity_periods is not None:
+            self.entity_periods.remove(entity.id)
+        if self.vector_index is not None:
+            self.vector_index.remove(entity.id)
+
+    def _on_relationship_added(self, relationship: Relationship) -> None:
+        self._on_graph_changed()
+        if self.full_text_index is not None:
+            self.full_text_index.add(*_relationship_document(relationship))
+        if self.relationship_index is not None:
+            self.relationship_index.add(relationship)
+        if self.vector_index is not None:
+            self.vector_index.add(*_relationship_document(relationship))
+
+    def _on_relationship_removed(self, relationship: Relationship) -> None:
+        self._on_graph_changed()
+        if self.full_text_index is not None:
+            self.full_text_index.remove(relationship.id)
+        if self.relationship_index is not None:
+            self.relationship_index.remove(relationship.id)
+        if self.vector_index is not None:
+            self.vector_index.remove(relationship.id)
+
+    def _restore_indexes(self, snapshot_extras: Dict[str, Any], snapshot_path: Path) -> None:
+        """
+        Restores the derived indexes dumped in a snapshot, or builds them from the graph
+        for snapshots written before they existed.
+        The vectors stored next to the snapshot are restored too, if they match it.
+        """
+        entities = [entity for _, entity in self.graph.nodes(data="entity") if entity is not None]
+        relationships = [relationship for _, _, relationship in self.graph.edges(data="relationship")]
+
+        dumped_full_text_index = snapshot_extras.get("full_text_index")
+        refs = [DocumentRef(entity.id) for entity in entities] + [
+            DocumentRef(relationship.id, relationship.source_entity_id, relationship.target_entity_id)
+            for relationship in relationships
+        ]
+        try:
+            self.full_text_index = FullTextIndex.from_dict(dumped_full_text_index, refs=refs)
+        except (TypeError, KeyError, ValueError):
+            self.full_text_index = FullTextIndex.build(
+                [_entity_document(entity) for entity in entities]
+                + [_relationship_document(relationship) for relationship in relationships]
+            )
+        self.vector_index = VectorIndex.load(VectorIndex.path_for_snapshot(snapshot_path), self.embedder, refs=refs)
+
+        snapshot_header = snapshot_extras.get("graph_data", {}).get("graph", {})
+        self.calendar = Calendar.from_dict(snapshot_header.get("calendar"))
+        dumped_ids_by_type = snapshot_header.get("entity_ids_by_type")
+        try:
+            self.entity_ids_by_type = {
+                entity_type: dict.fromkeys(UUID(entity_id) for entity_id in entity_ids)
+                for entity_type, entity_ids in dumped_ids_by_type.items()
+            }
+            if (sum(map(len, self.entity_ids_by_type.values())) != len(entities)
+                    or not all(entity_id in self.graph.nodes
+                               for entity_ids in self.entity_ids_by_type.values() for entity_id in entity_ids)):
+                raise ValueError("Dumped entity types do not match the entities of the snapshot.")
+        except (AttributeError, TypeError, ValueError):
+            self.entity_ids_by_type = {entity_type: {} for entity_type in ENTITY_TYPE_MAP}
+            for entity in entities:
+                self.entity_ids_by_type.setdefault(entity.__class__.__name__, {})[entity.id] = None
+
+        # Cheap enough to be built at every load rather than dumped
+        self.name_index = NameIndex()
+        for entity in entities:
+            self.name_index.add(entity.id, _entity_names(entity))
+        self._build_period_indexes(entities, relationships)
+        self._graph_scores = GraphScores.from_dict(
+            snapshot_extras.get("graph_scores"),
+            entity_ids=[entity.id for entity in entities],
+            relationship_ids=[relationship.id for relationship in relationships],
+        )
+        self._context_packs = ContextPack.restore_all(
+            snapshot_extras.get("context_packs"), entity_ids=[entity.id for entity in entities],
+        )
+
+    def _build_period_indexes(self, entities: List[Entity], relationships: List[Relationship]) -> None:
+        """Builds the indexes of the relationships and of the periods of the entities, in the calendar of the KB."""
+        self.entity_periods = IntervalIndex.build(
+            (entity.id, interval)
+            for entity in entities if entity.time_or_period is not None
+            for interval in (parse_period(entity.time_or_period, self.calendar),) if interval is not None
+        )
+        self.relationship_index = RelationshipIndex.build(relationships, calendar=self.calendar)
+
+    @_writes
+    def set_calendar(self, calendar: Calendar) -> None:
+        """
+        Replaces the calendar of the knowledge base, e.g. for a snapshot saved without the eras of its wiki,
+        and indexes the periods of its entities and relationships again.
+        """
+        self.calendar = calendar
+        self._build_period_indexes(
+            [entity for _, entity in self.graph.nodes(data="entity") if entity is not None],
+            [relationship for _, _, relationship in self.graph.edges(data="relationship")],
+        )
+        self.generation += 1  # Period query results of the previous calendar are stale
+
+    def _snapshot_document_ids(self) -> List[UUID]:
+        """IDs of the entities, then of the relationships, in the order they are dumped in a snapshot."""
+        return [node for node, entity in self.graph.nodes(data="entity") if entity is not None] + [
+            key for _, _, key in self.graph.edges(keys=True)
+        ]
+
+    def _get_document(self, ref: DocumentRef) -> Optional[Union[Entity, Relationship]]:
+        """The entity or relationship referenced by an index, None if it is not in the graph anymore."""
+        if ref.is_relationship:
+            return self._get_relationship(ref.source_entity_id, ref.target_entity_id, ref.id)
+        return self.graph.nodes[ref.id].get("entity") if ref.id in self.graph.nodes else None
+
+    @_reads
+    def get_entities_by_type(self, entity_type: Union[str, type[Entity]]) -> List[Entity]:
+        """
+        Retrieve all the entities of a type, in the order they were added.
+
+        Entities are listed from a per-type index, so the cost only depends on the number of returned entities.
+
+        Args:
+            entity_type (Union[str, type[Entity]]): The entity class or its name, e.g. "Character" or `Place`.
+
+        Returns:
+            List[Entity]: The entities of this type, empty for an unknown type.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> [character.name for character in kb.get_entities_by_type("Character")][:2]
+            ['Hari Seldon', 'Gaal Dornick']
+        """
+        type_name = entity_type if isinstance(entity_type, str) else entity_type.__name__
+        nodes = self.graph.nodes
+        return [nodes[entity_id]["entity"] for entity_id in self.entity_ids_by_type.get(type_name, ())]
+
+    @_reads
+    def find_relationships(
+            self,
+            relationship_type: Optional[str] = None,
+            min_depth: Optional[int] = None,
+            max_depth: Optional[int] = None,
+            period: Optional[Union[str, Interval]] = None,
+    ) -> List[Relationship]:
+        """
+        Retrieve the relationships matching all the given filters, from secondary indexes rather than an edge scan.
+
+        Args:
+            relationship_type (Optional[str]): The type of the relationships, e.g. "FAMILY_OF".
+            min_depth (Optional[int]): Minimum depth, relationships without depth are then excluded.
+            max_depth (Optional[int]): Maximum depth, relationships without depth are then excluded.
+            period (Optional[Union[str, Interval]]): Period overlapping the `time_or_period` of the relationships,
+                as a text like "12,000-12,100 GE" or an interval of years, see `parse_period`.
+
+        Returns:
+            List[Relationship]: The matching relationships.
+
+        Raises:
+            ValueError: If the period text contains no year.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> kb.find_relationships(relationship_type="FAMILY_OF", min_depth=5)
+            [<Relationship id='...' source='...' target='...' type='FAMILY_OF' depth='5'>]
+        """
+        cache_key = self._cache_key("find_relationships", relationship_type, min_depth, max_depth, period)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        relationships = self.relationship_index.find(
+            relationship_type=relationship_type,
+            min_depth=min_depth,
+            max_depth=max_depth,
+            period=_as_interval(period, self.calendar) if period is not None else None,
+        )
+        self.query_cache.put(cache_key, tuple(relationships))
+        return relationships
+
+    @_reads
+    def find_entities_in_period(
+            self, period: Union[str, Interval], entity_type: Optional[Union[str, type[Entity]]] = None,
+    ) -> List[Entity]:
+        """
+        Retrieve the entities whose `time_or_period` overlaps a period, ordered by their start.
+
+        Args:
+            period (Union[str, Interval]): A text like "12,000-12,100 GE" or an interval of years, see `parse_period`.
+            entity_type (Optional[Union[str, type[Entity]]]): Only return entities of this type, e.g. `Event`.
+
+        Returns:
+            List[Entity]: The entities placed in the period.
+
+        Raises:
+            ValueError: If the period text contains no year.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> kb.find_entities_in_period("12,060-12,070 GE", entity_type="Event")
+            [<Event id='...' name='Trial of Hari Seldon'>]
+        """
+        cache_key = self._cache_key("find_entities_in_period", period, entity_type)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        nodes = self.graph.nodes
+        entity_ids = self.entity_periods.overlapping(*_as_interval(period, self.calendar))
+        entities = [nodes[entity_id]["entity"] for entity_id in entity_ids]
+        if entity_type is not None:
+            type_name = entity_type if isinstance(entity_type, str) else entity_type.__name__
+            entities = [entity for entity in entities if entity.__class__.__name__ == type_name]
+        self.query_cache.put(cache_key, tuple(entities))
+        return entities
+
+    @_reads
+    def search(self, text: str, k: int = 10) -> List[Tuple[Union[Entity, Relationship], float]]:
+        """
+        Full-text search over the names and descriptions of entities and the descriptions of relationships.
+
+        Args:
+            text (str): Free text query, e.g. "psychohistory equations".
+            k (int): Maximum number of results.
+
+        Returns:
+            List[Tuple[Union[Entity, Relationship], float]]: Matching entities and relationships
+                with their BM25 score, best first.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> kb.search("capital of the Empire", k=2)
+            [(<Place id='...' name='Trantor'>, 7.1), (<Relationship id='...' type='MISC' ...>, 5.4)]
+        """
+        cache_key = self._cache_key("search", text, k)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        results = []
+        for ref, score in self.full_text_index.search(text, k=k):
+            item = self._get_document(ref)
+            if item is not None:
+                results.append((item, score))
+        self.query_cache.put(cache_key, tuple(results))
+        return results
+
+    @_reads
+    def semantic_search(self, text: str, k: int = 10) -> List[Tuple[Union[Entity, Relationship], float]]:
+        """
+        Vector search over the entities and relationships, ranked by the cosine similarity of their embedding
+        with the embedding of the query, see `set_embedder`.
+
+        The vectors are computed at the first call, then kept up to date by the mutations of the knowledge base
+        and saved next to the snapshot by `save_kb`.
+
+        Args:
+            text (str): Free text query, e.g. "what happened on Trantor?".
+            k (int): Maximum number of results.
+
+        Returns:
+            List[Tuple[Union[Entity, Relationship], float]]: The most similar entities and relationships
+                with their similarity, best first.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> kb.semantic_search("what happened on Trantor?", k=2)
+            [(<Place id='...' name='Trantor'>, 0.41), (<Event id='...' name='Sack of Trantor'>, 0.33)]
+        """
+        cache_key = self._cache_key("semantic_search", text, k)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        with self._lazy_build_lock:
+            if self.vector_index is None:
+                entities = [entity for _, entity in self.graph.nodes(data="entity") if entity is not None]
+                relationships = [relationship for _, _, relationship in self.graph.edges(data="relationship")]
+                self.vector_index = VectorIndex.build(
+                    [_entity_document(entity) for entity in entities]
+                    + [_relationship_document(relationship) for relationship in relationships],
+                    embedder=self.embedder,
+                )
+        results = []
+        for ref, score in self.vector_index.search(text, k=k):
+            item = self._get_document(ref)
+            if item is not None:
+                results.append((item, score))
+        self.query_cache.put(cache_key, tuple(results))
+        return results
+
+    @_writes
+    def set_embedder(self, embedder: Embedder) -> None:
+        """
+        Replaces the embedding function of `semantic_search`, e.g. with a sentence embedding model.
+        The vectors are computed again at the next semantic search.
+
+        Args:
+            embedder (Embedder): Function mapping a list of texts to a (number of texts, dimension) array.
+                Its `name` attribute, if any, identifies the vectors saved next to a snapshot.
+        """
+        self.embedder = embedder
+        self.vector_index = None
+        self.generation += 1  # Semantic search results of the previous embedder are stale
+
+    @_reads
+    def resolve_name(self, query: str, max_results: int = 5) -> List[Tuple[Entity, str, float]]:
+        """
+        Find the entities whose name or alias is the closest to a possibly misspelled name.
+
+        Args:
+            query (str): The approximate name, e.g. "Hary Seldom".
+            max_results (int): Maximum number of candidates.
+
+        Returns:
+            List[Tuple[Entity, str, float]]: Candidate entities with their matching name or alias
+                and a similarity between 0 and 1, most similar first.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> kb.resolve_name("Hary Seldom", max_results=1)
+            [(<Character id='...' name='Hari Seldon'>, 'Hari Seldon', 0.5)]
+        """
+        cache_key = self._cache_key("resolve_name", query, max_results)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        candidates = [
+            (self.graph.nodes[entity_id]["entity"], name, score)
+            for entity_id, name, score in self.name_index.resolve(query, max_results=max_results)
+        ]
+        self.query_cache.put(cache_key, tuple(candidates))
+        return candidates
+
+    # --- Graph queries ---
+
+    @_reads
+    def _resolve_entity_id(self, entity: Union[Entity, UUID, str]) -> UUID:
+        """
+        ID of an entity given as an entity, an ID, or a name (or the string of an ID).
+
+        Raises:
+            KeyError: If the entity is not found in the knowledge base.
+        """
+        if isinstance(entity, Entity):
+            entity_id = entity.id
+        elif isinstance(entity, UUID):
+            entity_id = entity
+        elif entity in self.map_entity_name_to_id:
+            entity_id = self.map_entity_name_to_id[entity]
+        else:
+            try:
+                entity_id = UUID(entity)
+            except ValueError:
+                return self.get_entity_by_name(entity).id  # Raises a KeyError suggesting close names
+        if entity_id not in self.graph.nodes:
+            raise KeyError(f"Entity id {entity_id} not found in KB.")
+        return entity_id
+
+    def _incident_relationships(
+            self,
+            entity_id: UUID,
+            relationship_types: Optional[frozenset] = None,
+            min_depth: Optional[int] = None,
+    ) -> List[Relationship]:
+        """
+        Outgoing and incoming relationships of an entity, deepest first, among the given types and
+        with a depth of at least `min_depth` if given.
+        """
+        relationships = [
+            data["relationship"]
+            for adjacency in (self.graph.succ[entity_id], self.graph.pred[entity_id])
+            for key_dict in adjacency.values()
+            for data in key_dict.values()
+        ]
+        if relationship_types is not None:
+            relationships = [r for r in relationships if r.relationship_type in relationship_types]
+        if min_depth is not None:
+            relationships = [r for r in relationships if r.depth is not None and r.depth >= min_depth]
+        relationships.sort(key=lambda r: r.depth if r.depth is not None else -1, reverse=True)
+        return relationships
+
+    @_reads
+    def neighborhood(
+            self,
+            entity: Union[Entity, UUID, str],
+            hops: int = 1,
+            relationship_types: Optional[Iterable[str]] = None,
+            min_depth: Optional[int] = None,
+            max_nodes: int = 50,
+    ) -> Neighborhood:
+        """
+        Collects the entities around an entity, up to a number of hops, following relationships in both directions.
+
+        The graph is explored breadth first, so the closest entities are kept when `max_nodes` is reached,
+        and the deepest relationships of an entity are followed first.
+        Results are cached until the next mutation of the knowledge base.
+
+        Args:
+            entity (Union[Entity, UUID, str]): The center entity, its ID or its name.
+            hops (int): Maximum number of relationships between the center and a returned entity.
+            relationship_types (Optional[Iterable[str]]): Only follow relationships of these types, e.g. ["KNOWS"].
+            min_depth (Optional[int]): Only follow relationships with a depth of at least this value.
+            max_nodes (int): Maximum number of returned entities, the center included.
+
+        Returns:
+            Neighborhood: The reached entities with their number of hops, and the relationships between them.
+
+        Raises:
+            KeyError: If the entity is not found in the knowledge base.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> neighborhood = kb.neighborhood("Gaal Dornick", hops=2, relationship_types=["KNOWS"])
+            >>> [(entity.name, hops) for entity, hops in neighborhood.entities]
+            [('Gaal Dornick', 0), ('Hari Seldon', 1), ('Yugo Amaryl', 2)]
+        """
+        center_id = self._resolve_entity_id(entity)
+        relationship_types = frozenset(relationship_types) if relationship_types is not None else None
+        cache_key = self._cache_key("neighborhood", center_id, hops, relationship_types, min_depth, max_nodes)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        hops_by_id = {center_id: 0}
+        relationships: Dict[UUID, Relationship] = {}
+        frontier = [center_id]
+        for hop in range(1, hops + 1):
+            next_frontier = []
+            for entity_id in frontier:
+                for relationship in self._incident_relationships(entity_id, relationship_types, min_depth):
+                    other_id = (relationship.target_entity_id if relationship.source_entity_id == entity_id
+                                else relationship.source_entity_id)
+                    if other_id not in hops_by_id:
+                        if len(hops_by_id) >= max_nodes:
+                            continue
+                        hops_by_id[other_id] = hop
+                        next_frontier.append(other_id)
+                    relationships[relationship.id] = relationship
+            frontier = next_frontier
+            if not frontier:
+                break
+
+        nodes = self.graph.nodes
+        result = Neighborhood(
+            entities=tuple(
+                (nodes[entity_id]["entity"], hop)
+                for entity_id, hop in hops_by_id.items()
+                if nodes[entity_id].get("entity") is not None  # Bare nodes added by dangling relationships
+            ),
+            relationships=tuple(relationships.values()),
+        )
+        self.query_cache.put(cache_key, result)
+        return result
+
+    @_reads
+    def explain_connection(
+            self,
+            entity_a: Union[Entity, UUID, str],
+            entity_b: Union[Entity, UUID, str],
+            max_len: int = 4,
+            max_paths: int = 3,
+            max_visited: int = 10_000,
+    ) -> List[ConnectionPath]:
+        """
+        Finds the shortest paths of relationships, in either direction, linking two entities.
+
+        The graph is explored with a bidirectional breadth-first search, growing the smaller frontier first,
+        and the search stops once the paths would be longer than `max_len` or once `max_visited` entities
+        have been reached, which bounds its cost on densely connected entities.
+        Results are cached until the next mutation of the knowledge base.
+
+        Args:
+            entity_a (Union[Entity, UUID, str]): The first entity, its ID or its name.
+            entity_b (Union[Entity, UUID, str]): The second entity, its ID or its name.
+            max_len (int): Maximum number of relationships of a path.
+            max_paths (int): Maximum number of returned paths, all of them having the shortest length.
+            max_visited (int): Maximum number of entities reached by the search before giving up.
+
+        Returns:
+            List[ConnectionPath]: Paths from `entity_a` to `entity_b`, empty if no path was found within the limits.
+
+        Raises:
+            KeyError: If an entity is not found in the knowledge base.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> paths = kb.explain_connection("Gaal Dornick", "Trantor")
+            >>> paths[0].describe()
+            ['Gaal Dornick was recruited by Hari Seldon.', 'Hari Seldon lived on Trantor.']
+        """
+        id_a, id_b = self._resolve_entity_id(entity_a), self._resolve_entity_id(entity_b)
+        cache_key = self._cache_key("explain_connection", id_a, id_b, max_len, max_paths, max_visited)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        nodes = self.graph.nodes
+        if id_a == id_b:
+            paths = [ConnectionPath(entities=(nodes[id_a]["entity"],), relationships=())]
+        else:
+            paths = [
+                ConnectionPath(
+                    entities=tuple(nodes[entity_id]["entity"] for entity_id in entity_ids),
+                    relationships=tuple(relationships),
+                )
+                for entity_ids, relationships in itertools.islice(
+                    self._shortest_connections(id_a, id_b, max_len, max_visited), max_paths
+                )
+            ]
+        self.query_cache.put(cache_key, tuple(paths))
+        return paths
+
+    def _shortest_connections(
+            self, id_a: UUID, id_b: UUID, max_len: int, max_visited: int,
+    ) -> Iterator[Tuple[List[UUID], List[Relationship]]]:
+        """Yields the shortest paths between two different entities, as their entity IDs and relationships."""
+        # For each side: the distance of every reached entity, and the relationships reaching it at that distance
+        distances = ({id_a: 0}, {id_b: 0})
+        parents: Tuple[Dict[UUID, List[Tuple[Relationship, UUID]]], ...] = ({id_a: []}, {id_b: []})
+        frontiers = ([id_a], [id_b])
+        depths = [0, 0]
+        meeting_ids: List[UUID] = []
+        while not meeting_ids:
+            if depths[0] + depths[1] >= max_len or not frontiers[0] or not frontiers[1]:
+                return
+            if len(distances[0]) + len(distances[1]) > max_visited:
+                logger.warning(f"Connection search between {id_a} and {id_b} stopped after {max_visited} entities.")
+                return
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            side_distances, side_parents, other_distances = distances[side], parents[side], distances[1 - side]
+            depths[side] += 1
+            next_frontier = []
+            for entity_id in frontiers[side]:
+                for relationship in self._incident_relationships(entity_id):
+                    other_id = (relationship.target_entity_id if relationship.source_entity_id == entity_id
+                                else relationship.source_entity_id)
+                    if other_id not in side_distances:
+                        side_distances[other_id] = depths[side]
+                        side_parents[other_id] = [(relationship, entity_id)]
+                        next_frontier.append(other_id)
+                    elif side_distances[other_id] == depths[side]:  # Another shortest way to this entity
+                        side_parents[other_id].append((relationship, entity_id))
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+            meeting_ids = [entity_id for entity_id in next_frontier if entity_id in other_distances]
+
+        for meeting_id in meeting_ids:
+            for ids_from_a, relationships_from_a in _walk_back(parents[0], meeting_id):
+                for ids_from_b, relationships_from_b in _walk_back(parents[1], meeting_id):
+                    yield (
+                        ids_from_a[::-1] + ids_from_b[1:],
+                        relationships_from_a[::-1] + relationships_from_b,
+                    )
+
+    @property
+    @_reads
+    def graph_scores(self) -> GraphScores:
+        """
+        PageRank and degree centrality of the entities, and weights of the relationships, see `GraphScores`.
+        They are saved in the snapshot, and computed again when needed after a mutation.
+        """
+        with self._lazy_build_lock:
+            if self._graph_scores is None:
+                self._graph_scores = GraphScores.build(
+                    [entity_id for entity_id, entity in self.graph.nodes(data="entity") if entity is not None],
+                    [relationship for _, _, relationship in self.graph.edges(data="relationship")],
+                )
+            return self._graph_scores
+
+    @_reads
+    def top_relationships(
+            self,
+            entity: Union[Entity, UUID, str],
+            k: Optional[int] = 10,
+            relationship_types: Optional[Iterable[str]] = None,
+            min_depth: Optional[int] = None,
+    ) -> List[Tuple[Relationship, float]]:
+        """
+        Retrieve the most important relationships of an entity, in both directions.
+
+        A relationship is important when it is one of many links between the two entities, more so when
+        they link to each other, and when the other entity is central in the graph, see `GraphScores.importance`.
+        It helps picking the relationships that matter among the hundreds of links of a popular character.
+
+        Args:
+            entity (Union[Entity, UUID, str]): The entity, its ID or its name.
+            k (Optional[int]): Maximum number of relationships, all of them if None.
+            relationship_types (Optional[Iterable[str]]): Only return relationships of these types, e.g. ["KNOWS"].
+            min_depth (Optional[int]): Only return relationships with a depth of at least this value.
+
+        Returns:
+            List[Tuple[Relationship, float]]: The relationships with their importance, most important first.
+                Relationships of equal importance are ordered by decreasing depth.
+
+        Raises:
+            KeyError: If the entity is not found in the knowledge base.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> [r.description for r, _ in kb.top_relationships("Hari Seldon", k=2)]
+            ['Hari Seldon recruited Gaal Dornick.', 'Hari Seldon developed psychohistory on Trantor.']
+        """
+        entity_id = self._resolve_entity_id(entity)
+        relationships = self.relationships_for(
+            [entity_id], relationship_types=relationship_types, min_depth=min_depth,
+        )[entity_id]
+        scores = self.graph_scores
+        ranked = [(relationship, scores.importance(relationship, entity_id)) for relationship in relationships]
+        ranked.sort(key=lambda item: item[1], reverse=True)  # Stable, so the deepest first on equal importance
+        return ranked[:k] if k is not None else ranked
+
+    @_reads
+    def context_pack(self, entity: Union[Entity, UUID, str]) -> ContextPack:
+        """
+        Compact context of a character for the prompt of the agent playing them, see `ContextPack`.
+
+        Packs of the characters are saved in the snapshot, so getting one is a dictionary lookup.
+        After a mutation, they are built again when requested, one by one.
+
+        Args:
+            entity (Union[Entity, UUID, str]): The character (or any entity), its ID or its name.
+
+        Returns:
+            ContextPack: Summary, aliases, and most important relationships, places and events of the entity.
+
+        Raises:
+            KeyError: If the entity is not found in the knowledge base.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> print(kb.context_pack("Gaal Dornick").to_text())
+            Gaal Dornick.
+            Gaal Dornick is a young mathematician from Synnax.
+            Relationships:
+            - Gaal Dornick was recruited by Hari Seldon.
+        """
+        entity_id = self._resolve_entity_id(entity)
+        pack = self._context_packs.get(entity_id)
+        if pack is None:  # Built without the lazy build lock, as ranking the relationships takes it
+            ranked_relationships = [relationship for relationship, _ in self.top_relationships(entity_id, k=None)]
+            linked_entities = self.get_entities_by_ids({
+                linked_id
+                for relationship in ranked_relationships
+                for linked_id in (relationship.source_entity_id, relationship.target_entity_id)
+            })
+            pack = ContextPack.build(self.graph.nodes[entity_id]["entity"], ranked_relationships, linked_entities)
+            self._context_packs[entity_id] = pack
+        return pack
+
+    @_reads
+    def knowledge_of(
+            self,
+            character: Union[Entity, UUID, str],
+            max_hops: int = 2,
+            min_depth: int = 5,
+    ) -> KnowledgeMask:
+        """
+        Computes what a character can know of the knowledge base, as bitsets over the entities and relationships.
+
+        A character knows their own relationships and the entities they lead to. Beyond the first hop, knowledge
+        only spreads through relationships with a depth of at least `min_depth`, e.g. close friends or family
+        telling about their own acquaintances, up to `max_hops` relationships away.
+        Masks are kept until the next mutation of the knowledge base, apart from `query_cache`.
+
+        Args:
+            character (Union[Entity, UUID, str]): The character, their ID or their name.
+            max_hops (int): Maximum number of relationships between the character and a known entity.
+            min_depth (int): Minimum depth of the relationships followed beyond the first hop.
+
+        Returns:
+            KnowledgeMask: The entities and relationships known by the character.
+
+        Raises:
+            KeyError: If the character is not found in the knowledge base.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> mask = kb.knowledge_of("Gaal Dornick")
+            >>> mask.filter_entities(kb.get_entities_by_type("Character"))
+            [<Character id='...' name='Gaal Dornick'>, <Character id='...' name='Hari Seldon'>]
+        """
+        character_id = self._resolve_entity_id(character)
+        mask_key = (character_id, max_hops, min_depth)
+        mask = self._knowledge_masks.get(mask_key)
+        if mask is not None:
+            return mask
+
+        known_entity_ids = {character_id}
+        known_relationship_ids = set()
+        frontier = [character_id]
+        for hop in range(1, max_hops + 1):
+            next_frontier = []
+            for entity_id in frontier:
+                for relationship in self._incident_relationships(entity_id, min_depth=min_depth if hop > 1 else None):
+                    known_relationship_ids.add(relationship.id)
+                    other_id = (relationship.target_entity_id if relationship.source_entity_id == entity_id
+                                else relationship.source_entity_id)
+                    if other_id not in known_entity_ids:
+                        known_entity_ids.add(other_id)
+                        next_frontier.append(other_id)
+            frontier = next_frontier
+
+        with self._lazy_build_lock:
+            if self._graph_positions is None:
+                self._graph_positions = GraphPositions(
+                    self.graph.nodes, (key for _, _, key in self.graph.edges(keys=True))
+                )
+            positions = self._graph_positions
+        mask = KnowledgeMask(
+            positions,
+            entity_bits=positions.bitset(positions.entity_positions, known_entity_ids),
+            relationship_bits=positions.bitset(positions.relationship_positions, known_relationship_ids),
+        )
+        self._knowledge_masks[mask_key] = mask
+        return mask
+
+    def scoped_to(self, character: Union[Entity, UUID, str], **knowledge_kwargs: Any) -> KnowledgeView:
+        """
+        Read-only view of the knowledge base filtering every query through the knowledge of a character,
+        see `knowledge_of` for the keyword arguments.
+        """
+        return KnowledgeView(self, character, **knowledge_kwargs)
+
+    @_writes
+    def attach_change_log(self, change_log: ChangeLog) -> None:
+        """
+        Records every following mutation of the knowledge base in the given change log.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")  # Replays the pending changes
+            >>> kb.attach_change_log(ChangeLog.for_snapshot("kb_asimov.json.gz"))
+            >>> kb.update_entity(enriched_entity)  # Appends one line to kb_asimov.changes.jsonl
+        """
+        self.change_log = change_log
+
+    def _record_change(self, operation: str, **payload: Any) -> None:
+        if self.change_log is not None:
+            self.change_log.append(operation, payload)
+
+    @_writes
+    def replay_changes(self, change_log: ChangeLog) -> None:
+        """
+        Applies the changes of a change log, in order. They are not recorded again.
+
+        Replaying is idempotent: additions of known IDs are skipped, updates of unknown IDs become additions
+        and removals of unknown IDs are ignored.
+        """
+        attached_log, self.change_log = self.change_log, None
+        try:
+            for change in change_log:
+                self._apply_change(change)
+        finally:
+            self.change_log = attached_log
+
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        operation = change["op"]
+        if operation == CHANGE_ADD_ENTITY:
+            self.add_entity(_validate_entity(change))
+        elif operation == CHANGE_UPDATE_ENTITY:
+            entity = _validate_entity(change)
+            if entity.id in self.graph.nodes:
+                self.update_entity(entity)
+            else:  # Removed later in the log, after a compaction that was not finished
+                self.add_entity(entity)
+        elif operation == CHANGE_REMOVE_ENTITY:
+            self.remove_entity(change["id"])
+        elif operation == CHANGE_ADD_RELATIONSHIP:
+            relationship = Relationship.model_validate(change["relationship"])
+            if not self.graph.has_edge(relationship.source_entity_id, relationship.target_entity_id,
+                                       key=relationship.id):
+                self.add_relationship(relationship)
+        elif operation == CHANGE_UPDATE_RELATIONSHIP:
+            relationship = Relationship.model_validate(change["relationship"])
+            if self.graph.has_edge(relationship.source_entity_id, relationship.target_entity_id,
+                                   key=relationship.id):
+                self.update_relationship(relationship)
+            else:  # Removed later in the log, after a compaction that was not finished
+                self.add_relationship(relationship)
+        elif operation == CHANGE_REMOVE_RELATIONSHIP:
+            self.remove_relationship(Relationship.model_validate(change["relationship"]))
+        else:
+            raise ValueError(f"Unknown change operation '{operation}'.")
+
+    @classmethod
+    def compact(cls, snapshot_path: Union[str, Path]) -> 'KnowledgeBase':
+        """
+        Folds the change log of a snapshot into a new snapshot, then empties the change log.
+
+        The new snapshot is written next to the previous one and then moved over it, and the log is only
+        cleared afterward. If the compaction is interrupted in between, replaying the log on the new snapshot
+        gives the same result, as replaying is idempotent.
+
+        Args:
+            snapshot_path (Union[str, Path]): Path to a snapshot written by `save_kb`, gzipped or not.
+
+        Returns:
+            KnowledgeBase: The up-to-date knowledge base.
+        """
+        snapshot_path = Path(snapshot_path)
+        change_log = ChangeLog.for_snapshot(snapshot_path)
+        kb = cls.from_json_stream(snapshot_path, trusted=True)
+        if not change_log.exists():
+            return kb
+
+        name = snapshot_path.name.removesuffix(".gz").removesuffix(".json")
+        written_path = kb._write_snapshot(
+            snapshot_path.with_name(f"{name}.compacting.json"),
+            compress=snapshot_path.suffix == ".gz",
+        )
+        # Vectors first: if interrupted, they do not match the previous snapshot anymore and are computed again
+        written_vectors_path = VectorIndex.path_for_snapshot(written_path)
+        if written_vectors_path.exists():
+            os.replace(written_vectors_path, VectorIndex.path_for_snapshot(snapshot_path))
+        os.replace(written_path, snapshot_path)
+        change_log.clear()
+        print(f"KnowledgeBase changes compacted into {snapshot_path}")
+        return kb
+
+    def _bulk_insert_entities(self, entities: List[Entity]) -> None:
+        """
+        Inserts trusted entities without any check. Entities must have unique IDs unknown to the graph.
+        """
+        self.graph.add_nodes_from(
+            (entity.id, dict(type=entity.__class__.__name__, entity=entity)) for entity in entities
+        )
+        self.map_entity_name_to_id.update((entity.name, entity.id) for entity in entities)
+
+    def _bulk_insert_relationships(self, relationships: List[Relationship]) -> None:
+        """
+        Inserts trusted relationships without any check. Relationships must link entities of the graph.
+
+        Edges are added in a single `add_edges_from` call, with their keys, skipping the checks of `add_relationship`.
+        """
+        self.graph.add_edges_from(
+            (relationship.source_entity_id, relationship.target_entity_id, relationship.id,
+             {"relationship": relationship})
+            for relationship in relationships
+        )
+
+    def _load_dumped_nodes(self, dumped_nodes: List[Dict[str, Any]], trusted: bool) -> None:
+        """Adds entities from nodes dumped by `save_kb`, see `from_json` for the `trusted` option."""
+        if trusted:
+            self._bulk_insert_entities(_validate_entities_in_batch(dumped_nodes))
+        else:
+            self.add_entities(entities=[_validate_entity(dumped_node) for dumped_node in dumped_nodes])
+
+    def _load_dumped_links(self, dumped_links: List[Dict[str, Any]], trusted: bool) -> None:
+        """Adds relationships from links dumped by `save_kb`, see `from_json` for the `trusted` option."""
+        if trusted:
+            self._bulk_insert_relationships(_RELATIONSHIP_LIST_ADAPTER.validate_python(
+                [dumped_link["relationship"] for dumped_link in dumped_links]
+            ))
+        else:
+            self.add_relationships(relationships=[
+                Relationship.model_validate(dumped_link["relationship"])
+                for dumped_link in dumped_links
+            ])
+
+    @_reads
     def get_entity_by_id(self, entity_id: Union[str, UUID]) -> Optional[Entity]:
         """
         Retrieve an entity object from the knowledge base using its unique identifier.
@@ -102,6 +1229,7 @@ class KnowledgeBase:
         entity_id = UUID(entity_id) if isinstance(entity_id, str) else entity_id
         return self.graph.nodes.get(entity_id)
 
+    @_reads
     def get_entity_by_name(self, name: str) -> Entity | None:
         """
         Retrieve an entity object from the knowledge base using its name.
@@ -116,7 +1244,8 @@ class KnowledgeBase:
             Entity | None: The entity object if found, otherwise None.
 
         Raises:
-            KeyError: If the entity name is not found in the knowledge base.
+            KeyError: If the entity name is not found in the knowledge base. The message suggests
+                the closest names, see `resolve_name`.
 
         Example:
             >>> kb = KnowledgeBase()
@@ -130,10 +1259,121 @@ class KnowledgeBase:
             }
         """
         if name not in self.map_entity_name_to_id:
-            raise KeyError(f"Entity name '{name}' not found in KB.")
+            candidates = [candidate_name for _, candidate_name, _ in self.resolve_name(name, max_results=3)]
+            suggestion = f" Did you mean one of {candidates}?" if candidates else ""
+            raise KeyError(f"Entity name '{name}' not found in KB.{suggestion}")
         entity_id = self.map_entity_name_to_id.get(name)
         return self.graph.nodes.get(entity_id).get("entity")
 
+    # --- Batch lookups ---
+    # They resolve a whole list in one call and leave out what is not found, rather than raising on the first miss.
+
+    @_reads
+    def get_entities_by_names(self, names: Iterable[str]) -> Dict[str, Entity]:
+        """
+        Retrieve several entities by their exact names.
+
+        Args:
+            names (Iterable[str]): The names of the entities.
+
+        Returns:
+            Dict[str, Entity]: The entity of each name found, in the order of the names. Unknown names are left out,
+                see `resolve_name` to find the closest names.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> kb.get_entities_by_names(["Hari Seldon", "Trantor", "Hary Seldom"])
+            {'Hari Seldon': <Character id='...' name='Hari Seldon'>, 'Trantor': <Place id='...' name='Trantor'>}
+        """
+        nodes, name_to_id = self.graph.nodes, self.map_entity_name_to_id
+        entities = {}
+        for name in names:
+            entity_id = name_to_id.get(name)
+            if entity_id is not None:
+                entities[name] = nodes[entity_id]["entity"]
+        return entities
+
+    @_reads
+    def get_entities_by_ids(self, entity_ids: Iterable[Union[str, UUID]]) -> Dict[UUID, Entity]:
+        """
+        Retrieve several entities by their IDs, given as UUID objects or strings.
+
+        Args:
+            entity_ids (Iterable[Union[str, UUID]]): The IDs of the entities.
+
+        Returns:
+            Dict[UUID, Entity]: The entity of each ID found, in the order of the IDs.
+                Unknown and malformed IDs are left out.
+        """
+        nodes = self.graph.nodes
+        entities = {}
+        for entity_id in entity_ids:
+            if isinstance(entity_id, str):
+                try:
+                    entity_id = UUID(entity_id)
+                except ValueError:
+                    continue
+            node_data = nodes.get(entity_id)
+            if node_data is not None and node_data.get("entity") is not None:
+                entities[entity_id] = node_data["entity"]
+        return entities
+
+    @_reads
+    def relationships_for(
+            self,
+            entities: Iterable[Union[Entity, UUID, str]],
+            relationship_types: Optional[Iterable[str]] = None,
+            min_depth: Optional[int] = None,
+    ) -> Dict[UUID, List[Relationship]]:
+        """
+        Retrieve the relationships of several entities, in both directions.
+        The relationships of each entity are cached until the next mutation of the knowledge base.
+
+        Args:
+            entities (Iterable[Union[Entity, UUID, str]]): The entities, their IDs or their names.
+            relationship_types (Optional[Iterable[str]]): Only return relationships of these types, e.g. ["KNOWS"].
+            min_depth (Optional[int]): Only return relationships with a depth of at least this value.
+
+        Returns:
+            Dict[UUID, List[Relationship]]: The relationships of each entity found, keyed by entity ID in the order
+                of the entities, the deepest relationships first. Unknown entities are left out.
+
+        Example:
+            >>> kb = KnowledgeBase.from_json("kb_asimov.json.gz")
+            >>> relationships = kb.relationships_for(["Gaal Dornick", "Hari Seldon"], relationship_types=["KNOWS"])
+            >>> [len(entity_relationships) for entity_relationships in relationships.values()]
+            [3, 12]
+        """
+        relationship_types = frozenset(relationship_types) if relationship_types is not None else None
+        relationships = {}
+        for entity in entities:
+            entity_id = self._find_entity_id(entity)
+            if entity_id is None or entity_id in relationships:
+                continue
+            cache_key = self._cache_key("relationships_for", entity_id, relationship_types, min_depth)
+            cached = self.query_cache.get(cache_key)
+            if cached is None:
+                cached = tuple(self._incident_relationships(entity_id, relationship_types, min_depth))
+                self.query_cache.put(cache_key, cached)
+            relationships[entity_id] = list(cached)
+        return relationships
+
+    def _find_entity_id(self, entity: Union[Entity, UUID, str]) -> Optional[UUID]:
+        """Same as `_resolve_entity_id`, but returns None for an unknown entity instead of suggesting names."""
+        if isinstance(entity, Entity):
+            entity_id = entity.id
+        elif isinstance(entity, UUID):
+            entity_id = entity
+        else:
+            entity_id = self.map_entity_name_to_id.get(entity)
+            if entity_id is None:
+                try:
+                    entity_id = UUID(entity)
+                except ValueError:
+                    return None
+        return entity_id if entity_id in self.graph.nodes else None
+
+    @_reads
     def get_node_attributes(self, entity_id: Union[str, UUID]) -> Dict[str, Any]:
         """
         Retrieve the attributes of a node (entity) from the graph.
@@ -165,6 +1405,7 @@ class KnowledgeBase:
         else:
             raise KeyError(f"Entity id {entity_id} not found in KB.")
 
+    @_reads
     def get_edge_attributes(self, source_id: Union[str, UUID], target_id: Union[str, UUID],
                             relationship_id: Union[str, UUID]) -> Optional[Mapping[str, Any]]:
         """
@@ -203,6 +1444,7 @@ class KnowledgeBase:
             return self.graph.get_edge_data(source_id_str, target_id_str, key=rel_id_str)
         return None
 
+    @_reads
     def get_all_edges_between(
             self,
             source_id: Union[str, UUID],
@@ -249,71 +1491,220 @@ class KnowledgeBase:
         else:
             raise ValueError(f"No edges between {source_id} and {target_id} found in KB.")
 
+    @_reads
     def save_kb(self, file_path: Union[str, Path], compress=True) -> None:
         """
         Saves the knowledge base graph to a JSON file.
+
+        Raises:
+            OSError: If the snapshot cannot be written, e.g. its directory does not exist.
         """
-        file_path_obj = Path(file_path)
-        try:
-            # Preserve current behavior for edges by specifying edges="links"
-            dict_to_dump = dict(
-                graph_data=nx.readwrite.json_graph.node_link_data(self.graph, edges="links"),
-                map_entity_name_to_id=self.map_entity_name_to_id,
-            )
-            if compress:
-                file_path_obj = file_path_obj.with_suffix(".json.gz")
-                with gzip.open(file_path_obj, 'wt', encoding='utf-8') as f:
-                    json.dump(dict_to_dump, f, indent=4, cls=UUIDEncoder)
-            else:
-                with file_path_obj.open('wb') as f:
-                    json.dump(dict_to_dump, f, indent=4, cls=UUIDEncoder)
-            print(f"KnowledgeBase saved to {file_path_obj}")
-
-        except IOError as e:
-            print(f"Error saving KnowledgeBase to {file_path_obj}: {e}")
-        except Exception as e:
-            raise Exception(f"An unexpected error occurred during saving: {e}")
+        file_path_obj = self._write_snapshot(Path(file_path), compress=compress)
+        print(f"KnowledgeBase saved to {file_path_obj}")
+
+    def _write_snapshot(self, file_path: Path, compress: bool) -> Path:
+        """
+        Writes the snapshot read by `from_json`, and returns its path. Errors are not caught.
+        """
+        # Preserve current behavior for edges by specifying edges="links"
+        graph_data = nx.readwrite.json_graph.node_link_data(self.graph, edges="links")
+        # Written in the header of the snapshot, before the nodes
+        graph_data["graph"] = dict(graph_data["graph"], calendar=self.calendar.to_dict(), entity_ids_by_type={
+            entity_type: list(entity_ids) for entity_type, entity_ids in self.entity_ids_by_type.items()
+        })
+        dict_to_dump = dict(
+            graph_data=graph_data,
+            map_entity_name_to_id=self.map_entity_name_to_id,
+            full_text_index=(self.full_text_index.to_dict(self._snapshot_document_ids())
+                             if self.full_text_index is not None else None),
+            graph_scores=self.graph_scores.to_dict(),  # Computed once here, rather than at every load
+            context_packs={
+                str(character.id): self.context_pack(character).to_dict()
+                for character in self.get_entities_by_type(Character)
+            },
+        )
+        if compress:
+            file_path = file_path.with_suffix(".json.gz")
+            with gzip.open(file_path, 'wt', encoding='utf-8') as f:
+                json.dump(dict_to_dump, f, indent=4, cls=UUIDEncoder)
+        else:
+            with file_path.open('w', encoding='utf-8') as f:
+                json.dump(dict_to_dump, f, indent=4, cls=UUIDEncoder)
+
+        vectors_path = VectorIndex.path_for_snapshot(file_path)
+        if self.vector_index is not None:
+            self.vector_index.save(vectors_path, self._snapshot_document_ids())
+        else:  # Vectors of a previous snapshot are outdated
+            vectors_path.unlink(missing_ok=True)
+        return file_path
 
     @classmethod
-    def from_json(cls, file_path: Union[str, Path]) -> 'KnowledgeBase':
+    def from_json(
+            cls,
+            file_path: Union[str, Path],
+            trusted: bool = False,
+            replay_changes: bool = True,
+    ) -> 'KnowledgeBase':
         """
         Loads the knowledge base graph from a JSON file.
         It accepts gzipped json files.
         Also repopulates the self.entities dictionary.
+
+        Args:
+            file_path (Union[str, Path]): Path to a snapshot written by `save_kb`.
+            trusted (bool): The snapshot was written by `save_kb` from already validated models.
+                Models are then validated in batch with a `TypeAdapter` per type and inserted in the graph
+                in bulk, without the duplicate and missing node checks of `add_entities`/`add_relationships`.
+            replay_changes (bool): Apply the changes recorded in the change log next to the snapshot, if any.
         """
         file_path_obj = Path(file_path)
-        if not file_path_obj.exists():
-            raise FileExistsError(f"File not found at {file_path_obj}")
+        with _open_snapshot(file_path_obj) as f:
+            data_dict = json.load(f)
 
-        if file_path_obj.suffix == '.gz':
-            with gzip.open(file_path_obj, 'rt', encoding='utf-8') as f:
-                data_dict = json.load(f)
-        else:
-            with file_path_obj.open('r', encoding='utf-8') as f:
-                data_dict = json.load(f)
-
-        entity_type_map: dict[str, Entity] = {
-            "Character": Character,
-            "Place": Place,
-            "Event": Event,
-            "SpecialObject": SpecialObject,
-        }
+        kb = cls.__new__(cls)
+        kb.__init__()
+        kb.full_text_index = kb.name_index = kb.relationship_index = kb.entity_periods = None
+
+        kb._load_dumped_nodes(data_dict["graph_data"]["nodes"], trusted=trusted)
+        kb._load_dumped_links(data_dict["graph_data"]["links"], trusted=trusted)
+        kb._restore_indexes(snapshot_extras=data_dict, snapshot_path=file_path_obj)
+        if replay_changes:
+            kb.replay_changes(ChangeLog.for_snapshot(file_path_obj))
+
+        print(f"KnowledgeBase loaded from {file_path_obj}")
+        print(f"  Nodes (entities) loaded: {kb.graph.number_of_nodes()}")
+        print(f"  Edges (relationships) loaded: {kb.graph.number_of_edges()}")
+        return kb
+
+    @classmethod
+    def from_json_stream(
+            cls,
+            file_path: Union[str, Path],
+            trusted: bool = False,
+            batch_size: int = 1000,
+            replay_changes: bool = True,
+    ) -> 'KnowledgeBase':
+        """
+        Loads the knowledge base graph from a JSON file, parsing it incrementally.
+
+        Unlike `from_json`, the snapshot is never decoded as a whole: nodes and links are parsed one by one
+        and added to the graph by batches, and the dumped indexes are parsed term by term and entity by entity,
+        so the peak memory stays close to the size of the loaded KB.
 
+        Args:
+            file_path (Union[str, Path]): Path to a snapshot written by `save_kb`, gzipped or not.
+            trusted (bool): Same as in `from_json`.
+            batch_size (int): Number of parsed nodes or links held before being added to the graph.
+            replay_changes (bool): Same as in `from_json`.
+        """
+        file_path_obj = Path(file_path)
         kb = cls.__new__(cls)
         kb.__init__()
+        kb.full_text_index = kb.name_index = kb.relationship_index = kb.entity_periods = None
 
-        entities = [
-            entity_type_map[dumped_entity["type"]].model_validate(dumped_entity["entity"])
-            for dumped_entity in data_dict["graph_data"]["nodes"]
-        ]
-        relationships = [
-            Relationship.model_validate(dumped_relationship['relationship'])
-            for dumped_relationship in data_dict["graph_data"]["links"]
-        ]
-        kb.add_entities(entities=entities)
-        kb.add_relationships(relationships=relationships)
+        loaders = {
+            _SNAPSHOT_NODES_PATH: kb._load_dumped_nodes,
+            _SNAPSHOT_LINKS_PATH: kb._load_dumped_links,
+        }
+        pending_path, pending = None, []
+        snapshot_extras: Dict[str, Any] = {}
+        with _open_snapshot(file_path_obj) as f:
+            for path, value in iter_json_stream(f, array_paths=set(loaders) | _SNAPSHOT_STREAMED_ARRAYS,
+                                                object_paths=_SNAPSHOT_STREAMED_OBJECTS):
+                if path not in loaders:
+                    if path[0] == "map_entity_name_to_id":  # Rebuilt from the entities
+                        continue
+                    extras = snapshot_extras
+                    for key in path[:-1]:
+                        extras = extras.setdefault(key, {})
+                    if path in _SNAPSHOT_STREAMED_ARRAYS:
+                        extras.setdefault(path[-1], []).append(value)
+                    else:
+                        extras[path[-1]] = value
+                    continue
+                if path != pending_path or len(pending) >= batch_size:
+                    if pending:
+                        loaders[pending_path](pending, trusted=trusted)
+                    pending_path, pending = path, []
+                pending.append(value)
+        if pending:
+            loaders[pending_path](pending, trusted=trusted)
+        kb._restore_indexes(snapshot_extras=snapshot_extras, snapshot_path=file_path_obj)
+        if replay_changes:
+            kb.replay_changes(ChangeLog.for_snapshot(file_path_obj))
 
         print(f"KnowledgeBase loaded from {file_path_obj}")
         print(f"  Nodes (entities) loaded: {kb.graph.number_of_nodes()}")
         print(f"  Edges (relationships) loaded: {kb.graph.number_of_edges()}")
         return kb
+
+
+def _walk_back(
+        parents: Dict[UUID, List[Tuple[Relationship, UUID]]], entity_id: UUID,
+) -> Iterator[Tuple[List[UUID], List[Relationship]]]:
+    """Yields every chain of parents from an entity back to the start of a breadth-first search."""
+    if not parents[entity_id]:
+        yield [entity_id], []
+        return
+    for relationship, parent_id in parents[entity_id]:
+        for entity_ids, relationships in _walk_back(parents, parent_id):
+            yield [entity_id] + entity_ids, [relationship] + relationships
+
+
+def _open_snapshot(file_path: Path) -> TextIO:
+    if not file_path.exists():
+        raise FileExistsError(f"File not found at {file_path}")
+    if file_path.suffix == '.gz':
+        return gzip.open(file_path, 'rt', encoding='utf-8')
+    return file_path.open('r', encoding='utf-8')
+
+def _dump_entity(entity: Entity) -> Dict[str, Any]:
+    return dict(type=entity.__class__.__name__, entity=entity.model_dump(mode="json"))
+
+
+def _validate_entity(dumped_entity: Dict[str, Any]) -> Entity:
+    return ENTITY_TYPE_MAP[dumped_entity["type"]].model_validate(dumped_entity["entity"])
+
+
+def _entity_document(entity: Entity) -> Tuple[DocumentRef, str]:
+    return DocumentRef(entity.id), f"{entity.name}\n{entity.description or ''}"
+
+
+def _entity_names(entity: Entity) -> List[str]:
+    return [entity.name, *getattr(entity, "aliases", [])]
+
+
+def _index_entity_period(entity_periods: IntervalIndex, entity: Entity, calendar: Calendar) -> None:
+    interval = parse_period(entity.time_or_period, calendar)
+    if interval is not None:
+        entity_periods.add(entity.id, interval)
+
+
+def _as_interval(period: Union[str, Interval], calendar: Calendar) -> Interval:
+    if not isinstance(period, str):
+        return period
+    interval = parse_period(period, calendar)
+    if interval is None:
+        raise ValueError(f"No year found in period '{period}'.")
+    return interval
+
+
+def _relationship_document(relationship: Relationship) -> Tuple[DocumentRef, Optional[str]]:
+    ref = DocumentRef(relationship.id, relationship.source_entity_id, relationship.target_entity_id)
+    return ref, relationship.description
+
+
+def _validate_entities_in_batch(dumped_nodes: List[Dict[str, Any]]) -> List[Entity]:
+    """
+    Validates snapshot nodes with one `TypeAdapter` call per entity type, preserving the nodes order.
+    """
+    indices_by_type: Dict[str, List[int]] = defaultdict(list)
+    for index, dumped_node in enumerate(dumped_nodes):
+        indices_by_type[dumped_node["type"]].append(index)
+
+    entities: List[Optional[Entity]] = [None] * len(dumped_nodes)
+    for entity_type, indices in indices_by_type.items():
+        validated = _ENTITY_LIST_ADAPTERS[entity_type].validate_python([dumped_nodes[i]["entity"] for i in indices])
+        for index, entity in zip(indices, validated):
+            entities[index] = entity
+    return entities
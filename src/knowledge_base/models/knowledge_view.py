@@ -0,0 +1,164 @@
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, Union
+from uuid import UUID
+
+from knowledge_base.index.context_packs import ContextPack
+from knowledge_base.index.visibility import KnowledgeMask
+from knowledge_base.models.entities import Entity
+from knowledge_base.models.relationships import Relationship
+from knowledge_base.utils.period import Interval
+
+if TYPE_CHECKING:
+    from knowledge_base.models.knowledge_base import ConnectionPath, KnowledgeBase, Neighborhood
+
+# Queries ranking their results fetch more of them, as some may be filtered out by the mask
+_OVERSAMPLING = 4
+
+
+class KnowledgeView:
+    """
+    Read-only view of a knowledge base limited to what a character can know, see `KnowledgeBase.knowledge_of`.
+
+    It answers the read queries of the knowledge base listed in `QUERIES`, each result being filtered through the
+    knowledge mask of the character. The mask is kept by the knowledge base, so it is only computed again after
+    a mutation. The graph, the other queries and the mutators of the knowledge base are not available, as views
+    are handed to the code written by the agents. For the same reason, an entity hidden from the character raises
+    the same KeyError as a missing one, suggesting only names known to the character.
+    """
+    QUERIES = (
+        "get_entity_by_name", "get_entities_by_type", "get_entities_by_names", "get_entities_by_ids",
+        "relationships_for", "resolve_name", "search", "semantic_search", "find_relationships",
+        "find_entities_in_period", "top_relationships", "context_pack", "neighborhood", "explain_connection",
+    )
+
+    def __init__(self, kb: 'KnowledgeBase', character: Union[Entity, UUID, str], **knowledge_kwargs: Any):
+        self._kb = kb
+        self.character_id = kb._resolve_entity_id(character)
+        self.knowledge_kwargs = knowledge_kwargs
+
+    def __getattr__(self, name: str) -> Any:
+        raise AttributeError(f"A knowledge view has no attribute '{name}', its queries are {', '.join(self.QUERIES)}.")
+
+    @property
+    def mask(self) -> KnowledgeMask:
+        return self._kb.knowledge_of(self.character_id, **self.knowledge_kwargs)
+
+    def _unknown_entity_error(self, entity: Union[Entity, UUID, str]) -> KeyError:
+        """Error for an entity missing from the knowledge base or hidden from the character, alike."""
+        if isinstance(entity, Entity):
+            entity = entity.name
+        candidates = []
+        if isinstance(entity, str):
+            candidates = [name for _, name, _ in self.resolve_name(entity, max_results=3)]
+        suggestion = f" Did you mean one of {candidates}?" if candidates else ""
+        return KeyError(f"Entity '{entity}' is unknown to the character.{suggestion}")
+
+    def _resolve_known_entity_id(self, entity: Union[Entity, UUID, str]) -> UUID:
+        """
+        ID of an entity known to the character, see `KnowledgeBase._resolve_entity_id`.
+
+        Raises:
+            KeyError: If the entity is not found in the knowledge base, or is unknown to the character.
+        """
+        try:
+            entity_id = self._kb._resolve_entity_id(entity)
+        except KeyError:  # Its message may suggest names hidden from the character
+            raise self._unknown_entity_error(entity) from None
+        if not self.mask.knows_entity(entity_id):
+            raise self._unknown_entity_error(entity)
+        return entity_id
+
+    def get_entity_by_name(self, name: str) -> Entity:
+        try:
+            entity = self._kb.get_entity_by_name(name)
+        except KeyError:  # Its message may suggest names hidden from the character
+            raise self._unknown_entity_error(name) from None
+        if not self.mask.knows_entity(entity.id):
+            raise self._unknown_entity_error(name)
+        return entity
+
+    def get_entities_by_type(self, entity_type: Union[str, type[Entity]]) -> List[Entity]:
+        return self.mask.filter_entities(self._kb.get_entities_by_type(entity_type))
+
+    def get_entities_by_names(self, names: Iterable[str]) -> Dict[str, Entity]:
+        entities = self._kb.get_entities_by_names(names)
+        flags = self.mask.entity_flags([entity.id for entity in entities.values()])
+        return {name: entity for (name, entity), known in zip(entities.items(), flags) if known}
+
+    def get_entities_by_ids(self, entity_ids: Iterable[Union[str, UUID]]) -> Dict[UUID, Entity]:
+        entities = self._kb.get_entities_by_ids(entity_ids)
+        flags = self.mask.entity_flags(list(entities))
+        return {entity_id: entity for (entity_id, entity), known in zip(entities.items(), flags) if known}
+
+    def relationships_for(self, entities: Iterable[Union[Entity, UUID, str]],
+                          **kwargs: Any) -> Dict[UUID, List[Relationship]]:
+        relationships = self._kb.relationships_for(entities, **kwargs)
+        mask = self.mask
+        flags = mask.entity_flags(list(relationships))
+        return {
+            entity_id: mask.filter_relationships(entity_relationships)
+            for (entity_id, entity_relationships), known in zip(relationships.items(), flags) if known
+        }
+
+    def resolve_name(self, query: str, max_results: int = 5) -> List[Tuple[Entity, str, float]]:
+        candidates = self._kb.resolve_name(query, max_results=max_results * _OVERSAMPLING)
+        flags = self.mask.entity_flags([entity.id for entity, _, _ in candidates])
+        return [candidate for candidate, known in zip(candidates, flags) if known][:max_results]
+
+    def _filter_items(self, results: List[Tuple[Union[Entity, Relationship], float]], k: int):
+        mask = self.mask
+        entity_flags = mask.entity_flags([item.id for item, _ in results])
+        relationship_flags = mask.relationship_flags([item.id for item, _ in results])
+        return [
+            (item, score)
+            for (item, score), known_entity, known_relationship in zip(results, entity_flags, relationship_flags)
+            if (known_relationship if isinstance(item, Relationship) else known_entity)
+        ][:k]
+
+    def search(self, text: str, k: int = 10) -> List[Tuple[Union[Entity, Relationship], float]]:
+        return self._filter_items(self._kb.search(text, k=k * _OVERSAMPLING), k)
+
+    def semantic_search(self, text: str, k: int = 10) -> List[Tuple[Union[Entity, Relationship], float]]:
+        return self._filter_items(self._kb.semantic_search(text, k=k * _OVERSAMPLING), k)
+
+    def find_relationships(self, **filters: Any) -> List[Relationship]:
+        return self.mask.filter_relationships(self._kb.find_relationships(**filters))
+
+    def find_entities_in_period(
+            self, period: Union[str, Interval], entity_type: Optional[Union[str, type[Entity]]] = None,
+    ) -> List[Entity]:
+        return self.mask.filter_entities(self._kb.find_entities_in_period(period, entity_type=entity_type))
+
+    def top_relationships(self, entity: Union[Entity, UUID, str], k: Optional[int] = 10,
+                          **kwargs: Any) -> List[Tuple[Relationship, float]]:
+        ranked = self._kb.top_relationships(self._resolve_known_entity_id(entity), k=None, **kwargs)
+        flags = self.mask.relationship_flags([relationship.id for relationship, _ in ranked])
+        known = [item for item, is_known in zip(ranked, flags) if is_known]
+        return known[:k] if k is not None else known
+
+    def context_pack(self, entity: Union[Entity, UUID, str]) -> ContextPack:
+        # Packs hold plain text, they cannot be filtered: only the character's own pack is shown
+        try:
+            is_character = self._kb._resolve_entity_id(entity) == self.character_id
+        except KeyError:  # Its message may suggest names hidden from the character
+            is_character = False
+        if not is_character:
+            raise KeyError("Only the context pack of the character of the view is available.")
+        return self._kb.context_pack(self.character_id)
+
+    def neighborhood(self, entity: Union[Entity, UUID, str], **kwargs: Any) -> 'Neighborhood':
+        neighborhood = self._kb.neighborhood(self._resolve_known_entity_id(entity), **kwargs)
+        mask = self.mask
+        entity_flags = mask.entity_flags([entity.id for entity, _ in neighborhood.entities])
+        return neighborhood._replace(
+            entities=tuple(item for item, known in zip(neighborhood.entities, entity_flags) if known),
+            relationships=tuple(mask.filter_relationships(neighborhood.relationships)),
+        )
+
+    def explain_connection(self, entity_a: Union[Entity, UUID, str], entity_b: Union[Entity, UUID, str],
+                           **kwargs: Any) -> List['ConnectionPath']:
+        entity_a_id, entity_b_id = self._resolve_known_entity_id(entity_a), self._resolve_known_entity_id(entity_b)
+        mask = self.mask
+        return [
+            path for path in self._kb.explain_connection(entity_a_id, entity_b_id, **kwargs)
+            if mask.relationship_flags([relationship.id for relationship in path.relationships]).all()
+        ]
@@ -1,32 +1,64 @@
 import tempfile
+import urllib.parse
 from pathlib import Path
+from typing import Callable, Optional
 
 from knowledge_base.models.knowledge_base import KnowledgeBase
 from knowledge_base.parser.fandom.bridge_site_to_kb import populate_entities, populate_relationships
 from knowledge_base.parser.fandom.parse_dump import fandom_xml_parse
-from knowledge_base.utils.archive_handler import extract_7z
+from knowledge_base.utils.archive_handler import extract_dump
 from knowledge_base.utils.downloader import fetch_page_content, get_xml_dump_url, download_file
+from knowledge_base.utils.url import get_fandom_statistics_page_url
 
+# Share of the build done when each stage starts, as reported to the `progress` callback of `from_fandom`
+BUILD_STAGES = {
+    "downloading": 0.0,
+    "extracting": 0.4,
+    "parsing": 0.5,
+    "populating entities": 0.6,
+    "populating relationships": 0.8,
+}
+_DOWNLOAD_SHARE = BUILD_STAGES["extracting"] - BUILD_STAGES["downloading"]
 
-def from_fandom(fandom_url) -> KnowledgeBase:
-    fandom_stat_page_content = fetch_page_content(fandom_url)
-    dump_url = get_xml_dump_url(fandom_stat_page_content)
+
+def from_fandom(fandom_url: str, progress: Optional[Callable[[str, float], None]] = None) -> KnowledgeBase:
+    """
+    Builds the knowledge base of a Fandom wiki from the XML dump of its current pages.
+
+    Args:
+        fandom_url: Any URL of the wiki, e.g. "https://asimov.fandom.com/wiki/".
+        progress: Called with the current stage, one of `BUILD_STAGES`, and the share of the build done, from 0 to 1.
+    """
+    def report(stage: str, done: float = 0.0) -> None:
+        if progress is not None:
+            progress(stage, done)
+
+    statistics_page_url = get_fandom_statistics_page_url(fandom_url)
+    fandom_stat_page_content = fetch_page_content(statistics_page_url)
+    # Fandom links to dumps by absolute URL, relative links are resolved against the statistics page
+    dump_url = urllib.parse.urljoin(statistics_page_url, get_xml_dump_url(fandom_stat_page_content))
 
     with tempfile.TemporaryDirectory() as tmp_dir:
         temp_dir_path = Path(tmp_dir)
-        download_path = temp_dir_path / "fandom_archive.xml.7z"
-        extracted_file_path = temp_dir_path / "fandom_extracted"
-        download_file(dump_url, output_path=download_path)
-        extract_7z(download_path, extracted_file_path)
+        download_path = temp_dir_path / (Path(urllib.parse.urlparse(dump_url).path).name or "fandom_archive.xml.7z")
+        report("downloading", BUILD_STAGES["downloading"])
+        download_file(dump_url, output_path=download_path, progress=lambda downloaded, total: report(
+            "downloading", BUILD_STAGES["downloading"] + _DOWNLOAD_SHARE * downloaded / total if total else 0.0
+        ))
+
+        report("extracting", BUILD_STAGES["extracting"])
+        xml_path = extract_dump(download_path, temp_dir_path / "fandom_extracted")
 
-        xml_path = extracted_file_path / "fandom_archive.xml"
+        report("parsing", BUILD_STAGES["parsing"])
         fandom_site_content = fandom_xml_parse(xml_path)
 
         kb = KnowledgeBase()
+        report("populating entities", BUILD_STAGES["populating entities"])
         populate_entities(  # Updates the kb inplace
             site_content=fandom_site_content,
             kb=kb,
             category_keywords=None  # use default, later should be updated by agent
         )
+        report("populating relationships", BUILD_STAGES["populating relationships"])
         populate_relationships(site_content=fandom_site_content, kb=kb)
-    return kb
\ No newline at end of file
+    return kb
@@ -100,7 +100,7 @@ Keep the default if no relevant information is found :
     return llm([{"role": "user", "content": message}])
 
 
-def get_entity_args(entity_class: Entity, page: Page, fill_with_llm):
+def get_entity_args(entity_class: Entity, page: Page, fill_with_llm: bool = False):
     """
     WIP : should be an agent that extracts the entity args from the page
 
@@ -0,0 +1,231 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from knowledge_base.logger import logger
+from knowledge_base.models.frozen_knowledge_base import FrozenKnowledgeBase
+from knowledge_base.models.knowledge_base import KnowledgeBase
+from knowledge_base.models.knowledge_view import KnowledgeView
+from knowledge_base.utils.period import Calendar
+from knowledge_base.utils.url import get_fandom_base_url
+
+# Memory taken by a loaded knowledge base, with its indexes, measured on synthetic snapshots
+_BYTES_PER_ENTITY = 2_500
+_BYTES_PER_RELATIONSHIP = 3_000
+FROZEN_SUFFIX = ".frozen"  # Snapshots mapped as a `FrozenKnowledgeBase` rather than loaded, see `load_snapshot`
+
+
+def estimate_memory(kb: Union[KnowledgeBase, FrozenKnowledgeBase]) -> int:
+    """
+    Rough memory taken by a loaded knowledge base, in bytes, from its number of entities and relationships.
+    Frozen knowledge bases take none: their mapped pages belong to the page cache, shared by all the processes.
+    """
+    if isinstance(kb, FrozenKnowledgeBase):
+        return 0
+    return (_BYTES_PER_ENTITY * kb.graph.number_of_nodes()
+            + _BYTES_PER_RELATIONSHIP * kb.graph.number_of_edges())
+
+
+def load_snapshot(path: Path) -> Union[KnowledgeBase, FrozenKnowledgeBase]:
+    """
+    Maps a frozen knowledge base written by `FrozenKnowledgeBase.write`, for a `.frozen` file,
+    or loads a snapshot written by `KnowledgeBase.save_kb` otherwise.
+    """
+    if path.suffix == FROZEN_SUFFIX:
+        return FrozenKnowledgeBase.open(path)
+    return KnowledgeBase.from_json_stream(path, trusted=True)
+
+
+class KnowledgeBaseRegistry:
+    """
+    Knowledge bases of several Fandom wikis, keyed by the base URL of the wiki.
+
+    Snapshots are registered by URL and only loaded the first time their knowledge base is requested.
+    Frozen snapshots are mapped rather than loaded, see `load_snapshot`: call `preload` before forking
+    or spawning worker processes, so that they share the mapped pages.
+    At most `max_resident` knowledge bases are kept in memory, within `memory_budget` bytes, the least recently
+    used ones being evicted first. An evicted knowledge base stays usable by the sessions still holding it,
+    and is loaded again at its next request. Sessions should rather hold a `RegisteredKnowledgeView`, see
+    `scoped_to`, which does not keep the knowledge base from being released once evicted.
+
+    Example:
+        >>> registry = KnowledgeBaseRegistry(max_resident=2, memory_budget=2 * 2 ** 30)
+        >>> registry.register("https://asimov.fandom.com/wiki/", "static/kb_asimov.json.gz")
+        >>> kb = registry.get("https://asimov.fandom.com/wiki/Hari_Seldon")  # Loaded here
+    """
+
+    def __init__(
+            self,
+            max_resident: int = 3,
+            memory_budget: Optional[int] = None,
+            loader: Callable[[Path], Union[KnowledgeBase, FrozenKnowledgeBase]] = load_snapshot,
+            memory_estimator: Callable[[Union[KnowledgeBase, FrozenKnowledgeBase]], int] = estimate_memory,
+    ):
+        """
+        Args:
+            max_resident: Maximum number of knowledge bases kept in memory.
+            memory_budget: Maximum memory of the knowledge bases kept in memory, in bytes, unlimited if None.
+                The last requested knowledge base is always kept, even if it is over budget.
+            loader: Loads the knowledge base of a snapshot.
+            memory_estimator: Estimates the memory taken by a loaded knowledge base, in bytes.
+        """
+        self.max_resident = max_resident
+        self.memory_budget = memory_budget
+        self._loader = loader
+        self._memory_estimator = memory_estimator
+        self._snapshot_paths: Dict[str, Path] = {}
+        self._calendars: Dict[str, Calendar] = {}  # Set on the knowledge bases when loaded, see `register`
+        self._resident: OrderedDict[str, Union[KnowledgeBase, FrozenKnowledgeBase]] = OrderedDict()  # LRU first
+        self._memory: Dict[str, int] = {}
+        self._lock = threading.Lock()  # Guards the dictionaries above, not held while loading
+        self._loading_locks: Dict[str, threading.Lock] = {}  # One per URL, so a snapshot is only loaded once
+
+    def register(self, fandom_url: str, snapshot_path: Union[str, Path], calendar: Optional[Calendar] = None) -> None:
+        """
+        Registers the snapshot of the knowledge base of a wiki, replacing the knowledge base already registered.
+
+        Args:
+            fandom_url: Any URL of the wiki.
+            snapshot_path: Path of the snapshot of its knowledge base.
+            calendar: Eras of the dates of the wiki, replacing the calendar saved in the snapshot, see `Calendar`.
+                Ignored by frozen knowledge bases, which have no period queries.
+        """
+        key = get_fandom_base_url(fandom_url)
+        with self._lock:
+            self._snapshot_paths[key] = Path(snapshot_path)
+            if calendar is not None:
+                self._calendars[key] = calendar
+            else:
+                self._calendars.pop(key, None)
+            self._loading_locks.setdefault(key, threading.Lock())
+            self._resident.pop(key, None)  # Loaded again from the new snapshot at the next request
+            self._memory.pop(key, None)
+
+    def __contains__(self, fandom_url: str) -> bool:
+        return get_fandom_base_url(fandom_url) in self._snapshot_paths
+
+    @property
+    def urls(self) -> List[str]:
+        """Base URLs of the registered wikis."""
+        return list(self._snapshot_paths)
+
+    @property
+    def resident_urls(self) -> List[str]:
+        """Base URLs of the knowledge bases in memory, the least recently used first."""
+        with self._lock:
+            return list(self._resident)
+
+    @property
+    def resident_memory(self) -> int:
+        """Estimated memory of the knowledge bases in memory, in bytes."""
+        with self._lock:
+            return sum(self._memory.values())
+
+    def get(self, fandom_url: str) -> Union[KnowledgeBase, FrozenKnowledgeBase]:
+        """
+        Returns the knowledge base of a wiki, loading its snapshot if it is not in memory.
+
+        Args:
+            fandom_url: Any URL of the wiki, e.g. the URL of one of its pages.
+
+        Raises:
+            KeyError: If no snapshot is registered for the wiki.
+        """
+        key = get_fandom_base_url(fandom_url)
+        with self._lock:
+            if key not in self._snapshot_paths:
+                raise KeyError(f"No knowledge base registered for {key}. Registered: {list(self._snapshot_paths)}.")
+            kb = self._touch(key)
+            if kb is not None:
+                return kb
+            loading_lock = self._loading_locks[key]
+
+        with loading_lock:  # Other sessions requesting the same wiki wait for this load
+            with self._lock:
+                kb = self._touch(key)
+                snapshot_path = self._snapshot_paths[key]
+                calendar = self._calendars.get(key)
+            if kb is not None:
+                return kb
+            kb = self._loader(snapshot_path)
+            if calendar is not None and isinstance(kb, KnowledgeBase) and kb.calendar != calendar:
+                kb.set_calendar(calendar)
+            memory = self._memory_estimator(kb)
+            with self._lock:
+                if self._snapshot_paths.get(key) == snapshot_path:  # Not replaced while loading
+                    self._resident[key] = kb
+                    self._memory[key] = memory
+                    self._evict(key)
+            logger.info(f"Knowledge base of {key} loaded from {snapshot_path} (~{memory / 2 ** 20:.0f} MiB).")
+            return kb
+
+    def scoped_to(self, fandom_url: str, character_name: str, **knowledge_kwargs: Any) -> 'RegisteredKnowledgeView':
+        """
+        Knowledge view of a character of a wiki, see `KnowledgeBase.scoped_to`, whose knowledge base is resolved
+        through the registry at each query, so that it can be evicted while the view is kept, e.g. in the state
+        of an agent.
+        """
+        return RegisteredKnowledgeView(self, fandom_url, character_name, **knowledge_kwargs)
+
+    def preload(self) -> None:
+        """
+        Loads the registered knowledge bases now, e.g. in the parent process before forking workers,
+        within the limits of `max_resident` and `memory_budget`.
+        """
+        for fandom_url in self.urls[:self.max_resident]:
+            self.get(fandom_url)
+
+    def _touch(self, key: str) -> Optional[Union[KnowledgeBase, FrozenKnowledgeBase]]:
+        kb = self._resident.get(key)
+        if kb is not None:
+            self._resident.move_to_end(key)
+        return kb
+
+    def _evict(self, kept_key: str) -> None:
+        """Evicts the least recently used knowledge bases while over the limits, except the given one."""
+        for key in list(self._resident):
+            within_budget = self.memory_budget is None or sum(self._memory.values()) <= self.memory_budget
+            if len(self._resident) <= self.max_resident and within_budget:
+                break
+            if key != kept_key:
+                del self._resident[key]
+                del self._memory[key]
+                logger.info(f"Knowledge base of {key} evicted from memory.")
+
+
+class RegisteredKnowledgeView:
+    """
+    `KnowledgeView` of a character of a registered wiki, see `KnowledgeBaseRegistry.scoped_to`.
+
+    It holds the URL of the wiki rather than its knowledge base, requested from the registry at each query,
+    so a knowledge base evicted by the registry is released even though agents still hold views of it,
+    and is loaded again at their next query.
+    """
+    QUERIES = KnowledgeView.QUERIES
+
+    def __init__(self, registry: KnowledgeBaseRegistry, fandom_url: str, character_name: str, **knowledge_kwargs: Any):
+        self._registry = registry
+        self.fandom_url = fandom_url
+        self.character_name = character_name
+        self.knowledge_kwargs = knowledge_kwargs
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in self.QUERIES:
+            raise AttributeError(
+                f"A knowledge view has no attribute '{name}', its queries are {', '.join(self.QUERIES)}."
+            )
+
+        def query(*args: Any, **kwargs: Any) -> Any:
+            return getattr(self.view(), name)(*args, **kwargs)
+
+        return query
+
+    def view(self) -> KnowledgeView:
+        """
+        View of the character in the knowledge base of the wiki currently in the registry, loaded if evicted.
+
+        Raises:
+            KeyError: If no knowledge base is registered for the wiki, or the character is not found in it.
+        """
+        return self._registry.get(self.fandom_url).scoped_to(self.character_name, **self.knowledge_kwargs)
@@ -1,3 +1,7 @@
+import gzip
+import shutil
+from pathlib import Path
+
 import patoolib
 
 def extract_7z(archive_path, extract_path):
@@ -8,6 +12,27 @@ def extract_7z(archive_path, extract_path):
     except Exception as e:
         print(f"An error occurred: {e}")
 
+def extract_dump(dump_path: Path, extract_path: Path) -> Path:
+    """
+    Extracts the XML file of a wiki dump, compressed with 7z or gzip, or not compressed, and returns its path.
+
+    Raises:
+        FileNotFoundError: If no XML file could be extracted from the dump.
+    """
+    extract_path.mkdir(parents=True, exist_ok=True)
+    if dump_path.suffix == ".7z":
+        extract_7z(dump_path, extract_path)
+    elif dump_path.suffix == ".gz":
+        with gzip.open(dump_path, "rb") as compressed, (extract_path / dump_path.stem).open("wb") as extracted:
+            shutil.copyfileobj(compressed, extracted)
+    else:
+        shutil.copy(dump_path, extract_path / dump_path.name)
+
+    xml_paths = sorted(extract_path.rglob("*.xml"))
+    if not xml_paths:
+        raise FileNotFoundError(f"No XML file extracted from the dump {dump_path}.")
+    return xml_paths[0]
+
 def load_zipped_json(json_zip_path):
     with open(json_zip_path, 'rb') as f:
         json_data = patoolib.extract_archive(f)
@@ -0,0 +1,59 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, Union
+
+# --- Change operations ---
+CHANGE_ADD_ENTITY = "add_entity"
+CHANGE_UPDATE_ENTITY = "update_entity"
+CHANGE_REMOVE_ENTITY = "remove_entity"
+CHANGE_ADD_RELATIONSHIP = "add_relationship"
+CHANGE_UPDATE_RELATIONSHIP = "update_relationship"
+CHANGE_REMOVE_RELATIONSHIP = "remove_relationship"
+
+
+class ChangeLog:
+    """
+    Append-only log of knowledge base changes, stored as JSON lines next to a base snapshot.
+
+    Each line is one change: an operation name and its JSON payload. Appending a change only writes
+    that line, so small updates never rewrite the snapshot. Replaying the log on top of the snapshot
+    gives back the up-to-date knowledge base, and compacting folds it into a new snapshot.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+    @classmethod
+    def for_snapshot(cls, snapshot_path: Union[str, Path]) -> 'ChangeLog':
+        """
+        Returns the change log stored next to a snapshot, e.g. `kb_asimov.changes.jsonl`
+        for `kb_asimov.json.gz` or `kb_asimov.json`.
+        """
+        snapshot_path = Path(snapshot_path)
+        name = snapshot_path.name.removesuffix(".gz").removesuffix(".json")
+        return cls(snapshot_path.with_name(f"{name}.changes.jsonl"))
+
+    def append(self, operation: str, payload: Dict[str, Any]) -> None:
+        """Appends one change at the end of the log."""
+        line = json.dumps({"op": operation, **payload}, ensure_ascii=False)
+        with self.path.open('a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Iterates over the changes in the order they were appended."""
+        if not self.path.exists():
+            return
+        with self.path.open('r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def clear(self) -> None:
+        """Drops every change, once they have been folded into a snapshot."""
+        self.path.unlink(missing_ok=True)
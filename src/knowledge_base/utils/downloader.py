@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Callable, Optional
 
 import requests
 import re
@@ -44,7 +45,12 @@ def get_xml_dump_url(html_content: str):
         raise EOFError("No form with the specified action found.")
 
 
-def download_file(url: str, output_path: Path, chunk_size: int = 8192):
+def download_file(
+        url: str,
+        output_path: Path,
+        chunk_size: int = 8192,
+        progress: Optional[Callable[[int, Optional[int]], None]] = None,
+):
     """
     Downloads a file from a URL and saves it to a local path.
 
@@ -52,6 +58,8 @@ def download_file(url: str, output_path: Path, chunk_size: int = 8192):
         url: The URL of the file to download.
         output_path: The local path where the file should be saved.
         chunk_size: The size of chunks to download in bytes.
+        progress: Called after each chunk with the number of bytes downloaded,
+            and the size of the file, or None if the server does not send it.
 
     Raises:
         requests.exceptions.HTTPError: If the request returns a 4xx or 5xx status code.
@@ -66,10 +74,15 @@ def download_file(url: str, output_path: Path, chunk_size: int = 8192):
         with requests.get(url, headers=headers, stream=True,
                           timeout=600) as response:  # Increased timeout for large files
             response.raise_for_status()
+            total_size = int(response.headers["Content-Length"]) if "Content-Length" in response.headers else None
+            downloaded_size = 0
             with open(output_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=chunk_size):
                     if chunk:  # filter out keep-alive new chunks
                         f.write(chunk)
+                        downloaded_size += len(chunk)
+                        if progress is not None:
+                            progress(downloaded_size, total_size)
         print(f"File downloaded successfully: {output_path}")
     except requests.exceptions.RequestException as e:
         # Clean up partially downloaded file if error occurs
@@ -0,0 +1,158 @@
+import json
+import re
+from typing import Any, Iterator, Set, TextIO, Tuple
+
+JSONPath = Tuple[str, ...]
+
+_NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+_NUMBER_END = re.compile(r"[0-9.eE+-]*\Z")  # Matches after a number that may continue in the next chunk
+
+
+class _JSONStreamReader:
+    """
+    Minimal pull reader over a text stream, decoding one JSON value at a time.
+
+    Values are decoded with the scanner of `json.JSONDecoder`, so only the value being decoded
+    and one read chunk are held in memory.
+    """
+
+    def __init__(self, stream: TextIO, chunk_size: int):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._scan_once = json.JSONDecoder().scan_once
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> bool:
+        """Appends up to `size` characters to the unread part of the buffer. Returns False at end of stream."""
+        if self._eof:
+            return False
+        chunk = self._stream.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return True
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character without consuming it."""
+        while True:
+            match = _NON_WHITESPACE.search(self._buffer, self._position)
+            if match:
+                self._position = match.start()
+                return self._buffer[self._position]
+            self._position = len(self._buffer)
+            if not self._fill(self._chunk_size):
+                raise EOFError("Unexpected end of JSON stream.")
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in JSON stream, found '{found}'.")
+        self._position += 1
+
+    def _may_be_cut_number(self, value: Any, end: int) -> bool:
+        """A number is only known to be complete when a non-number character follows it in the buffer."""
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        return _NUMBER_END.match(self._buffer, end) is not None
+
+    def value(self) -> Any:
+        """Decodes the next JSON value, reading more of the stream until it is complete."""
+        self.peek()
+        read_size = self._chunk_size
+        while True:
+            try:
+                value, end = self._scan_once(self._buffer, self._position)
+            except (StopIteration, json.JSONDecodeError) as e:
+                # The value is cut by the end of the buffer, read more. The read size doubles so that
+                # large values are re-decoded a logarithmic number of times only.
+                if not self._fill(read_size):
+                    if isinstance(e, StopIteration):
+                        raise json.JSONDecodeError("Expecting value", self._buffer, self._position) from None
+                    raise
+                read_size *= 2
+                continue
+            if self._may_be_cut_number(value, end) and self._fill(read_size):
+                continue  # The number may continue in the next chunk
+            self._position = end
+            return value
+
+
+def iter_json_stream(
+        stream: TextIO,
+        array_paths: Set[JSONPath],
+        chunk_size: int = 1 << 16,
+        object_paths: Set[JSONPath] = frozenset(),
+) -> Iterator[Tuple[JSONPath, Any]]:
+    """
+    Incrementally parses a JSON object from a text stream.
+
+    Arrays found at one of the `array_paths` are not decoded at once: each of their items is yielded
+    as soon as it is parsed, with the path of the array. Likewise, each entry of the objects found at one of
+    the `object_paths` is yielded as soon as it is parsed, with the path of its key. Objects on the way to
+    those arrays and objects are walked key by key, and any other value is yielded whole with its path.
+
+    Args:
+        stream: A text stream (e.g. from `open` or `gzip.open` in text mode) containing a JSON object.
+        array_paths: Paths of keys, from the root object, of the arrays to stream item by item.
+        chunk_size: Number of characters read from the stream at once.
+        object_paths: Paths of keys, from the root object, of the objects to stream entry by entry.
+
+    Yields:
+        Tuple[JSONPath, Any]: The path of the value and the value itself.
+
+    Example:
+        >>> import io
+        >>> stream = io.StringIO('{"graph_data": {"nodes": [1, 2]}, "names": {"a": 1}, "version": 1}')
+        >>> list(iter_json_stream(stream, array_paths={("graph_data", "nodes")}, object_paths={("names",)}))
+        [(('graph_data', 'nodes'), 1), (('graph_data', 'nodes'), 2), (('names', 'a'), 1), (('version',), 1)]
+    """
+    reader = _JSONStreamReader(stream, chunk_size)
+    prefixes = {path[:i] for path in array_paths | object_paths for i in range(1, len(path))}
+    yield from _iter_object(reader, (), array_paths, object_paths, prefixes)
+
+
+def _iter_object(
+        reader: _JSONStreamReader,
+        path: JSONPath,
+        array_paths: Set[JSONPath],
+        object_paths: Set[JSONPath],
+        prefixes: Set[JSONPath],
+) -> Iterator[Tuple[JSONPath, Any]]:
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.expect("}")
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        key_path = path + (key,)
+        if key_path in array_paths and reader.peek() == "[":
+            yield from _iter_array(reader, key_path)
+        elif (key_path in prefixes or key_path in object_paths) and reader.peek() == "{":
+            yield from _iter_object(reader, key_path, array_paths, object_paths, prefixes)
+        else:
+            yield key_path, reader.value()
+
+        if reader.peek() == ",":
+            reader.expect(",")
+        else:
+            reader.expect("}")
+            return
+
+
+def _iter_array(reader: _JSONStreamReader, path: JSONPath) -> Iterator[Tuple[JSONPath, Any]]:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.expect("]")
+        return
+    while True:
+        yield path, reader.value()
+        if reader.peek() == ",":
+            reader.expect(",")
+        else:
+            reader.expect("]")
+            return
@@ -0,0 +1,109 @@
+import functools
+import re
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+Interval = Tuple[float, float]
+Era = Tuple[int, int]  # (sign, offset), the value of a year of the era being sign * year + offset
+
+# Eras of the common calendar, understood in every wiki
+COMMON_ERAS: Dict[str, Era] = {
+    "ad": (1, 0),
+    "ce": (1, 0),
+    "bc": (-1, 0),
+    "bce": (-1, 0),
+}
+
+
+class Calendar(NamedTuple):
+    """
+    Eras in which the dates of a wiki are written, see `parse_period`.
+
+    Example, for Asimov's works where the Foundation Era starts in 12,068 GE and dates are given in GE by default:
+        >>> Calendar(eras={**COMMON_ERAS, "ge": (1, 0), "fe": (1, 12_067)}, default_era="ge")
+    """
+    eras: Mapping[str, Era] = COMMON_ERAS  # Keyed by lowercase abbreviation, without dots
+    default_era: Optional[str] = None  # Era of the dates given without era, the common era if None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(eras={name: list(era) for name, era in self.eras.items()}, default_era=self.default_era)
+
+    @classmethod
+    def from_dict(cls, dumped_calendar: Optional[Mapping[str, Any]]) -> 'Calendar':
+        """Restores a calendar dumped by `to_dict`, the default calendar if missing or malformed."""
+        try:
+            return cls(
+                eras={name: (int(sign), int(offset)) for name, (sign, offset) in dumped_calendar["eras"].items()},
+                default_era=dumped_calendar["default_era"],
+            )
+        except (TypeError, KeyError, ValueError):
+            return DEFAULT_CALENDAR
+
+
+DEFAULT_CALENDAR = Calendar()
+
+_CENTURY_PATTERN = re.compile(r"\b(?P<century>\d+)(?:st|nd|rd|th)\s+century\b")
+# What may surround the years of a text giving a date, so that its numbers without era are read as years,
+# e.g. "c. 1990-1995" but not "3 moons" or "chapter 12"
+_DATE_CONTEXT_PATTERN = re.compile(
+    r"(?:[\W_]|\b(?:c|ca|circa|about|around|in|the|year|years|from|to|and|or|until|till|since|before|after"
+    r"|between|by|early|mid|late)\b)*"
+)
+
+
+@functools.lru_cache(maxsize=32)
+def _year_pattern(era_names: Tuple[str, ...]) -> re.Pattern:
+    """Pattern of a year with an optional era before or after it, among the given eras."""
+    eras = "|".join(map(re.escape, sorted(era_names, key=len, reverse=True)))  # Longest first, e.g. "bce" first
+    era = r"(?P<{name}>" + eras + r")\b" if eras else r"(?P<{name}>(?!))"
+    return re.compile(
+        r"(?:\b" + era.format(name="era_before") + r"\s*)?"
+        r"\b(?P<year>\d{1,3}(?:,\d{3})+|\d+)\b"
+        r"(?:\s*" + era.format(name="era_after") + r")?"
+    )
+
+
+def parse_period(time_or_period: Optional[str], calendar: Calendar = DEFAULT_CALENDAR) -> Optional[Interval]:
+    """
+    Best effort conversion of a free text date or period into an interval of years.
+
+    Handles single years and ranges with an optional era of the calendar, e.g. "12,067 GE", "c. 11,988-12,069 G.E."
+    or "FE 498" in Asimov's calendar, and centuries, e.g. "21st century". A year without era takes the era of
+    the other years of the text. When no year of the text has an era, its numbers are only read as years of the
+    default era of the calendar if the text is a date, e.g. "c. 1990-1995", and not "3 moons" or "chapter 12".
+
+    Returns:
+        Optional[Interval]: The first and last years, or None if no year is found.
+
+    Example:
+        >>> parse_period("500 BC to AD 30")
+        (-500.0, 30.0)
+        >>> parse_period("1 to 50 FE", Calendar(eras={"ge": (1, 0), "fe": (1, 12_067)}, default_era="ge"))
+        (12068.0, 12117.0)
+        >>> parse_period("3 moons") is None
+        True
+    """
+    if not time_or_period:
+        return None
+    text = time_or_period.lower().replace(".", "")
+
+    years = []
+    for match in _CENTURY_PATTERN.finditer(text):
+        century = int(match["century"])
+        years.extend([100.0 * (century - 1), 100.0 * century - 1])
+
+    text = _CENTURY_PATTERN.sub(" ", text)
+    year_pattern = _year_pattern(tuple(calendar.eras))
+    parsed = [
+        (float(match["year"].replace(",", "")), match["era_before"] or match["era_after"])
+        for match in year_pattern.finditer(text)
+    ]
+    text_era = next((era for _, era in parsed if era is not None), None)
+    if text_era is None and not _DATE_CONTEXT_PATTERN.fullmatch(year_pattern.sub(" ", text)):
+        parsed = []  # Numbers, but not dates
+    for year, era in parsed:
+        sign, offset = calendar.eras.get(era or text_era or calendar.default_era, (1, 0))
+        years.append(sign * year + offset)
+
+    if not years:
+        return None
+    return min(years), max(years)
@@ -97,4 +97,44 @@ def extract_json_from_text(text):
             # Handle any errors in JSON decoding
             print(f"An error occurred while parsing a JSON blob: {e}")
 
-    return parsed_json_blobs
\ No newline at end of file
+    return parsed_json_blobs
+
+def strip_wikitext(text: str) -> str:
+    """
+    Plain text of a wikitext, e.g. the description of an entity taken from a fandom page.
+
+    Templates, tables, references, comments, categories and files are removed, links are replaced
+    by their displayed text, and formatting and headings are dropped. Whitespace is collapsed.
+
+    Parameters:
+    text (str): The wikitext.
+
+    Returns:
+    str: The plain text, on a single line.
+    """
+    text = re.sub(r"<!--.*?-->|<ref[^>/]*/>|<ref[^>]*>.*?</ref>", "", text, flags=re.DOTALL)
+    for nested_pattern in (r"\{\{[^{}]*\}\}", r"\{\|.*?\|\}"):  # Innermost first, as templates can be nested
+        previous = None
+        while previous != text:
+            previous, text = text, re.sub(nested_pattern, "", text, flags=re.DOTALL)
+    text = re.sub(r"\[\[(?:Category|File|Image):[^\[\]]*(?:\[\[[^\]]*\]\][^\[\]]*)*\]\]", "", text,
+                  flags=re.IGNORECASE)
+    text = re.sub(r"\[\[(?:[^\]|]*\|)?([^\]|]*)\]\]", r"\1", text)  # [[Target|Label]] or [[Target]]
+    text = re.sub(r"\[https?://\S+\s*([^\]]*)\]", r"\1", text)  # [http://example.com Label]
+    text = re.sub(r"^\s*=+[^=\n]*=+\s*$", "", text, flags=re.MULTILINE)  # Headings
+    text = re.sub(r"^[*#:;]+\s*", "", text, flags=re.MULTILINE)  # Lists and indentation
+    text = re.sub(r"'{2,}|<[^>]+>", "", text)  # Bold, italics and remaining HTML tags
+    return " ".join(text.split())
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Splits a plain text into sentences, at the spaces following a period, question or exclamation mark.
+
+    Parameters:
+    text (str): The text, e.g. issued from `strip_wikitext`.
+
+    Returns:
+    List[str]: The sentences, in order.
+    """
+    return [sentence for sentence in re.split(r"(?<=[.!?])\s+", text) if sentence]
@@ -0,0 +1,98 @@
+import threading
+from contextlib import contextmanager
+from threading import get_ident
+from typing import Iterator, Optional
+
+
+class ReadWriteLock:
+    """
+    Lock held by any number of readers at once, or by a single writer.
+
+    Writers are preferred: once a writer waits, new readers wait for it, so a steady flow of readers cannot
+    starve the writers. Both sides are reentrant for the thread holding the lock, and the writer can also read.
+    Upgrading a read lock into a write lock would deadlock against the other readers, so it raises instead.
+
+    Example:
+        >>> lock = ReadWriteLock()
+        >>> with lock.read():
+        ...     value = shared["key"]
+        >>> with lock.write():
+        ...     shared["key"] = value + 1
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()  # Entered directly when not waiting, it is faster than the condition
+        self._condition = threading.Condition(self._mutex)
+        self._readers = 0  # Threads holding the read lock
+        self._waiting_writers = 0
+        self._writer: Optional[int] = None  # Identifier of the thread holding the write lock
+        # Read depth of each thread, for reentrancy, and whether its read is counted in the readers:
+        # the reads of the writer are not, until it releases the write lock while still reading
+        self._local = threading.local()
+
+    def acquire_read(self) -> None:
+        depth = getattr(self._local, "read_depth", 0)
+        if depth == 0:
+            self._local.counted_read = self._writer != get_ident()
+            if self._local.counted_read:
+                with self._mutex:
+                    while self._writer is not None or self._waiting_writers:
+                        self._condition.wait()
+                    self._readers += 1
+        self._local.read_depth = depth + 1
+
+    def release_read(self) -> None:
+        depth = self._local.read_depth - 1
+        self._local.read_depth = depth
+        if depth == 0 and self._local.counted_read:
+            self._local.counted_read = False
+            with self._mutex:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        """
+        Raises:
+            RuntimeError: If the thread holds the read lock but not the write lock.
+        """
+        if self._writer == get_ident():
+            self._local.write_depth += 1
+            return
+        if getattr(self._local, "read_depth", 0):
+            raise RuntimeError("A read lock cannot be upgraded to a write lock.")
+        with self._mutex:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = get_ident()
+        self._local.write_depth = 1
+
+    def release_write(self) -> None:
+        self._local.write_depth -= 1
+        if self._local.write_depth == 0:
+            with self._mutex:
+                self._writer = None
+                if getattr(self._local, "read_depth", 0) and not self._local.counted_read:
+                    self._readers += 1  # Still reading, so other writers wait for this thread
+                    self._local.counted_read = True
+                self._condition.notify_all()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
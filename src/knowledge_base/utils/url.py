@@ -1,9 +1,16 @@
 import urllib.parse
 
 
-def _get_fandom_base_url(fandom_url: str) -> str:
-    parsed_url = urllib.parse.urlparse(fandom_url)
-    return f"{parsed_url.scheme}://{parsed_url.netloc}"
+def get_fandom_base_url(fandom_url: str) -> str:
+    """
+    Base URL of a Fandom wiki, identifying it whatever the page of the given URL.
+
+    Example:
+        >>> get_fandom_base_url("https://Asimov.fandom.com/wiki/Hari_Seldon")
+        'https://asimov.fandom.com'
+    """
+    parsed_url = urllib.parse.urlparse(fandom_url.strip())
+    return f"{parsed_url.scheme}://{parsed_url.netloc.lower()}"
 
 
 def get_fandom_statistics_page_url(fandom_url: str) -> str:
@@ -17,7 +24,7 @@ def get_fandom_statistics_page_url(fandom_url: str) -> str:
     Returns:
         The URL of the Special:Statistics page.
     """
-    base_url = _get_fandom_base_url(fandom_url)
+    base_url = get_fandom_base_url(fandom_url)
     statistics_path = "wiki/Special:Statistics"
     return urllib.parse.urljoin(base_url + "/", statistics_path)
 
@@ -34,5 +41,5 @@ def get_fandom_page_url(page_name: str, fandom_url: str) -> str:
     Returns:
         The constructed Fandom URL for the character.
     """
-    base_url = _get_fandom_base_url(fandom_url)
+    base_url = get_fandom_base_url(fandom_url)
     return urllib.parse.urljoin(base_url + "/", page_name)
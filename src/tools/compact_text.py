@@ -0,0 +1,136 @@
+"""
+Compact text of the outputs of the tools, to spend as few tokens as possible on them in the context of the model.
+
+IDs and empty fields are dropped, long field names are abbreviated, and lists of records are written as tables,
+their field names being written once in a header. The text is cut at a maximum length, between lines when possible.
+"""
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from knowledge_base.models.entities import Entity
+from knowledge_base.models.relationships import Relationship
+
+# The model only needs names, the IDs are left to the code
+_DROPPED_FIELDS = {"id", "source_entity_id", "target_entity_id", "metadata"}
+_ABBREVIATED_FIELDS = {
+    "relationship_type": "type",
+    "time_or_period": "period",
+    "physical_description": "looks",
+    "personality_traits": "traits",
+}
+_CUT_MARKER = "… ({} more characters)"
+
+DEFAULT_MAX_LENGTH = 3000
+
+
+def to_compact_text(value: Any, max_length: Optional[int] = DEFAULT_MAX_LENGTH) -> str:
+    """
+    Compact text of a tool output: entities, relationships, and dictionaries or lists of them.
+
+    Args:
+        value: The output.
+        max_length: Maximum length of the text, unlimited if None.
+
+    Example:
+        >>> print(to_compact_text({"entities": [hari, gaal], "not_found": {"Gall": ["Gaal Dornick"]}}))
+        entities:
+        type | name | description | aliases
+        Character | Hari Seldon | The founder of psychohistory. | Raven Seldon
+        Character | Gaal Dornick | A young mathematician from Synnax. |
+        not_found: Gall: Gaal Dornick
+    """
+    simplified = _simplify(value)
+    text = "\n".join(_lines(simplified)) if isinstance(simplified, (dict, list)) else _inline(simplified)
+    return _cut(text, max_length)
+
+
+def contains_kb_models(value: Any) -> bool:
+    """Whether a value is an entity or a relationship, or a dictionary or list containing some."""
+    if isinstance(value, (Entity, Relationship)):
+        return True
+    if isinstance(value, dict):
+        return any(map(contains_kb_models, value.values()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return any(map(contains_kb_models, value))
+    return False
+
+
+def _simplify(value: Any) -> Any:
+    """Plain dictionaries, lists and scalars, without IDs nor empty values."""
+    if isinstance(value, BaseModel):
+        fields = value.model_dump(exclude=_DROPPED_FIELDS)
+        if isinstance(value, Entity):
+            fields = {"type": value.__class__.__name__, **fields}
+        value = {_ABBREVIATED_FIELDS.get(field, field): field_value for field, field_value in fields.items()}
+    if isinstance(value, dict):
+        simplified = {
+            str(key): _simplify(item) for key, item in value.items() if str(key) not in _DROPPED_FIELDS
+        }
+        return {key: item for key, item in simplified.items() if not _is_empty(item)}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [item for item in map(_simplify, value) if not _is_empty(item)]
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, (str, list, dict)) and not value)
+
+
+def _is_record(value: Any) -> bool:
+    """A dictionary whose values fit in a table cell."""
+    return isinstance(value, dict) and all(_is_scalar(item) or _is_scalar_list(item) for item in value.values())
+
+
+def _is_scalar(value: Any) -> bool:
+    return not isinstance(value, (dict, list))
+
+
+def _is_scalar_list(value: Any) -> bool:
+    return isinstance(value, list) and all(map(_is_scalar, value))
+
+
+def _lines(value: Any) -> List[str]:
+    if isinstance(value, list) and value and all(map(_is_record, value)):
+        return _table(value)
+    if isinstance(value, list):
+        return [f"- {_inline(item)}" for item in value]
+    if isinstance(value, dict):
+        lines = []
+        for key, item in value.items():
+            if isinstance(item, (dict, list)) and not _is_record(item) and not _is_scalar_list(item):
+                lines.append(f"{key}:")
+                lines.extend(_lines(item))
+            else:
+                lines.append(f"{key}: {_inline(item)}")
+        return lines
+    return [_inline(value)]
+
+
+def _table(records: List[Dict[str, Any]]) -> List[str]:
+    """Records with their field names once, in a header, missing fields being left blank."""
+    columns = list(dict.fromkeys(key for record in records for key in record))
+    return [" | ".join(columns)] + [
+        " | ".join(_inline(record[column]).replace("|", "/") if column in record else "" for column in columns)
+        for record in records
+    ]
+
+
+def _inline(value: Any) -> str:
+    if isinstance(value, dict):
+        return "; ".join(f"{key}: {_inline(item)}" for key, item in value.items())
+    if isinstance(value, list):
+        return ", ".join(map(_inline, value))
+    return " ".join(str(value).split())
+
+
+def _cut(text: str, max_length: Optional[int]) -> str:
+    if max_length is None or len(text) <= max_length:
+        return text
+    end = max_length - len(_CUT_MARKER.format(len(text)))
+    line_end = text.rfind("\n", 0, end)
+    end = line_end + 1 if line_end > 0 else max(end, 0)
+    return text[:end] + _CUT_MARKER.format(len(text) - end)
@@ -1,12 +1,27 @@
 from smolagents import tool
 
+from knowledge_base.index.full_text import tokenize
 from knowledge_base.models.entities import Entity
 from knowledge_base.models.knowledge_base import KnowledgeBase
-from knowledge_base.models.relationships import Relationship
+from knowledge_base.utils.regex import split_sentences, strip_wikitext
+from tools.compact_text import to_compact_text
+
+
+# Descriptions are cut to this length in relationship tables, enough for their first sentence or two
+_MAX_DESCRIPTION_LENGTH = 120
+_MORE_RELATIONSHIPS_LINE = "({} more relationships, raise max_chars to see them)"
+# Name shown for an entity missing from the knowledge base, or unknown to the character playing
+_UNKNOWN_NAME = "(unknown)"
+
+
+def _shorten(text: str, max_length: int = _MAX_DESCRIPTION_LENGTH) -> str:
+    """Single line version of a text for a table cell, cut to `max_length` characters."""
+    text = " ".join(text.split()).replace("|", "/")
+    return text if len(text) <= max_length else text[:max_length - 1] + "…"
 
 
 @tool
-def get_character_infos(kb: KnowledgeBase, character_name: str) -> Entity | None:
+def get_character_infos(kb: KnowledgeBase, character_name: str) -> str:
     """
     Retrieve the content of a node for a given character.
 
@@ -19,73 +34,333 @@ def get_character_infos(kb: KnowledgeBase, character_name: str) -> Entity | None
                              This name must exactly match the name stored in the knowledge base.
 
     Returns:
-        Dict[str, Any]: A dictionary containing the node attributes of the character.
-                        This includes properties such as the character's name, description, and other metadata.
+        str: The attributes of the character, one per line, such as their name, description, aliases
+            and abilities. Empty attributes are left out.
 
     Example:
         >>> kb = KnowledgeBase()
-        >>> character_info = get_character_infos(kb=kb, character_name="Gandalf")
-        >>> print(character_info.__dict__)
-        {
-            'id': UUID('e895bb12-e2aa-4e02-81e6-c7a859445e4e'),
-            'name': 'Gandalf',
-            'description': 'A wise and powerful wizard.',
-            'abilities': ["magic spells", "ancient tongues", "great history knowledge", "fireworks"],
-            'aliases': ["Gandalaf the Grey", "Grand Elf"],
-            'metadata': {},
-            'occupation': "Concellor of",
-            'personality_traits': [],
-            'physical_description': {},
-            'species': "Human",
-            'time_or_period': None
-        }
-    """
-    return kb.get_entity_by_name(character_name)
+        >>> print(get_character_infos(kb=kb, character_name="Gandalf"))
+        type: Character
+        name: Gandalf
+        description: A wise and powerful wizard.
+        aliases: Gandalf the Grey, Grand Elf
+        species: Human
+        abilities: magic spells, ancient tongues, great history knowledge, fireworks
+        occupation: Counsellor of the Free Peoples
+    """
+    return to_compact_text(kb.get_entity_by_name(character_name))
 
 
 @tool
-def get_all_relationships(kb: KnowledgeBase, character_name: str) -> list[Relationship]:
+def get_top_relationships(kb: KnowledgeBase, character_name: str, max_chars: int = 2000,
+                          relationship_types: list[str] | None = None) -> str:
     """
-    Retrieve all relationships associated with a given character.
+    Retrieve the most important relationships of a character, in both directions, as a compact text table.
 
-    This function collects all incoming and outgoing relationships for a specified character
-    from the knowledge base graph. It is useful for understanding how a character is connected
-    to other entities within the graph.
+    Relationships are ranked by importance (links between the same entities, centrality of the other entity),
+    and listed with the names of the linked entities, until the table reaches `max_chars` characters.
+    Long descriptions are cut. It is the cheapest way to know who and what a character is related to.
 
     Args:
         kb (KnowledgeBase): An instance of the KnowledgeBase class containing the graph data.
         character_name (str): The name of the character whose relationships are to be retrieved.
                              This name must exactly match the name stored in the knowledge base.
+        max_chars (int): Maximum length of the table, in characters (about 4 characters per token). Below the
+            length of the header and the last line, only the last line is returned.
+        relationship_types (list[str] | None): Only return relationships of these types, e.g. ["KNOWS", "FAMILY_OF"].
+            All types are returned if not given.
 
     Returns:
-        list[Relationship]: A list of relationships with the carachter's corresponding entity as source
-            or target of the graph edge.
+        str: One line per relationship, the most important first, with its source, type, target, depth
+            and description, separated by " | ". The last line tells how many relationships were left out.
+            If the character is unknown, the closest known names are returned instead.
 
     Example:
         >>> kb = KnowledgeBase()
-        >>> relationships = get_all_relationships(kb=kb, character_name="Gandalf")
-        >>> print(relationships)
-        [
-            {
-                'id': UUID('175e4632-e89b-31f3-a826-426934074099'),
-                'source_entity_id': UUID('123e4567-e89b-12d3-a456-426614174000'),
-                'target_entity_id': UUID('223e4567-e89b-12d3-a456-426614174001')
-                'relationship_type': 'FRIENDS_WITH',
-                'description': 'Gandalf is friends with Aragorn.',
-            },
+        >>> print(get_top_relationships(kb=kb, character_name="Gandalf", max_chars=200))
+        source | type | target | depth | description
+        Gandalf | MENTOR_OF | Frodo | 8 | Gandalf is a mentor to Frodo.
+        Aragorn | FRIENDS_WITH | Gandalf | 6 | Aragorn and Gandalf fought together at Helm's Deep and at the B…
+        (12 more relationships, raise max_chars to see them)
+    """
+    try:
+        ranked = kb.top_relationships(character_name, k=None, relationship_types=relationship_types)
+    except KeyError:
+        closest_names = [candidate_name for _, candidate_name, _ in kb.resolve_name(character_name, max_results=3)]
+        return f"No entity named {character_name!r}. Closest known names: {', '.join(closest_names) or 'none'}."
+    relationships = [relationship for relationship, _ in ranked]
+    linked_entities = kb.get_entities_by_ids({
+        entity_id
+        for relationship in relationships
+        for entity_id in (relationship.source_entity_id, relationship.target_entity_id)
+    })
+    names = {entity_id: entity.name for entity_id, entity in linked_entities.items()}
+
+    lines = ["source | type | target | depth | description"]
+    length = len(lines[0])
+    if relationships and length + 1 + len(_MORE_RELATIONSHIPS_LINE.format(len(relationships))) > max_chars:
+        return _MORE_RELATIONSHIPS_LINE.format(len(relationships))
+    for shown, relationship in enumerate(relationships):
+        line = " | ".join([
+            names.get(relationship.source_entity_id, _UNKNOWN_NAME),
+            relationship.relationship_type,
+            names.get(relationship.target_entity_id, _UNKNOWN_NAME),
+            str(relationship.depth) if relationship.depth is not None else "",
+            _shorten(relationship.description or ""),
+        ])
+        # Room is left for the last line, unless this relationship is the last one
+        left_out_after = len(relationships) - shown - 1
+        reserved = 1 + len(_MORE_RELATIONSHIPS_LINE.format(left_out_after)) if left_out_after else 0
+        if length + 1 + len(line) + reserved > max_chars:
+            lines.append(_MORE_RELATIONSHIPS_LINE.format(len(relationships) - shown))
+            break
+        lines.append(line)
+        length += 1 + len(line)
+    return "\n".join(lines)
+
+
+@tool
+def search_knowledge(kb: KnowledgeBase, query: str, k: int = 5) -> str:
+    """
+    Search the whole knowledge base with free text, when you do not know the exact name of what you look for.
+
+    The query is matched against the names and descriptions of all the entities and relationships, through
+    an index built in advance, so it answers open questions in a single fast call, e.g. "who built the Prime
+    Radiant?" or "war against the Foundation". Use the returned names with the other tools to know more.
+
+    Args:
+        kb (KnowledgeBase): An instance of the KnowledgeBase class containing the graph data.
+        query (str): The words to search for.
+        k (int): Maximum number of results.
+
+    Returns:
+        str: The best matches first, as a table with their name (the names of the linked entities
+            for a relationship), type, and the sentence of their description that matches the query best.
+
+    Example:
+        >>> kb = KnowledgeBase()
+        >>> print(search_knowledge(kb=kb, query="ring of power", k=2))
+        name | type | snippet
+        The One Ring | SpecialObject | The One Ring is the ring of power forged by Sauron in Mount Doom.
+        Frodo → The One Ring | CARRIES | Frodo carried the ring of power to Mordor.
+    """
+    results = kb.search(query, k=k)
+    if not results:
+        return f"Nothing found for {query!r}."
+    linked_entities = kb.get_entities_by_ids({
+        entity_id
+        for item, _ in results if not isinstance(item, Entity)
+        for entity_id in (item.source_entity_id, item.target_entity_id)
+    })
+    names = {entity_id: entity.name for entity_id, entity in linked_entities.items()}
+    query_tokens = set(tokenize(query))
+    matches = []
+    for item, _ in results:
+        if isinstance(item, Entity):
+            name, item_type = item.name, item.__class__.__name__
+        else:
+            source_name, target_name = (names.get(entity_id, _UNKNOWN_NAME)
+                                        for entity_id in (item.source_entity_id, item.target_entity_id))
+            name = f"{source_name} → {target_name}"
+            item_type = item.relationship_type
+        matches.append({"name": name, "type": item_type, "snippet": _best_snippet(item.description, query_tokens)})
+    return to_compact_text(matches)
+
+
+def _best_snippet(text: str | None, query_tokens: set[str], max_length: int = 200) -> str:
+    """The sentence of a text sharing the most words with the query, the first one on a tie."""
+    sentences = split_sentences(strip_wikitext(text or ""))
+    if not sentences:
+        return ""
+    best_sentence = max(sentences, key=lambda sentence: len(query_tokens.intersection(tokenize(sentence))))
+    return _shorten(best_sentence, max_length)
+
+
+@tool
+def get_entities_by_names(kb: KnowledgeBase, entity_names: list[str]) -> str:
+    """
+    Retrieve the content of several entities (characters, places, events, objects) at once, from their names.
+
+    This function looks up all the names in a single call, and never fails on an unknown name:
+    the names that are not found are listed with the closest known names instead.
+
+    Args:
+        kb (KnowledgeBase): An instance of the KnowledgeBase class containing the graph data.
+        entity_names (list[str]): The exact names of the entities to retrieve.
+
+    Returns:
+        str: The "entities" found, as a table with one line per entity, and for each name "not_found"
+            the closest known names.
+
+    Example:
+        >>> kb = KnowledgeBase()
+        >>> print(get_entities_by_names(kb=kb, entity_names=["Gandalf", "Frodo", "Aragon"]))
+        entities:
+        type | name | description | species
+        Character | Gandalf | A wise and powerful wizard. | Maia
+        Character | Frodo | A hobbit of the Shire. | Hobbit
+        not_found: Aragon: Aragorn
+    """
+    entities = kb.get_entities_by_names(entity_names)
+    return to_compact_text({
+        "entities": list(entities.values()),
+        "not_found": {
+            name: [candidate_name for _, candidate_name, _ in kb.resolve_name(name, max_results=3)]
+            for name in entity_names if name not in entities
+        },
+    })
+
+
+@tool
+def get_entities_by_ids(kb: KnowledgeBase, entity_ids: list[str]) -> str:
+    """
+    Retrieve the content of several entities at once, from their IDs, e.g. the `id` of the character you play
+    or of the entities and relationships your code handles.
+
+    Args:
+        kb (KnowledgeBase): An instance of the KnowledgeBase class containing the graph data.
+        entity_ids (list[str]): The IDs of the entities to retrieve.
+
+    Returns:
+        str: The entities found, as a table with one line per entity, in the order of the IDs.
+            Unknown and malformed IDs are left out.
+
+    Example:
+        >>> kb = KnowledgeBase()
+        >>> print(get_entities_by_ids(kb=kb, entity_ids=["123e4567-e89b-12d3-a456-426614174000", "not an id"]))
+        type | name | description | species
+        Character | Gandalf | A wise and powerful wizard. | Maia
+    """
+    return to_compact_text(list(kb.get_entities_by_ids(entity_ids).values()))
+
+
+@tool
+def get_relationships_for(kb: KnowledgeBase, entity_names: list[str],
+                          relationship_types: list[str] | None = None) -> str:
+    """
+    Retrieve the relationships of several entities at once, in both directions, with the names of the linked entities.
+
+    Args:
+        kb (KnowledgeBase): An instance of the KnowledgeBase class containing the graph data.
+        entity_names (list[str]): The exact names of the entities. Unknown names are left out.
+        relationship_types (list[str] | None): Only return relationships of these types, e.g. ["KNOWS", "FAMILY_OF"].
+            All types are returned if not given.
+
+    Returns:
+        str: The relationships of each entity found, under its name, the deepest relationships first.
+            Each relationship has its source and target names, type, depth and description.
+
+    Example:
+        >>> kb = KnowledgeBase()
+        >>> print(get_relationships_for(kb=kb, entity_names=["Gandalf"]))
+        Gandalf:
+        source | target | type | depth | description
+        Gandalf | Aragorn | FRIENDS_WITH | 6 | Gandalf is friends with Aragorn.
+        Frodo | Gandalf | KNOWS | | Frodo met Gandalf in the Shire.
+    """
+    entities = kb.get_entities_by_names(entity_names)
+    relationships = kb.relationships_for(
+        [entity.id for entity in entities.values()], relationship_types=relationship_types,
+    )
+    linked_entities = kb.get_entities_by_ids({
+        entity_id
+        for entity_relationships in relationships.values()
+        for relationship in entity_relationships
+        for entity_id in (relationship.source_entity_id, relationship.target_entity_id)
+    })
+    names = {entity_id: entity.name for entity_id, entity in linked_entities.items()}
+    return to_compact_text({
+        name: [
             {
-                'id': 'UUID('175e4626-e89b-18c3-a826-426000074000')',
-                'source_entity_id': UUID('123e4567-e89b-12d3-a456-426614174000'),
-                'target_entity_id': UUID('323e4567-e89b-12d3-a456-426614174002')
-                'relationship_type': 'MENTOR_OF',
-                'description': 'Gandalf is a mentor to Frodo.',
+                "source": names.get(relationship.source_entity_id, _UNKNOWN_NAME),
+                "target": names.get(relationship.target_entity_id, _UNKNOWN_NAME),
+                "type": relationship.relationship_type,
+                "depth": relationship.depth,
+                "description": relationship.description,
             }
+            for relationship in relationships.get(entity.id, [])
         ]
+        for name, entity in entities.items()
+    })
+
+
+@tool
+def get_neighborhood(kb: KnowledgeBase, entity_name: str, hops: int = 2,
+                     relationship_types: list[str] | None = None) -> str:
+    """
+    Retrieve the entities around a given entity and the relationships linking them, in a single call.
+
+    This function explores the knowledge base graph from an entity, following relationships in both directions,
+    up to a number of hops. It is useful to get the context of a character (the people they know, the places
+    of the events they took part in, ...) without chaining several relationship queries.
+
+    Args:
+        kb (KnowledgeBase): An instance of the KnowledgeBase class containing the graph data.
+        entity_name (str): The name of the entity at the center of the neighborhood.
+        hops (int): Maximum number of relationships between the center and a returned entity, 1 or 2 usually.
+        relationship_types (list[str] | None): Only follow relationships of these types, e.g. ["KNOWS", "FAMILY_OF"].
+            All types are followed if not given.
+
+    Returns:
+        str: The reached "entities" (name, type and number of hops from the center)
+            and the "relationships" between them (source and target names, type, depth and description),
+            as two tables.
+
+    Example:
+        >>> kb = KnowledgeBase()
+        >>> print(get_neighborhood(kb=kb, entity_name="Gandalf", hops=1))
+        entities:
+        name | type | hops
+        Gandalf | Character | 0
+        Aragorn | Character | 1
+        relationships:
+        source | target | type | depth | description
+        Gandalf | Aragorn | FRIENDS_WITH | 6 | Gandalf is friends with Aragorn.
+        Aragorn | Gandalf | KNOWS | | Aragorn met Gandalf in Bree.
+    """
+    neighborhood = kb.neighborhood(entity_name, hops=hops, relationship_types=relationship_types)
+    names = {entity.id: entity.name for entity, _ in neighborhood.entities}
+    return to_compact_text({
+        "entities": [
+            {"name": entity.name, "type": entity.__class__.__name__, "hops": entity_hops}
+            for entity, entity_hops in neighborhood.entities
+        ],
+        "relationships": [
+            {
+                "source": names.get(relationship.source_entity_id, _UNKNOWN_NAME),
+                "target": names.get(relationship.target_entity_id, _UNKNOWN_NAME),
+                "type": relationship.relationship_type,
+                "depth": relationship.depth,
+                "description": relationship.description,
+            }
+            for relationship in neighborhood.relationships
+        ],
+    })
+
+
+@tool
+def find_connection(kb: KnowledgeBase, entity_name: str, other_entity_name: str) -> str:
+    """
+    Explain how two entities are connected, through the shortest chains of relationships between them.
+
+    This function searches the knowledge base graph for the shortest paths linking two entities, following
+    relationships in both directions. It is useful to answer questions like "how do you know X?" or
+    "what links X to Y?" in a single call.
+
+    Args:
+        kb (KnowledgeBase): An instance of the KnowledgeBase class containing the graph data.
+        entity_name (str): The name of the first entity, e.g. the character you are playing.
+        other_entity_name (str): The name of the second entity.
+
+    Returns:
+        str: A few shortest paths, one per line, each one being the descriptions of its relationships in order,
+            separated by arrows. It is empty if the entities are not connected by a short path.
+
+    Example:
+        >>> kb = KnowledgeBase()
+        >>> print(find_connection(kb=kb, entity_name="Frodo", other_entity_name="Aragorn"))
+        - Gandalf is a mentor to Frodo. → Gandalf is friends with Aragorn.
     """
-    entity = kb.get_entity_by_name(character_name)
-    edges = kb.graph.edges(entity.id)
-    return [
-        data["relationship"].__dict__
-        for source, target in edges
-        for relationship_id, data in kb.graph.get_edge_data(source, target).items()
-    ]
+    return to_compact_text([
+        " → ".join(path.describe()) for path in kb.explain_connection(entity_name, other_entity_name)
+    ])
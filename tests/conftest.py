@@ -0,0 +1,82 @@
+import pytest
+
+from knowledge_base.models.entities import Character, Place, Event, SpecialObject
+from knowledge_base.models.knowledge_base import KnowledgeBase
+from knowledge_base.models.relationships import Relationship, RELATIONSHIP_TYPE_MISC, RELATIONSHIP_TYPE_KNOWS
+from knowledge_base.utils.period import Calendar, COMMON_ERAS
+
+# Dates of the Foundation, in Galactic Era by default, the Foundation Era starting in 12,068 GE
+FOUNDATION_CALENDAR = Calendar(eras={**COMMON_ERAS, "ge": (1, 0), "fe": (1, 12_067)}, default_era="ge")
+
+
+def make_character(name: str, **kwargs) -> Character:
+    character_kwargs = dict(
+        aliases=[],
+        abilities=[],
+        occupation=None,
+        species=None,
+        physical_description={},
+        personality_traits=[],
+    )
+    character_kwargs.update(kwargs)
+    return Character(name=name, **character_kwargs)
+
+
+@pytest.fixture
+def small_kb() -> KnowledgeBase:
+    """A tiny Foundation-flavoured knowledge base with one entity of each type."""
+    kb = KnowledgeBase(calendar=FOUNDATION_CALENDAR)
+    hari = make_character(
+        "Hari Seldon",
+        aliases=["Raven Seldon"],
+        description="Hari Seldon is the mathematician who developed psychohistory on Trantor.",
+    )
+    gaal = make_character("Gaal Dornick", description="Gaal Dornick is a young mathematician from Synnax.")
+    trantor = Place(
+        name="Trantor",
+        description="Trantor is the capital planet of the Galactic Empire.",
+        location_type="Planet",
+        coordinates=None,
+    )
+    trial = Event(
+        name="Trial of Hari Seldon",
+        description="The trial of Hari Seldon took place on Trantor.",
+        time_or_period="12,067 GE",
+        event_type="Trial",
+    )
+    radiant = SpecialObject(
+        name="Prime Radiant",
+        description="The Prime Radiant stores the equations of the Seldon Plan.",
+        object_type="Artifact",
+    )
+    kb.add_entities([hari, gaal, trantor, trial, radiant])
+    kb.add_relationships([
+        Relationship(
+            source_entity_id=hari.id,
+            target_entity_id=trantor.id,
+            relationship_type=RELATIONSHIP_TYPE_MISC,
+            description="Hari Seldon lived on Trantor.",
+        ),
+        Relationship(
+            source_entity_id=gaal.id,
+            target_entity_id=hari.id,
+            relationship_type=RELATIONSHIP_TYPE_KNOWS,
+            description="Gaal Dornick was recruited by Hari Seldon.",
+            depth=7,
+        ),
+        Relationship(
+            source_entity_id=hari.id,
+            target_entity_id=trial.id,
+            relationship_type=RELATIONSHIP_TYPE_MISC,
+            description="Hari Seldon was judged during his trial.",
+            depth=8,
+            time_or_period="12,067 GE",
+        ),
+        Relationship(
+            source_entity_id=hari.id,
+            target_entity_id=radiant.id,
+            relationship_type=RELATIONSHIP_TYPE_MISC,
+            description="Hari Seldon built the Prime Radiant.",
+        ),
+    ])
+    return kb
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from smolagents import ChatMessage, FinalAnswerTool, Model
+
+from agents.personalized_agent import PersonalizedAgent
+from agents.prompt_templates.emotional_chatting import EmotionalChattingParams
+from agents.session_pool import AgentSessionPool
+from knowledge_base.models.knowledge_base import KnowledgeBase
+
+
+class CharacterNameModel(Model):
+    """Answers with the name of the character played, after a while, as a slow LLM would."""
+    delay = 0.3
+
+    def generate(self, messages, stop_sequences=None, **kwargs) -> ChatMessage:
+        time.sleep(self.delay)
+        return ChatMessage(role="assistant", content="Thought: I introduce myself.\nAct:\n```py\n"
+                                                      "final_answer(f'I am {character_name}')\n```<end_code>")
+
+
+def make_template(kb: KnowledgeBase) -> PersonalizedAgent:
+    """An agent playing Gaal Dornick by default."""
+    return PersonalizedAgent(
+        model=CharacterNameModel(),
+        tools=[FinalAnswerTool()],
+        prompt_templates=EmotionalChattingParams.prompt_template,
+        verbosity_level=0,
+        state={"character_name": "Gaal Dornick", "character": kb.get_entity_by_name("Gaal Dornick"), "kb": kb},
+    )
+
+
+def test_spawned_agents_share_the_model_and_tools_but_not_the_state(small_kb):
+    template = make_template(small_kb)
+    agent = template.spawn({"character_name": "Hari Seldon"})
+    assert agent.model is template.model and agent.tools is template.tools
+    assert agent.memory is not template.memory and agent.python_executor is not template.python_executor
+    assert agent.run("Who are you?") == "I am Hari Seldon"
+    assert template.state["character_name"] == "Gaal Dornick" and not template.memory.steps
+    assert len(agent.memory.steps) == 2  # The task and the action
+
+
+def test_sessions_chat_in_parallel_without_sharing_their_state(small_kb):
+    agent_pool = AgentSessionPool(make_template(small_kb))
+    answers = {}
+
+    def chat(session_id, character_name):
+        with agent_pool.session(session_id) as agent:
+            agent.state.update(character_name=character_name, kb=small_kb.scoped_to(character_name))
+        with agent_pool.session(session_id) as agent:
+            answers[session_id] = agent.run("Who are you?", reset=False)
+
+    start = time.perf_counter()
+    sessions = [threading.Thread(target=chat, args=(f"session_{i}", name))
+                for i, name in enumerate(["Hari Seldon", "Gaal Dornick"] * 4)]
+    for session in sessions:
+        session.start()
+    for session in sessions:
+        session.join()
+    assert time.perf_counter() - start < 4 * CharacterNameModel.delay
+    assert answers == {f"session_{i}": f"I am {name}"
+                       for i, name in enumerate(["Hari Seldon", "Gaal Dornick"] * 4)}
+    assert len(agent_pool) == 8
+
+
+def test_idle_sessions_are_evicted(small_kb):
+    now = 0.0
+    agent_pool = AgentSessionPool(make_template(small_kb), max_idle_time=60, max_sessions=2,
+                                  clock=lambda: now)
+    with agent_pool.session("first", {"character_name": "Hari Seldon"}) as first_agent:
+        pass
+    now = 30.0
+    with agent_pool.session("second"):
+        with agent_pool.session("third"):  # The least recently used idle session makes room
+            assert "first" not in agent_pool and "second" in agent_pool
+    now = 50.0
+    with agent_pool.session("third") as third_agent:
+        assert third_agent.state["character_name"] == "Gaal Dornick"
+
+    now = 100.0
+    assert agent_pool.evict_idle() == ["second"]
+    assert agent_pool.evict_idle() == []
+    with agent_pool.session("first", lambda: {"character_name": "Hari Seldon"}) as agent:
+        assert agent is not first_agent and agent.state["character_name"] == "Hari Seldon"
+    with agent_pool.session("first", lambda: pytest.fail("Not a new session")) as agent:
+        assert agent.state["character_name"] == "Hari Seldon"
+    agent_pool.close("third")
+    assert "third" not in agent_pool and len(agent_pool) == 1
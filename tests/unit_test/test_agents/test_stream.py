@@ -0,0 +1,128 @@
+import random
+
+import pytest
+from smolagents import ChatMessage, ChatMessageStreamDelta, FinalAnswerTool, Model
+
+from agents.personalized_agent import PersonalizedAgent
+from agents.prompt_templates.emotional_chatting import EmotionalChattingParams
+from agents.utils.stream import ANSWER_CHUNK, ANSWER_END_KEYWORD, ANSWER_KEYWORD, FINAL_ANSWER, STEP_DONE, \
+    KeywordStreamFilter, stream_agent_answer, stream_agent_output
+
+STEP_OUTPUTS = [
+    'Thought: Who is asking?\nAct:\n```py\nanswer = "Let me think."\nprint(get_name())\n```<end_code>',
+    'Thought: A friend.\nAct:\n```py\nanswer = "Hi Gaal! I am Hari Seldon."\nfinal_answer(answer)\n```<end_code>',
+]
+
+# Output of the chatting agent, whose thought starts like its answer
+AGENT_OUTPUT = """Thought: Wanda is my beloved granddaughter. Before my answer = 'yes' or 'no', I must be sure I can \
+trust my interlocutor. I will ask him more about his intentions first. I do not need any tool for this step.
+Act:
+```py
+answer = "May I ask you first who you are, and why you're interested in her? \\"Wanda\\" is a name I hold dear."
+final_answer(answer)
+```"""
+AGENT_ANSWER = 'May I ask you first who you are, and why you\'re interested in her? \\"Wanda\\" is a name I hold dear.'
+
+
+def random_chunks(text: str, rng: random.Random, max_length: int) -> list[str]:
+    chunks = []
+    while text:
+        length = rng.randint(1, max_length)
+        chunks.append(text[:length])
+        text = text[length:]
+    return chunks
+
+
+class ScriptedModel(Model):
+    """Streams the outputs of the steps, a few characters at a time."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def generate(self, messages, stop_sequences=None, **kwargs) -> ChatMessage:
+        return ChatMessage(role="assistant", content="".join(
+            delta.content for delta in self.generate_stream(messages, stop_sequences)))
+
+    def generate_stream(self, messages, stop_sequences=None, **kwargs):
+        output = STEP_OUTPUTS[min(self.calls, len(STEP_OUTPUTS) - 1)].removesuffix("<end_code>")
+        self.calls += 1
+        for start in range(0, len(output), 3):
+            yield ChatMessageStreamDelta(content=output[start:start + 3])
+
+
+def test_stream_agent_output_yields_the_text_between_the_keywords():
+    chunks = ["Thought: fine\nAns", "wer: Hello", " there", '"', '\nnot this']
+    assert "".join(stream_agent_output(chunks)) == ' Hello there"\nnot this'
+    assert "".join(stream_agent_output(chunks, end_keyword='"\n')) == " Hello there"
+    assert list(stream_agent_output(["No answer here"])) == []
+
+
+@pytest.mark.parametrize("max_length", [1, 2, 3, 7, 50])
+def test_randomly_chunked_agent_output_gives_the_same_answer(max_length):
+    rng = random.Random(max_length)
+    for _ in range(50):
+        chunks = random_chunks(AGENT_OUTPUT, rng, max_length)
+        stream_filter = KeywordStreamFilter(ANSWER_KEYWORD, end_keyword=ANSWER_END_KEYWORD)
+        outputs = []
+        for chunk in chunks:
+            outputs.append(stream_filter.feed(chunk))
+            assert len(stream_filter._kept) < len(ANSWER_KEYWORD)  # Bounded buffering
+        assert "".join(outputs) == AGENT_ANSWER
+        assert stream_filter.done
+        assert "".join(stream_agent_output(chunks, keyword="```py\n", end_keyword="\n```")) == (
+            AGENT_OUTPUT.split("```py\n")[1].removesuffix("\n```"))
+        assert "".join(stream_agent_output(chunks, keyword="Act:\n")) == AGENT_OUTPUT.split("Act:\n")[1]
+
+
+def reference_output(text: str, keyword: str, end_keyword: str | None) -> str:
+    """The text between the keywords, found in the whole text at once."""
+    if keyword not in text:
+        return ""
+    output = text.split(keyword, 1)[1]
+    return output.split(end_keyword, 1)[0] if end_keyword else output
+
+
+@pytest.mark.parametrize("max_length", [1, 2, 5, 50])
+def test_randomly_cut_agent_output_gives_the_answer_so_far(max_length):
+    rng = random.Random(max_length)
+    for _ in range(200):
+        text = AGENT_OUTPUT[:rng.randint(0, len(AGENT_OUTPUT))]  # As when the model stops early
+        keyword, end_keyword = rng.choice([
+            (ANSWER_KEYWORD, ANSWER_END_KEYWORD), ("```py\n", "\n```"), ("Act:", "<end_code>"), ("Thought:", None),
+        ])
+        chunks = random_chunks(text, rng, max_length)
+        assert "".join(stream_agent_output(chunks, keyword=keyword, end_keyword=end_keyword)) == (
+            reference_output(text, keyword, end_keyword))
+    assert "".join(stream_agent_output(["Answer: Hello <", "e"], end_keyword="<end>")) == " Hello <e"
+
+
+def test_answers_are_streamed_before_they_end():
+    stream_filter = KeywordStreamFilter(ANSWER_KEYWORD, end_keyword=ANSWER_END_KEYWORD)
+    assert stream_filter.feed('Act:\n```py\nanswer = "Hello ') == "Hello "
+    assert stream_filter.feed('\\"Gaal\\"') == '\\"Gaal\\'  # The last quote may start the end keyword
+    assert stream_filter.feed("!") == '"!'
+    assert stream_filter.feed('"') == ""
+    assert stream_filter.feed('\nfinal_answer(answer)') == "" and stream_filter.done
+    assert stream_filter.feed('answer = "Again"\n') == ""
+
+
+def test_final_answer_is_streamed_chunk_by_chunk():
+    agent = PersonalizedAgent(
+        model=ScriptedModel(),
+        tools=[FinalAnswerTool()],
+        prompt_templates=EmotionalChattingParams.prompt_template,
+        verbosity_level=0,
+        stream_outputs=True,
+    )
+    events = list(stream_agent_answer(agent.run("Hello Hari!", stream=True, additional_args={
+        "get_name": lambda: "Gaal Dornick"})))
+
+    kinds = [event.kind for event in events]
+    first_step_end, second_step_end = [i for i, kind in enumerate(kinds) if kind == STEP_DONE]
+    assert "".join(event.text for event in events[:first_step_end]) == "Let me think."  # A draft
+    assert "Gaal Dornick" in events[first_step_end].text  # The observations of the step
+    answer_chunks = events[first_step_end + 1:second_step_end]
+    assert {event.kind for event in answer_chunks} == {ANSWER_CHUNK} and len(answer_chunks) > 3
+    assert "".join(event.text for event in answer_chunks) == "Hi Gaal! I am Hari Seldon."
+    assert events[-1] == (FINAL_ANSWER, "Hi Gaal! I am Hari Seldon.")
@@ -0,0 +1,52 @@
+from uuid import uuid4
+
+from knowledge_base.index.attributes import IntervalIndex, RelationshipIndex
+from knowledge_base.models.relationships import Relationship, RELATIONSHIP_TYPE_FAMILY_OF, RELATIONSHIP_TYPE_KNOWS
+from knowledge_base.utils.period import Calendar
+
+
+def test_interval_index_overlapping():
+    index = IntervalIndex()
+    short, long, late = uuid4(), uuid4(), uuid4()
+    index.add(short, (10, 12))
+    index.add(long, (0, 100))
+    index.add(late, (200, 200))
+
+    assert index.overlapping(50, 60) == [long]
+    assert index.overlapping(12, 200) == [long, short, late]
+    index.remove(long)
+    assert index.overlapping(50, 60) == []
+    index.add(short, (55, 55))
+    assert index.overlapping(50, 60) == [short]
+
+
+def _relationship(relationship_type, depth=None, time_or_period=None):
+    return Relationship(source_entity_id=uuid4(), target_entity_id=uuid4(), relationship_type=relationship_type,
+                        depth=depth, time_or_period=time_or_period)
+
+
+def test_relationship_index_combines_filters():
+    parent = _relationship(RELATIONSHIP_TYPE_FAMILY_OF, depth=5, time_or_period="12,000 GE")
+    cousin = _relationship(RELATIONSHIP_TYPE_FAMILY_OF, depth=2, time_or_period="11,000-11,100 GE")
+    friend = _relationship(RELATIONSHIP_TYPE_KNOWS, depth=6)
+    index = RelationshipIndex(Calendar(eras={"ge": (1, 0)}, default_era="ge"))
+    for relationship in (parent, cousin, friend):
+        index.add(relationship)
+
+    assert index.find(relationship_type=RELATIONSHIP_TYPE_FAMILY_OF, min_depth=5) == [parent]
+    assert set(index.find(min_depth=2, max_depth=5)) == {parent, cousin}
+    assert index.find(period=(11_050, 11_060)) == [cousin]
+    assert index.find(relationship_type=RELATIONSHIP_TYPE_KNOWS, period=(0, 20_000)) == []
+    assert len(index.find()) == 3
+
+    index.add(cousin.model_copy(update={"depth": 8}))
+    index.remove(parent.id)
+    assert index.find(relationship_type=RELATIONSHIP_TYPE_FAMILY_OF, min_depth=5) == [cousin]
+
+
+def test_interval_index_build_matches_additions():
+    intervals = [(uuid4(), (start, start + length)) for start, length in ((5, 0), (1, 10), (3, 1))]
+    added = IntervalIndex()
+    for item_id, interval in intervals:
+        added.add(item_id, interval)
+    assert IntervalIndex.build(intervals).overlapping(4, 6) == added.overlapping(4, 6)
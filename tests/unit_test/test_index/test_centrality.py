@@ -0,0 +1,60 @@
+from uuid import uuid4
+
+import networkx as nx
+import numpy as np
+import pytest
+from networkx.algorithms.link_analysis.pagerank_alg import _pagerank_python
+
+from knowledge_base.index.centrality import GraphScores
+from knowledge_base.models.relationships import Relationship, RELATIONSHIP_TYPE_MISC
+
+
+def _link(source, target):
+    return Relationship(source_entity_id=source, target_entity_id=target, relationship_type=RELATIONSHIP_TYPE_MISC)
+
+
+@pytest.fixture
+def graph():
+    a, b, c, d = (uuid4() for _ in range(4))
+    relationships = [_link(a, b), _link(b, a), _link(a, c), _link(a, c), _link(c, uuid4())]
+    return [a, b, c, d], relationships
+
+
+def test_scores_match_networkx(graph):
+    entity_ids, relationships = graph
+    scores = GraphScores.build(entity_ids, relationships)
+
+    nx_graph = nx.MultiDiGraph()
+    nx_graph.add_nodes_from(entity_ids)
+    nx_graph.add_edges_from((r.source_entity_id, r.target_entity_id) for r in relationships[:-1])
+    expected_pagerank = _pagerank_python(nx_graph)
+    expected_degree = nx.degree_centrality(nx_graph)
+    for entity_id in entity_ids:
+        assert scores.pagerank_of(entity_id) == pytest.approx(expected_pagerank[entity_id], abs=1e-6)
+        assert scores.degree_of(entity_id) == pytest.approx(expected_degree[entity_id])
+    assert scores.pagerank.sum() == pytest.approx(1.0)
+    assert scores.pagerank_of(uuid4()) == 0.0
+
+
+def test_relationship_weights_count_links_and_mutual_links(graph):
+    entity_ids, relationships = graph
+    a, b, c, _ = entity_ids
+    scores = GraphScores.build(entity_ids, relationships)
+
+    # a and b link to each other, a links twice to c, the last relationship leads out of the graph
+    assert [scores.weight_of(r.id) for r in relationships] == [4.0, 4.0, 2.0, 2.0, 0.0]
+    assert scores.importance(relationships[0], a) == pytest.approx(4.0 * scores.pagerank_of(b) * 4)
+    assert scores.importance(relationships[0], b) == pytest.approx(4.0 * scores.pagerank_of(a) * 4)
+
+
+def test_round_trip_and_mismatch(graph):
+    entity_ids, relationships = graph
+    relationship_ids = [r.id for r in relationships]
+    scores = GraphScores.build(entity_ids, relationships)
+
+    restored = GraphScores.from_dict(scores.to_dict(), entity_ids, relationship_ids)
+    assert np.array_equal(restored.pagerank, scores.pagerank)
+    assert restored.weight_of(relationship_ids[2]) == 2.0
+    assert GraphScores.from_dict(scores.to_dict(), entity_ids[:-1], relationship_ids) is None
+    assert GraphScores.from_dict(None, entity_ids, relationship_ids) is None
+    assert len(GraphScores.build([], []).pagerank) == 0
@@ -0,0 +1,28 @@
+from knowledge_base.index.context_packs import ContextPack, SUMMARY_LENGTH
+
+
+def test_context_pack_summarizes_wikitext_and_round_trips(small_kb):
+    hari = small_kb.get_entity_by_name("Hari Seldon")
+    hari.description = (
+        "{{Infobox character|name=Hari Seldon|born={{Date|11,988}}}}\n"
+        "'''Hari Seldon''' was a [[Mathematics|mathematician]] of [[Helicon]].<ref>Prelude</ref> "
+        + "He developed [[psychohistory]]. " * 40
+        + "\n== Trivia ==\n[[Category:Characters]]"
+    )
+    ranked = [relationship for relationship, _ in small_kb.top_relationships(hari, k=None)]
+    linked_entities = {entity.id: entity for entity in small_kb.get_entities_by_names(
+        ["Gaal Dornick", "Trantor", "Trial of Hari Seldon", "Prime Radiant"]).values()}
+    pack = ContextPack.build(hari, ranked, linked_entities)
+
+    assert pack.summary.startswith("Hari Seldon was a mathematician of Helicon. He developed psychohistory.")
+    assert len(pack.summary) <= SUMMARY_LENGTH and pack.summary.endswith(".")
+    assert pack.relationships[0] == ranked[0].description
+    text = pack.to_text()
+    assert text.splitlines()[0] == "Hari Seldon, also known as Raven Seldon."
+    assert "Places: Trantor." in text and "- Hari Seldon built the Prime Radiant." in text
+
+    assert ContextPack.from_dict(pack.to_dict()) == pack
+    assert ContextPack.restore_all({str(hari.id): pack.to_dict()}, [hari.id]) == {hari.id: pack}
+    assert ContextPack.restore_all({str(hari.id): pack.to_dict()}, []) == {}
+    assert ContextPack.restore_all({"not an id": {}}, [hari.id]) == {}
+    assert ContextPack.restore_all(None, [hari.id]) == {}
@@ -0,0 +1,48 @@
+from uuid import uuid4
+
+from knowledge_base.index.full_text import FullTextIndex, DocumentRef, tokenize
+
+
+def test_tokenize_drops_markup_and_stop_words():
+    assert tokenize("The [[Galactic Empire|Empire]] of '''Trantor'''.") == ["galactic", "empire", "empire", "trantor"]
+    assert tokenize(None) == []
+
+
+def test_search_ranks_documents_sharing_rare_terms_first():
+    trantor, terminus, empire = DocumentRef(uuid4()), DocumentRef(uuid4()), DocumentRef(uuid4())
+    index = FullTextIndex.build([
+        (trantor, "Trantor is the capital of the Galactic Empire."),
+        (terminus, "Terminus is a planet at the edge of the Galaxy."),
+        (empire, "The Galactic Empire ruled the Galaxy."),
+    ])
+
+    assert [ref for ref, _ in index.search("capital Trantor", k=3)] == [trantor]
+    assert [ref for ref, _ in index.search("empire ruled", k=1)] == [empire]
+    assert index.search("psychohistory") == []
+
+
+def test_remove_and_dump_round_trip():
+    first, second = DocumentRef(uuid4()), DocumentRef(uuid4(), uuid4(), uuid4())
+    index = FullTextIndex.build([(first, "Hari Seldon"), (second, "Seldon Plan")])
+    index.remove(first.id)
+
+    restored = FullTextIndex.from_dict(index.to_dict([second.id]), refs=[second])
+    assert len(restored) == 1
+    assert restored.search("seldon") == index.search("seldon")
+    assert restored.search("hari") == []
+    assert restored.search("plan")[0][0].is_relationship
+
+
+def test_replacing_a_document_only_visits_its_postings():
+    ref, other = DocumentRef(uuid4()), DocumentRef(uuid4())
+    index = FullTextIndex.build([(ref, "Hari Seldon"), (other, "Seldon Plan")])
+    index.add(ref, "Gaal Dornick")
+    index.add(ref, None)  # e.g. a relationship losing its description
+
+    assert index.search("hari") == [] and index.search("gaal") == []
+    assert [found for found, _ in index.search("seldon")] == [other]
+    assert index._postings == {"seldon": {1: 1}, "plan": {1: 1}}
+
+    restored = FullTextIndex.from_dict(index.to_dict([ref.id, other.id]), refs=[ref, other])
+    restored.remove(other.id)
+    assert restored._postings == {} and len(restored) == 1
@@ -0,0 +1,41 @@
+from uuid import uuid4
+
+import pytest
+
+from knowledge_base.index.fuzzy import NameIndex, normalize_name, trigrams
+
+
+def test_normalize_name():
+    assert normalize_name("  Ébling-Mis! ") == "ebling mis"
+
+
+def test_trigrams_are_padded_per_word():
+    assert trigrams("hari") == {"  h", " ha", "har", "ari", "ri "}
+
+
+@pytest.fixture
+def name_index():
+    index = NameIndex()
+    index.hari, index.salvor, index.hober = uuid4(), uuid4(), uuid4()
+    index.add(index.hari, ["Hari Seldon", "Raven Seldon"])
+    index.add(index.salvor, ["Salvor Hardin"])
+    index.add(index.hober, ["Hober Mallow"])
+    return index
+
+
+def test_resolve_misspelled_names(name_index):
+    assert name_index.resolve("Hary Seldom", max_results=1)[0][:2] == (name_index.hari, "Hari Seldon")
+    assert name_index.resolve("raven seldon")[0] == (name_index.hari, "Raven Seldon", 1.0)
+    assert name_index.resolve("Salvo Hardin")[0][0] == name_index.salvor
+    assert name_index.resolve("Trantor") == []
+
+
+def test_resolve_returns_each_entity_once(name_index):
+    entity_ids = [entity_id for entity_id, _, _ in name_index.resolve("Seldon", min_score=0.0)]
+    assert entity_ids.count(name_index.hari) == 1
+
+
+def test_remove(name_index):
+    name_index.remove(name_index.hari)
+    assert name_index.hari not in [entity_id for entity_id, _, _ in name_index.resolve("Hari Seldon")]
+    assert len(name_index) == 2
@@ -0,0 +1,45 @@
+from uuid import uuid4
+
+import numpy as np
+
+from knowledge_base.index.full_text import DocumentRef
+from knowledge_base.index.vector import HashingEmbedder, VectorIndex
+
+
+def test_hashing_embedder_is_deterministic():
+    embedder = HashingEmbedder(dimension=64)
+    vectors = embedder(["Trantor is the capital.", "Trantor is the capital.", ""])
+    assert vectors.shape == (3, 64)
+    assert np.array_equal(vectors[0], vectors[1])
+    assert not vectors[2].any()
+
+
+def test_search_ranks_by_cosine_similarity():
+    trantor, terminus = DocumentRef(uuid4()), DocumentRef(uuid4())
+    index = VectorIndex.build([
+        (trantor, "Trantor is the capital of the Galactic Empire."),
+        (terminus, "Terminus is a planet at the edge of the Galaxy."),
+    ], embedder=HashingEmbedder())
+
+    results = index.search("capital of the Empire", k=2)
+    assert [ref for ref, _ in results][0] == trantor
+    assert results[0][1] > results[1][1]
+    assert index.search("", k=2) == []
+
+
+def test_remove_add_and_save_round_trip(tmp_path):
+    embedder = HashingEmbedder()
+    refs = [DocumentRef(uuid4()) for _ in range(2000)]  # Grows the matrix past its initial capacity
+    index = VectorIndex.build([(ref, f"document number {i}") for i, ref in enumerate(refs)], embedder=embedder)
+    index.remove(refs[0].id)
+    index.add(refs[1], "Seldon Plan")
+    assert len(index) == 1999
+    assert index.search("Seldon Plan", k=1)[0][0] == refs[1]
+
+    path = tmp_path / "kb.vectors.npz"
+    kept_refs = refs[1:]
+    index.save(path, [ref.id for ref in kept_refs])
+    restored = VectorIndex.load(path, embedder, refs=kept_refs)
+    assert restored.search("Seldon Plan", k=3) == index.search("Seldon Plan", k=3)
+    assert VectorIndex.load(path, HashingEmbedder(dimension=32), refs=kept_refs) is None
+    assert VectorIndex.load(path, embedder, refs=kept_refs[:-1]) is None
@@ -0,0 +1,34 @@
+from uuid import uuid4
+
+import pytest
+
+from knowledge_base.index.visibility import GraphPositions, KnowledgeMask
+
+
+@pytest.fixture
+def positions():
+    return GraphPositions(entity_ids=[uuid4() for _ in range(20)], relationship_ids=[uuid4() for _ in range(3)])
+
+
+def _mask(positions, entity_indices, relationship_indices=()):
+    entity_ids, relationship_ids = list(positions.entity_positions), list(positions.relationship_positions)
+    return KnowledgeMask(
+        positions,
+        entity_bits=positions.bitset(positions.entity_positions, [entity_ids[i] for i in entity_indices]),
+        relationship_bits=positions.bitset(positions.relationship_positions,
+                                           [relationship_ids[i] for i in relationship_indices]),
+    )
+
+
+def test_bit_tests_and_combinations(positions):
+    entity_ids = list(positions.entity_positions)
+    first, second = _mask(positions, [0, 9, 19], [2]), _mask(positions, [9, 10])
+
+    assert len(first.entity_bits) == 3  # 20 entities packed in 3 bytes
+    assert first.entity_flags(entity_ids[8:11] + [uuid4()]).tolist() == [False, True, False, False]
+    assert first.knows_entity(entity_ids[19]) and not first.knows_entity(entity_ids[1])
+    assert ((first & second).entity_count, (first | second).entity_count) == (1, 4)
+    assert (first | second).relationship_count == 1
+
+    with pytest.raises(ValueError):
+        _ = first & _mask(GraphPositions(entity_ids, []), [0])
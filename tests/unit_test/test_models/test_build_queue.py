@@ -0,0 +1,141 @@
+import gzip
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from knowledge_base.build_queue import BUILD_DONE, BUILD_FAILED, KnowledgeBaseBuildQueue
+from knowledge_base.models.entities import Character
+from knowledge_base.registry import KnowledgeBaseRegistry
+
+STATISTICS_PAGE = b"""<html><body>
+<form action="/wiki/Special:Statistics" method="post">
+  <div id="mw-dumps-current"><p>Current pages</p><a href="/dumps/asimov_pages_current.xml.gz">Download</a></div>
+</form>
+</body></html>"""
+
+
+def _page(page_id: int, title: str, wikitext: str) -> str:
+    return f"""
+  <page>
+    <title>{title}</title>
+    <ns>0</ns>
+    <id>{page_id}</id>
+    <revision>
+      <id>{page_id * 10}</id>
+      <timestamp>2024-01-01T00:00:00Z</timestamp>
+      <contributor><username>Librarian</username><id>1</id></contributor>
+      <text bytes="{len(wikitext)}">{wikitext}</text>
+    </revision>
+  </page>"""
+
+
+SAMPLE_DUMP = gzip.compress(f"""<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/">
+  <siteinfo><sitename>Asimov Wiki</sitename></siteinfo>
+  {_page(1, "Hari Seldon", "Hari Seldon lived on [[Trantor]]. [[Category:Characters]]")}
+  {_page(2, "Trantor", "Trantor is the capital of the Empire. [[Category:Planets]]")}
+</mediawiki>""".encode())
+
+
+class StandInFandom(BaseHTTPRequestHandler):
+    requested_paths = []
+    dump_available = True
+    dump_delay = 0.5
+
+    def do_GET(self):
+        type(self).requested_paths.append(self.path)
+        if self.path == "/wiki/Special:Statistics":
+            self._respond(STATISTICS_PAGE, "text/html")
+        elif self.path == "/dumps/asimov_pages_current.xml.gz" and self.dump_available:
+            time.sleep(self.dump_delay)  # Builds are slow, the UI thread must not wait for them
+            self._respond(SAMPLE_DUMP, "application/gzip")
+        else:
+            self.send_error(404)
+
+    def _respond(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fandom_url():
+    StandInFandom.requested_paths = []
+    StandInFandom.dump_available = True
+    StandInFandom.dump_delay = 0.5
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInFandom)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/wiki/Main_Page"
+    server.shutdown()
+    server.server_close()
+
+
+def test_knowledge_bases_are_built_in_the_background_and_cached(fandom_url, tmp_path):
+    registry = KnowledgeBaseRegistry()
+    with KnowledgeBaseBuildQueue(tmp_path, registry=registry) as build_queue:
+        start = time.perf_counter()
+        job = build_queue.submit(fandom_url)
+        assert time.perf_counter() - start < 0.5
+        assert not job.finished and fandom_url not in registry
+        assert build_queue.submit(fandom_url) == build_queue.status(fandom_url)  # Not queued twice
+
+        job = build_queue.wait(fandom_url, timeout=60)
+        assert (job.stage, job.progress, job.error) == (BUILD_DONE, 1.0, None)
+        assert job.snapshot_path == build_queue.snapshot_path(fandom_url) and job.snapshot_path.exists()
+        kb = registry.get(fandom_url)
+        assert isinstance(kb.get_entity_by_name("Hari Seldon"), Character)
+        [relationship] = kb.find_relationships()
+        assert (relationship.source_entity_id, relationship.target_entity_id) == (
+            kb.get_entity_by_name("Hari Seldon").id, kb.get_entity_by_name("Trantor").id)
+        assert StandInFandom.requested_paths.count("/dumps/asimov_pages_current.xml.gz") == 1
+
+    # Another session finds the snapshot cached
+    other_registry = KnowledgeBaseRegistry()
+    with KnowledgeBaseBuildQueue(tmp_path, registry=other_registry) as build_queue:
+        assert build_queue.submit(fandom_url).stage == BUILD_DONE
+        assert other_registry.get(fandom_url).get_entity_by_name("Trantor").name == "Trantor"
+        assert StandInFandom.requested_paths.count("/dumps/asimov_pages_current.xml.gz") == 1
+
+
+def test_failed_builds_are_reported_and_can_be_submitted_again(fandom_url, tmp_path):
+    StandInFandom.dump_available = False
+    with KnowledgeBaseBuildQueue(tmp_path) as build_queue:
+        with pytest.raises(KeyError, match="No build submitted"):
+            build_queue.wait(fandom_url)
+
+        build_queue.submit(fandom_url)
+        job = build_queue.wait(fandom_url, timeout=60)
+        assert job.stage == BUILD_FAILED and "404" in job.error
+        assert not job.snapshot_path.exists()
+
+        StandInFandom.dump_available = True
+        assert not build_queue.submit(fandom_url).finished
+        assert build_queue.wait(fandom_url, timeout=60).stage == BUILD_DONE
+
+
+def test_builds_go_on_after_a_worker_is_killed(fandom_url, tmp_path):
+    StandInFandom.dump_delay = 5.0
+    with KnowledgeBaseBuildQueue(tmp_path) as build_queue:
+        build_queue.submit(fandom_url)
+        deadline = time.monotonic() + 60
+        while build_queue.status(fandom_url).stage != "downloading" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        for worker in multiprocessing.active_children():  # As the OOM killer would
+            os.kill(worker.pid, signal.SIGKILL)
+
+        job = build_queue.wait(fandom_url, timeout=60)
+        assert job.stage == BUILD_FAILED and "BrokenProcessPool" in job.error
+
+        StandInFandom.dump_delay = 0.0
+        assert not build_queue.submit(fandom_url).finished  # Queued on new workers, not stuck
+        assert build_queue.wait(fandom_url, timeout=60).stage == BUILD_DONE
@@ -0,0 +1,157 @@
+import multiprocessing
+import pickle
+import tracemalloc
+
+import pytest
+
+from knowledge_base.models.entities import Character
+from knowledge_base.models.frozen_knowledge_base import FrozenKnowledgeBase
+from knowledge_base.models.knowledge_base import KnowledgeBase
+from tools.kb_query import find_connection, get_entities_by_names, get_neighborhood, get_relationships_for, \
+    get_top_relationships, search_knowledge
+
+
+@pytest.fixture
+def frozen_kb(small_kb, tmp_path):
+    with FrozenKnowledgeBase.open(FrozenKnowledgeBase.write(small_kb, tmp_path / "kb.frozen")) as frozen_kb:
+        yield frozen_kb
+
+
+def _names_of_neighbors(frozen_kb_path: str, name: str):
+    frozen_kb = FrozenKnowledgeBase.open(frozen_kb_path)
+    entity = frozen_kb.get_entity_by_name(name)
+    return sorted(neighbor.name for neighbor, _ in frozen_kb.neighborhood(entity).entities)
+
+
+def test_lookups_match_knowledge_base(small_kb, frozen_kb):
+    assert len(frozen_kb) == 5
+    assert frozen_kb.number_of_relationships == 4
+
+    for entity in small_kb.get_entities_by_type(Character):
+        assert frozen_kb.get_entity_by_id(entity.id) == entity
+        assert frozen_kb.get_entity_by_id(str(entity.id)) == entity
+        assert frozen_kb.get_entity_by_name(entity.name) == entity
+    assert [e.name for e in frozen_kb.get_entities_by_type(Character)] == ["Hari Seldon", "Gaal Dornick"]
+    assert frozen_kb.get_entities_by_type("Organization") == []
+
+    with pytest.raises(KeyError):
+        frozen_kb.get_entity_by_name("Salvor Hardin")
+    with pytest.raises(KeyError):
+        frozen_kb.get_entity_by_id(small_kb.get_entity_by_name("Trantor").id.hex[::-1])
+
+
+def test_graph_queries_match_knowledge_base(small_kb, frozen_kb):
+    hari = small_kb.get_entity_by_name("Hari Seldon")
+    assert {r.id for r in frozen_kb.get_relationships(hari)} == {
+        r.id for _, _, r in small_kb.graph.in_edges(hari.id, data="relationship")
+    } | {r.id for _, _, r in small_kb.graph.out_edges(hari.id, data="relationship")}
+
+    gaal = small_kb.get_entity_by_name("Gaal Dornick")
+    for kwargs in (dict(hops=1), dict(hops=2), dict(hops=2, min_depth=7), dict(relationship_types=["KNOWS"])):
+        expected = small_kb.neighborhood(gaal, **kwargs)
+        neighborhood = frozen_kb.neighborhood(gaal.id, **kwargs)
+        assert dict(neighborhood.entities) == dict(expected.entities)
+        assert set(neighborhood.relationships) == set(expected.relationships)
+
+
+def test_tool_queries_match_knowledge_base(small_kb, frozen_kb):
+    hari, trantor = small_kb.get_entity_by_name("Hari Seldon"), small_kb.get_entity_by_name("Trantor")
+    for query in ("psychohistory", "capital planet Trantor", "nothing like this"):
+        assert [(item, round(score, 6)) for item, score in frozen_kb.search(query, k=3)] == [
+            (item, round(score, 6)) for item, score in small_kb.search(query, k=3)
+        ]
+    assert frozen_kb.resolve_name("Hary Seldom") == small_kb.resolve_name("Hary Seldom")
+    assert frozen_kb.resolve_name("Raven") == small_kb.resolve_name("Raven")
+    assert frozen_kb.get_entities_by_names(["Trantor", "Hary Seldom", "Hari Seldon"]) == {
+        "Trantor": trantor, "Hari Seldon": hari,
+    }
+    assert frozen_kb.get_entities_by_ids([str(trantor.id), "not an id", hari.id]) == {
+        trantor.id: trantor, hari.id: hari,
+    }
+
+    for kwargs in (dict(), dict(relationship_types=["KNOWS"]), dict(min_depth=7)):
+        entities = ["Gaal Dornick", "Salvor Hardin", str(trantor.id), hari]
+        assert frozen_kb.relationships_for(entities, **kwargs) == small_kb.relationships_for(entities, **kwargs)
+        assert [(r, round(score, 6)) for r, score in frozen_kb.top_relationships("Hari Seldon", k=None, **kwargs)] \
+               == [(r, round(score, 6)) for r, score in small_kb.top_relationships("Hari Seldon", k=None, **kwargs)]
+    assert frozen_kb.explain_connection("Gaal Dornick", "Trantor") == small_kb.explain_connection(
+        "Gaal Dornick", "Trantor",
+    )
+    assert frozen_kb.explain_connection(hari, hari) == small_kb.explain_connection(hari, hari)
+    assert frozen_kb.context_pack("Gaal Dornick") == small_kb.context_pack("Gaal Dornick")
+    with pytest.raises(KeyError, match="Hari Seldon"):
+        frozen_kb.top_relationships("Hary Seldom")
+
+
+def test_scoped_view_matches_knowledge_base(small_kb, frozen_kb):
+    view, frozen_view = small_kb.scoped_to("Gaal Dornick"), frozen_kb.scoped_to("Gaal Dornick")
+    assert frozen_view.mask.entity_count == view.mask.entity_count == 3
+    assert frozen_view.mask.relationship_count == view.mask.relationship_count
+    assert frozen_view.search("Trantor") == view.search("Trantor")
+    assert frozen_view.neighborhood("Hari Seldon", hops=2) == view.neighborhood("Hari Seldon", hops=2)
+    assert frozen_view.get_entities_by_names(["Trantor", "Hari Seldon"]) == view.get_entities_by_names(
+        ["Trantor", "Hari Seldon"]
+    )
+    with pytest.raises(KeyError, match="unknown to the character"):
+        frozen_view.get_entity_by_name("Trantor")
+
+
+def test_tools_answer_from_frozen_knowledge_base(small_kb, frozen_kb):
+    for kb in (small_kb, small_kb.scoped_to("Gaal Dornick")):
+        frozen = frozen_kb if kb is small_kb else frozen_kb.scoped_to("Gaal Dornick")
+        assert get_top_relationships(kb=frozen, character_name="Hari Seldon") == \
+               get_top_relationships(kb=kb, character_name="Hari Seldon")
+        assert get_top_relationships(kb=frozen, character_name="Hary") == \
+               get_top_relationships(kb=kb, character_name="Hary")
+        assert search_knowledge(kb=frozen, query="trial on Trantor") == \
+               search_knowledge(kb=kb, query="trial on Trantor")
+        assert get_entities_by_names(kb=frozen, entity_names=["Hari Seldon", "Trantr"]) == \
+               get_entities_by_names(kb=kb, entity_names=["Hari Seldon", "Trantr"])
+        assert get_relationships_for(kb=frozen, entity_names=["Hari Seldon"]) == \
+               get_relationships_for(kb=kb, entity_names=["Hari Seldon"])
+        assert get_neighborhood(kb=frozen, entity_name="Gaal Dornick") == \
+               get_neighborhood(kb=kb, entity_name="Gaal Dornick")
+        assert find_connection(kb=frozen, entity_name="Gaal Dornick", other_entity_name="Trial of Hari Seldon") == \
+               find_connection(kb=kb, entity_name="Gaal Dornick", other_entity_name="Trial of Hari Seldon")
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = tmp_path / "kb.json"
+    path.write_bytes(b"{}" * 16)
+    with pytest.raises(ValueError):
+        FrozenKnowledgeBase.open(path)
+
+
+def test_empty_knowledge_base(tmp_path):
+    with FrozenKnowledgeBase.open(FrozenKnowledgeBase.write(KnowledgeBase(), tmp_path / "kb.frozen")) as frozen_kb:
+        assert len(frozen_kb) == 0
+        assert frozen_kb.get_entities_by_type(Character) == []
+        with pytest.raises(KeyError):
+            frozen_kb.get_entity_by_name("Hari Seldon")
+
+
+def test_open_does_not_copy_the_data(small_kb, tmp_path):
+    for i in range(2000):
+        small_kb.add_entity(Character(
+            name=f"Extra {i}", description="An extra. " * 20, aliases=[], abilities=[], occupation=None,
+            species=None, physical_description={}, personality_traits=[],
+        ))
+    path = FrozenKnowledgeBase.write(small_kb, tmp_path / "kb.frozen")
+
+    tracemalloc.start()
+    frozen_kb = FrozenKnowledgeBase.open(path)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert allocated < path.stat().st_size / 10
+    assert frozen_kb.get_entity_by_name("Extra 1999").description.startswith("An extra.")
+    frozen_kb.close()
+
+
+def test_workers_share_the_file(frozen_kb):
+    clone = pickle.loads(pickle.dumps(frozen_kb))
+    assert clone.path == frozen_kb.path
+    assert clone.get_entity_by_name("Trantor") == frozen_kb.get_entity_by_name("Trantor")
+
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        neighbors = pool.apply(_names_of_neighbors, (str(frozen_kb.path), "Hari Seldon"))
+    assert neighbors == ["Gaal Dornick", "Hari Seldon", "Prime Radiant", "Trantor", "Trial of Hari Seldon"]
@@ -0,0 +1,432 @@
+import threading
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from knowledge_base.models.entities import Character, Place
+from knowledge_base.models.knowledge_base import KnowledgeBase
+from knowledge_base.models.relationships import Relationship, RELATIONSHIP_TYPE_MISC
+from knowledge_base.utils.period import Calendar
+
+
+def _dump_graph(kb: KnowledgeBase):
+    nodes = {node: (data["type"], data["entity"].model_dump()) for node, data in kb.graph.nodes(data=True)}
+    edges = {key: data["relationship"].model_dump() for _, _, key, data in kb.graph.edges(keys=True, data=True)}
+    return nodes, edges
+
+
+def test_add_entities_skips_known_ids(small_kb):
+    hari = small_kb.get_entity_by_name("Hari Seldon")
+    number_of_nodes = small_kb.graph.number_of_nodes()
+    small_kb.add_entities([hari, hari])
+    assert small_kb.graph.number_of_nodes() == number_of_nodes
+
+
+@pytest.mark.parametrize("trusted", [False, True])
+def test_from_json_round_trip(small_kb, tmp_path, trusted):
+    small_kb.save_kb(tmp_path / "kb.json", compress=True)
+    loaded_kb = KnowledgeBase.from_json(tmp_path / "kb.json.gz", trusted=trusted)
+
+    assert _dump_graph(loaded_kb) == _dump_graph(small_kb)
+    assert loaded_kb.map_entity_name_to_id == small_kb.map_entity_name_to_id
+    assert isinstance(loaded_kb.get_entity_by_name("Hari Seldon"), Character)
+    assert isinstance(loaded_kb.get_entity_by_name("Trantor"), Place)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("trusted", [False, True])
+def test_from_json_stream_round_trip(small_kb, tmp_path, compress, trusted):
+    small_kb.save_kb(tmp_path / "kb.json", compress=compress)
+    snapshot_path = tmp_path / ("kb.json.gz" if compress else "kb.json")
+    loaded_kb = KnowledgeBase.from_json_stream(snapshot_path, trusted=trusted, batch_size=2)
+
+    assert _dump_graph(loaded_kb) == _dump_graph(small_kb)
+    assert list(loaded_kb.graph.nodes) == list(small_kb.graph.nodes)
+    assert loaded_kb.map_entity_name_to_id == small_kb.map_entity_name_to_id
+    # The dumped indexes, streamed term by term and entity by entity, are restored rather than built again
+    assert loaded_kb.entity_ids_by_type == small_kb.entity_ids_by_type
+    assert loaded_kb._graph_scores.to_dict() == small_kb.graph_scores.to_dict()
+    assert loaded_kb._context_packs == small_kb._context_packs
+    assert (loaded_kb.full_text_index.to_dict(loaded_kb._snapshot_document_ids())
+            == small_kb.full_text_index.to_dict(small_kb._snapshot_document_ids()))
+
+
+def test_save_kb_raises_when_the_snapshot_cannot_be_written(small_kb, tmp_path):
+    with pytest.raises(OSError):
+        small_kb.save_kb(tmp_path / "missing_dir" / "kb.json", compress=True)
+
+
+def test_search_follows_mutations_and_snapshots(small_kb, tmp_path):
+    assert small_kb.search("psychohistory", k=1)[0][0].name == "Hari Seldon"
+    assert {type(item).__name__ for item, _ in small_kb.search("Prime Radiant", k=5)} == {
+        "SpecialObject", "Relationship",
+    }
+
+    radiant = small_kb.get_entity_by_name("Prime Radiant")
+    small_kb.update_entity(radiant.model_copy(update={"description": "A device holding psychohistory equations."}))
+    assert {item.name for item, _ in small_kb.search("psychohistory", k=5)} == {"Hari Seldon", "Prime Radiant"}
+    small_kb.remove_entity(radiant.id)
+    assert all(getattr(item, "name", None) != "Prime Radiant" for item, _ in small_kb.search("Radiant", k=5))
+
+    small_kb.save_kb(tmp_path / "kb.json", compress=True)
+    loaded_kb = KnowledgeBase.from_json_stream(tmp_path / "kb.json.gz", trusted=True)
+    assert loaded_kb.search("Trantor capital", k=3) == small_kb.search("Trantor capital", k=3)
+
+
+def test_resolve_name_and_suggestions(small_kb):
+    entity, name, _ = small_kb.resolve_name("Raven Seldom", max_results=1)[0]
+    assert (entity.name, name) == ("Hari Seldon", "Raven Seldon")
+    with pytest.raises(KeyError, match="Did you mean one of \\['Hari Seldon'"):
+        small_kb.get_entity_by_name("Hary Seldon")
+
+
+def test_semantic_search_follows_mutations_and_snapshots(small_kb, tmp_path):
+    assert small_kb.semantic_search("capital planet of the Empire", k=1)[0][0].name == "Trantor"
+
+    trantor = small_kb.get_entity_by_name("Trantor")
+    small_kb.remove_entity(trantor.id)
+    assert all(getattr(item, "name", None) != "Trantor" for item, _ in small_kb.semantic_search("Trantor", k=10))
+
+    small_kb.save_kb(tmp_path / "kb.json", compress=True)
+    assert (tmp_path / "kb.vectors.npz").exists()
+    loaded_kb = KnowledgeBase.from_json(tmp_path / "kb.json.gz", trusted=True)
+    assert loaded_kb.vector_index is not None
+    assert loaded_kb.semantic_search("psychohistory", k=3) == small_kb.semantic_search("psychohistory", k=3)
+
+    loaded_kb.set_embedder(lambda texts: np.ones((len(texts), 8)))
+    assert loaded_kb.vector_index is None
+    assert len(loaded_kb.semantic_search("anything", k=20)) == 7
+
+
+def test_neighborhood_filters_prunes_and_caches(small_kb):
+    def names(neighborhood):
+        return {entity.name: hops for entity, hops in neighborhood.entities}
+
+    assert names(small_kb.neighborhood("Gaal Dornick", hops=1)) == {"Gaal Dornick": 0, "Hari Seldon": 1}
+    two_hops = small_kb.neighborhood("Gaal Dornick", hops=2)
+    assert names(two_hops) == {
+        "Gaal Dornick": 0, "Hari Seldon": 1, "Trantor": 2, "Trial of Hari Seldon": 2, "Prime Radiant": 2,
+    }
+    assert len(two_hops.relationships) == 4
+    assert small_kb.neighborhood("Gaal Dornick", hops=2) is two_hops
+
+    assert names(small_kb.neighborhood("Gaal Dornick", hops=2, relationship_types=["KNOWS"])) == {
+        "Gaal Dornick": 0, "Hari Seldon": 1,
+    }
+    assert names(small_kb.neighborhood("Hari Seldon", hops=1, min_depth=8)) == {
+        "Hari Seldon": 0, "Trial of Hari Seldon": 1,
+    }
+    # The deepest relationships are followed first when pruning
+    assert names(small_kb.neighborhood("Hari Seldon", hops=1, max_nodes=3)) == {
+        "Hari Seldon": 0, "Trial of Hari Seldon": 1, "Gaal Dornick": 1,
+    }
+
+    small_kb.remove_entity(small_kb.get_entity_by_name("Trantor").id)
+    assert "Trantor" not in names(small_kb.neighborhood("Gaal Dornick", hops=2))
+    with pytest.raises(KeyError, match="Did you mean"):
+        small_kb.neighborhood("Gaal Dornik")
+
+
+def test_explain_connection_returns_shortest_paths(small_kb):
+    paths = small_kb.explain_connection("Gaal Dornick", "Trantor")
+    assert [path.describe() for path in paths] == [
+        ["Gaal Dornick was recruited by Hari Seldon.", "Hari Seldon lived on Trantor."],
+    ]
+    assert [entity.name for entity in paths[0].entities] == ["Gaal Dornick", "Hari Seldon", "Trantor"]
+    assert small_kb.explain_connection("Gaal Dornick", "Trantor", max_len=1) == []
+
+    trantor, radiant, trial = (small_kb.get_entity_by_name(name)
+                               for name in ("Trantor", "Prime Radiant", "Trial of Hari Seldon"))
+    small_kb.add_relationships([
+        Relationship(source_entity_id=radiant.id, target_entity_id=trantor.id,
+                     relationship_type=RELATIONSHIP_TYPE_MISC, description="The Prime Radiant is on Trantor."),
+        Relationship(source_entity_id=trial.id, target_entity_id=trantor.id,
+                     relationship_type=RELATIONSHIP_TYPE_MISC),
+    ])
+    assert small_kb.explain_connection("Gaal Dornick", "Trantor", max_len=3)[0].describe() == [
+        "Gaal Dornick was recruited by Hari Seldon.", "Hari Seldon lived on Trantor.",
+    ]
+    assert sorted(path.describe() for path in small_kb.explain_connection(radiant, trial.id, max_paths=5)) == [
+        ["Hari Seldon built the Prime Radiant.", "Hari Seldon was judged during his trial."],
+        ["The Prime Radiant is on Trantor.", "Trial of Hari Seldon MISC Trantor"],
+    ]
+    assert small_kb.explain_connection("Trantor", str(trantor.id))[0].relationships == ()
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_entities_by_type_follow_mutations_and_snapshots(small_kb, tmp_path, stream):
+    assert [entity.name for entity in small_kb.get_entities_by_type("Character")] == ["Hari Seldon", "Gaal Dornick"]
+    assert [entity.name for entity in small_kb.get_entities_by_type(Place)] == ["Trantor"]
+    assert small_kb.get_entities_by_type("Starship") == []
+
+    gaal = small_kb.get_entity_by_name("Gaal Dornick")
+    small_kb.update_entity(Place(id=gaal.id, name="Gaal's home", location_type=None, coordinates=None))
+    small_kb.remove_entity(small_kb.get_entity_by_name("Trantor").id)
+    assert [entity.name for entity in small_kb.get_entities_by_type(Place)] == ["Gaal's home"]
+
+    small_kb.save_kb(tmp_path / "kb.json", compress=False)
+    load = KnowledgeBase.from_json_stream if stream else KnowledgeBase.from_json
+    loaded_kb = load(tmp_path / "kb.json", trusted=True)
+    assert loaded_kb.entity_ids_by_type == small_kb.entity_ids_by_type
+    assert [entity.name for entity in loaded_kb.get_entities_by_type(Character)] == ["Hari Seldon"]
+
+
+def test_find_relationships_and_entities_in_period(small_kb, tmp_path):
+    assert [r.description for r in small_kb.find_relationships(relationship_type="MISC", min_depth=8)] == [
+        "Hari Seldon was judged during his trial.",
+    ]
+    assert len(small_kb.find_relationships(period="12,000-12,100 GE")) == 1
+    assert [entity.name for entity in small_kb.find_entities_in_period("12,067 GE", entity_type="Event")] == [
+        "Trial of Hari Seldon",
+    ]
+    with pytest.raises(ValueError):
+        small_kb.find_entities_in_period("the Interregnum")
+
+    small_kb.save_kb(tmp_path / "kb.json", compress=False)
+    loaded_kb = KnowledgeBase.from_json_stream(tmp_path / "kb.json", trusted=True)
+    trial = loaded_kb.get_entity_by_name("Trial of Hari Seldon")
+    loaded_kb.update_entity(trial.model_copy(update={"time_or_period": "FE 1"}))
+    assert loaded_kb.find_entities_in_period((12_000, 12_067)) == []
+    assert loaded_kb.find_entities_in_period((12_068, 12_068)) == [trial]
+    assert len(loaded_kb.find_relationships(relationship_type="KNOWS", max_depth=7)) == 1
+
+
+def test_set_calendar_reindexes_periods(small_kb):
+    generation = small_kb.generation
+    small_kb.set_calendar(Calendar())
+    assert small_kb.generation > generation
+    assert small_kb.find_entities_in_period((12_067, 12_067)) == []  # "12,067 GE" is no date of the common era
+
+    small_kb.set_calendar(Calendar(eras={"ge": (1, 0)}))
+    assert [entity.name for entity in small_kb.find_entities_in_period((12_067, 12_067))] == ["Trial of Hari Seldon"]
+
+
+def test_batch_lookups_return_partial_results(small_kb):
+    entities = small_kb.get_entities_by_names(["Trantor", "Hary Seldom", "Hari Seldon"])
+    assert [(name, entity.name) for name, entity in entities.items()] == [
+        ("Trantor", "Trantor"), ("Hari Seldon", "Hari Seldon"),
+    ]
+    hari, trantor = entities["Hari Seldon"], entities["Trantor"]
+    assert small_kb.get_entities_by_ids([str(trantor.id), "not an id", hari.id, hari.id.hex[::-1]]) == {
+        trantor.id: trantor, hari.id: hari,
+    }
+
+    relationships = small_kb.relationships_for(["Gaal Dornick", "Salvor Hardin", str(trantor.id), hari])
+    assert list(relationships) == [small_kb.get_entity_by_name("Gaal Dornick").id, trantor.id, hari.id]
+    assert [r.description for r in relationships[trantor.id]] == ["Hari Seldon lived on Trantor."]
+    assert [r.depth for r in relationships[hari.id]] == [8, 7, None, None]  # Both directions, deepest first
+    assert [r.relationship_type for r in small_kb.relationships_for([hari], relationship_types=["KNOWS"])[hari.id]] \
+           == ["KNOWS"]
+
+    relationships[hari.id].clear()  # Cached lists are copied
+    assert len(small_kb.relationships_for([hari])[hari.id]) == 4
+
+    view = small_kb.scoped_to("Gaal Dornick")
+    assert list(view.get_entities_by_names(["Trantor", "Hari Seldon"])) == ["Hari Seldon"]
+    assert list(view.get_entities_by_ids([trantor.id, hari.id])) == [hari.id]
+    assert [r.depth for r in view.relationships_for([hari, trantor])[hari.id]] == [8, 7]
+
+
+def test_knowledge_of_and_scoped_view(small_kb):
+    gaal_mask = small_kb.knowledge_of("Gaal Dornick")
+    characters_and_events = small_kb.get_entities_by_type("Character") + small_kb.get_entities_by_type("Event")
+    # Only deep relationships are followed beyond the first hop
+    assert [entity.name for entity in gaal_mask.filter_entities(characters_and_events)] == [
+        "Hari Seldon", "Gaal Dornick", "Trial of Hari Seldon",
+    ]
+    assert gaal_mask.entity_count == 3
+    assert small_kb.knowledge_of("Gaal Dornick") is gaal_mask
+    assert (gaal_mask & small_kb.knowledge_of("Hari Seldon")).entity_count == 3
+    assert small_kb.knowledge_of("Gaal Dornick", min_depth=9).entity_count == 2
+
+    view = small_kb.scoped_to("Gaal Dornick")
+    with pytest.raises(KeyError, match="unknown to the character"):
+        view.get_entity_by_name("Trantor")
+    assert view.get_entity_by_name("Hari Seldon").name == "Hari Seldon"
+    assert "Trantor" not in [item.name for item, _ in view.search("Trantor", k=5) if hasattr(item, "name")]
+    assert {entity.name for entity, _ in view.neighborhood("Hari Seldon").entities} == {
+        "Hari Seldon", "Gaal Dornick", "Trial of Hari Seldon",
+    }
+    assert view.explain_connection("Gaal Dornick", "Trial of Hari Seldon")[0].describe() == [
+        "Gaal Dornick was recruited by Hari Seldon.", "Hari Seldon was judged during his trial.",
+    ]
+    for hidden_attribute in ("graph", "kb", "add_entity", "remove_entity", "get_node_attributes"):
+        with pytest.raises(AttributeError, match="its queries are"):
+            getattr(view, hidden_attribute)
+    assert all(callable(getattr(view, query)) for query in view.QUERIES)
+
+    small_kb.add_relationship(Relationship(source_entity_id=small_kb.get_entity_by_name("Gaal Dornick").id,
+                                           target_entity_id=small_kb.get_entity_by_name("Trantor").id,
+                                           relationship_type=RELATIONSHIP_TYPE_MISC))
+    assert view.get_entity_by_name("Trantor").name == "Trantor"
+
+
+def test_scoped_view_errors_never_name_hidden_entities(small_kb):
+    view = small_kb.scoped_to("Gaal Dornick")  # Trantor and the Prime Radiant are hidden from Gaal
+    with pytest.raises(KeyError, match="Trantor"):
+        small_kb.get_entity_by_name("Trantr")  # The knowledge base itself suggests it
+
+    for query in (
+            lambda: view.get_entity_by_name("Trantr"),
+            lambda: view.neighborhood("Trantr"),
+            lambda: view.top_relationships("Prime Radiantt"),
+            lambda: view.explain_connection("Gaal Dornick", "Prime Radiantt"),
+            lambda: view.context_pack("Trantr"),
+    ):
+        with pytest.raises(KeyError) as error:
+            query()
+        assert "Trantor" not in str(error.value) and "Prime Radiant'" not in str(error.value)
+
+    # Hidden entities raise the same error as missing ones, suggesting known names only
+    trantor_id, missing_id = small_kb.get_entity_by_name("Trantor").id, uuid4()
+    with pytest.raises(KeyError) as hidden_error:
+        view.neighborhood(trantor_id)
+    with pytest.raises(KeyError) as missing_error:
+        view.neighborhood(missing_id)
+    assert hidden_error.value.args[0] == f"Entity '{trantor_id}' is unknown to the character."
+    assert missing_error.value.args[0] == f"Entity '{missing_id}' is unknown to the character."
+    with pytest.raises(KeyError, match=r"Entity 'Hary' is unknown to the character. Did you mean one of \['Hari"):
+        view.get_entity_by_name("Hary")
+
+
+def test_knowledge_masks_are_not_evicted_by_other_queries(small_kb):
+    gaal_mask = small_kb.knowledge_of("Gaal Dornick")
+    small_kb.query_cache.resize(1)
+    for query in ("psychohistory", "Trantor", "trial", "mathematician"):
+        small_kb.search(query)
+    assert small_kb.knowledge_of("Gaal Dornick") is gaal_mask
+
+    small_kb.add_entity(Character(
+        name="Salvor Hardin", description="Salvor Hardin is the mayor of Terminus.", aliases=[], abilities=[],
+        occupation=None, species=None, physical_description={}, personality_traits=[],
+    ))
+    assert small_kb.knowledge_of("Gaal Dornick") is not gaal_mask
+
+
+def test_concurrent_readers_see_whole_batches_of_writes(small_kb):
+    hari = small_kb.get_entity_by_name("Hari Seldon")
+    errors = []
+    writing = threading.Event()
+    writing.set()
+
+    def write_batches():
+        try:
+            for i in range(200):
+                student = Character(
+                    name=f"Student {i}", description=f"Student {i} of psychohistory.", aliases=[], abilities=[],
+                    occupation=None, species=None, physical_description={}, personality_traits=[],
+                )
+                with small_kb.lock.write():  # Both published at once
+                    small_kb.add_entity(student)
+                    small_kb.add_relationship(Relationship(
+                        source_entity_id=student.id, target_entity_id=hari.id,
+                        relationship_type=RELATIONSHIP_TYPE_MISC, description=f"Student {i} studied with Hari.",
+                    ))
+                if i % 10 == 0:
+                    small_kb.update_entity(hari.model_copy(update=dict(description=f"Revision {i}")))
+        except Exception as error:
+            errors.append(error)
+        finally:
+            writing.clear()
+
+    def read_while_writing():
+        try:
+            while writing.is_set():
+                with small_kb.lock.read():
+                    students = [c for c in small_kb.get_entities_by_type(Character) if c.name.startswith("Student")]
+                    neighbors = small_kb.neighborhood("Hari Seldon", hops=1, max_nodes=1000).entities
+                    assert len(neighbors) == 5 + len(students)
+                small_kb.search("psychohistory")
+                small_kb.semantic_search("student of Hari", k=3)
+                small_kb.resolve_name("Studnt 1")
+                small_kb.knowledge_of("Gaal Dornick")
+                small_kb.explain_connection("Gaal Dornick", "Trantor")
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=write_batches)] + [threading.Thread(target=read_while_writing)
+                                                          for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(small_kb.get_entities_by_type(Character)) == 202
+    assert len(small_kb.neighborhood("Gaal Dornick", hops=2, max_nodes=1000).entities) == 205
+    assert small_kb.semantic_search("Student 199 of psychohistory.", k=1)[0][0].name == "Student 199"
+
+
+def test_query_cache_is_invalidated_by_mutations(small_kb):
+    small_kb.query_cache.reset_stats()
+    assert small_kb.search("psychohistory") == small_kb.search("psychohistory")
+    assert small_kb.resolve_name("Hary Seldom") == small_kb.resolve_name("Hary Seldom")
+    assert small_kb.query_cache.stats()[:2] == (2, 2)
+
+    generation = small_kb.generation
+    small_kb.add_entity(Character(
+        name="Yugo Amaryl", description="Yugo Amaryl studied psychohistory.", aliases=[], abilities=[],
+        occupation=None, species=None, physical_description={}, personality_traits=[],
+    ))
+    assert small_kb.generation == generation + 1
+    assert "Yugo Amaryl" in [item.name for item, _ in small_kb.search("psychohistory")]
+    assert small_kb.query_cache.stats()[:2] == (2, 3)
+
+    small_kb.find_relationships(min_depth=7).clear()  # Cached results are copied, not shared with callers
+    assert len(small_kb.find_relationships(min_depth=7)) == 2
+
+    small_kb.query_cache.resize(0)
+    small_kb.search("psychohistory")
+    assert len(small_kb.query_cache) == 0
+
+
+def test_top_relationships_follow_graph_scores(small_kb, tmp_path):
+    hari, gaal = small_kb.get_entity_by_name("Hari Seldon"), small_kb.get_entity_by_name("Gaal Dornick")
+    ranked = small_kb.top_relationships("Hari Seldon", k=None)
+    assert len(ranked) == 4
+    assert [score for _, score in ranked] == sorted((score for _, score in ranked), reverse=True)
+    assert small_kb.top_relationships(hari, k=1) == ranked[:1]
+
+    # Gaal becomes Hari's mutual and most frequent link
+    small_kb.add_relationship(Relationship(source_entity_id=hari.id, target_entity_id=gaal.id,
+                                           relationship_type=RELATIONSHIP_TYPE_MISC, description="Hari met Gaal."))
+    top = small_kb.top_relationships("Hari Seldon", k=2)
+    assert {relationship.description for relationship, _ in top} == {
+        "Hari met Gaal.", "Gaal Dornick was recruited by Hari Seldon.",
+    }
+    assert [r.description for r, _ in small_kb.scoped_to("Gaal Dornick").top_relationships("Hari Seldon", k=3)] \
+           == [r.description for r, _ in top] + ["Hari Seldon was judged during his trial."]
+
+    small_kb.save_kb(tmp_path / "kb.json", compress=False)
+    loaded_kb = KnowledgeBase.from_json(tmp_path / "kb.json", trusted=True)
+    assert loaded_kb._graph_scores is not None  # Restored from the snapshot
+    assert np.array_equal(loaded_kb.graph_scores.pagerank, small_kb.graph_scores.pagerank)
+    assert loaded_kb.top_relationships("Hari Seldon", k=2) == top
+
+
+def test_context_packs_are_saved_in_snapshots_and_follow_mutations(small_kb, tmp_path):
+    pack = small_kb.context_pack("Hari Seldon")
+    assert pack.aliases == ("Raven Seldon",)
+    assert pack.places == ("Trantor",) and pack.events == ("Trial of Hari Seldon (12,067 GE)",)
+    assert len(pack.relationships) == 4
+    assert small_kb.context_pack("Hari Seldon") is pack
+
+    small_kb.save_kb(tmp_path / "kb.json", compress=True)
+    loaded_kb = KnowledgeBase.from_json_stream(tmp_path / "kb.json.gz", trusted=True)
+    assert set(loaded_kb._context_packs) == {character.id for character in small_kb.get_entities_by_type(Character)}
+    assert loaded_kb.context_pack("Hari Seldon") == pack
+
+    loaded_kb.add_entity(Place(name="Terminus", location_type="Planet", coordinates=None))
+    loaded_kb.add_relationship(Relationship(
+        source_entity_id=loaded_kb.get_entity_by_name("Hari Seldon").id,
+        target_entity_id=loaded_kb.get_entity_by_name("Terminus").id,
+        relationship_type=RELATIONSHIP_TYPE_MISC,
+    ))
+    assert "Terminus" in loaded_kb.context_pack("Hari Seldon").places
+    assert "Hari Seldon MISC Terminus" in loaded_kb.context_pack("Hari Seldon").relationships
+
+    view = loaded_kb.scoped_to("Gaal Dornick")
+    assert view.context_pack("Gaal Dornick").relationships == ("Gaal Dornick was recruited by Hari Seldon.",)
+    with pytest.raises(KeyError, match="Only the context pack"):
+        view.context_pack("Hari Seldon")
@@ -0,0 +1,79 @@
+import pytest
+
+from knowledge_base.models.entities import Place
+from knowledge_base.models.knowledge_base import KnowledgeBase
+from knowledge_base.models.relationships import Relationship, RELATIONSHIP_TYPE_VISITED
+from knowledge_base.utils.change_log import ChangeLog
+
+
+@pytest.fixture
+def snapshot_path(small_kb, tmp_path):
+    small_kb.save_kb(tmp_path / "kb.json", compress=True)
+    return tmp_path / "kb.json.gz"
+
+
+def _mutate(kb: KnowledgeBase) -> None:
+    hari = kb.get_entity_by_name("Hari Seldon")
+    gaal = kb.get_entity_by_name("Gaal Dornick")
+    terminus = Place(name="Terminus", description="Terminus is at the edge of the Galaxy.",
+                     location_type="Planet", coordinates=None)
+    kb.add_entity(terminus)
+    kb.update_entity(gaal.model_copy(update={"occupation": "Mathematician"}))
+    visit = Relationship(source_entity_id=gaal.id, target_entity_id=terminus.id,
+                         relationship_type=RELATIONSHIP_TYPE_VISITED, depth=7)
+    kb.add_relationship(visit)
+    kb.update_relationship(visit.model_copy(update={"description": "Gaal Dornick settled on Terminus."}))
+    radiant_link = next(
+        relationship
+        for _, _, relationship in kb.graph.out_edges(hari.id, data="relationship")
+        if relationship.description == "Hari Seldon built the Prime Radiant."
+    )
+    kb.remove_relationship(radiant_link)
+    kb.remove_entity(kb.get_entity_by_name("Trial of Hari Seldon").id)
+
+
+def _state(kb: KnowledgeBase):
+    nodes = {node: data["entity"].model_dump() for node, data in kb.graph.nodes(data=True)}
+    edges = {key: data["relationship"].model_dump() for _, _, key, data in kb.graph.edges(keys=True, data=True)}
+    return nodes, edges, kb.map_entity_name_to_id
+
+
+def test_changes_are_appended_and_replayed(snapshot_path):
+    kb = KnowledgeBase.from_json(snapshot_path)
+    change_log = ChangeLog.for_snapshot(snapshot_path)
+    kb.attach_change_log(change_log)
+    _mutate(kb)
+
+    assert change_log.path.name == "kb.changes.jsonl"
+    assert [change["op"] for change in change_log] == [
+        "add_entity", "update_entity", "add_relationship", "update_relationship",
+        "remove_relationship", "remove_entity",
+    ]
+    assert _state(KnowledgeBase.from_json(snapshot_path)) == _state(kb)
+    assert _state(KnowledgeBase.from_json_stream(snapshot_path, trusted=True)) == _state(kb)
+    assert _state(KnowledgeBase.from_json(snapshot_path, replay_changes=False)) != _state(kb)
+
+
+def test_compact_folds_changes_into_snapshot(snapshot_path):
+    kb = KnowledgeBase.from_json(snapshot_path)
+    change_log = ChangeLog.for_snapshot(snapshot_path)
+    kb.attach_change_log(change_log)
+    _mutate(kb)
+
+    KnowledgeBase.compact(snapshot_path)
+
+    assert not change_log.exists()
+    assert _state(KnowledgeBase.from_json(snapshot_path)) == _state(kb)
+    assert sorted(path.name for path in snapshot_path.parent.iterdir()) == ["kb.json.gz"]
+
+
+def test_replaying_twice_is_idempotent(snapshot_path):
+    kb = KnowledgeBase.from_json(snapshot_path)
+    change_log = ChangeLog.for_snapshot(snapshot_path)
+    kb.attach_change_log(change_log)
+    _mutate(kb)
+
+    # As if a compaction was interrupted after writing the snapshot, but before clearing the log
+    kb.change_log = None
+    kb.save_kb(snapshot_path.with_suffix(""), compress=True)
+    assert _state(KnowledgeBase.from_json(snapshot_path)) == _state(kb)
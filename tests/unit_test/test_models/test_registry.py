@@ -0,0 +1,130 @@
+import gc
+import threading
+import time
+import weakref
+
+import pytest
+
+from knowledge_base.models.frozen_knowledge_base import FrozenKnowledgeBase
+from knowledge_base.models.knowledge_base import KnowledgeBase
+from knowledge_base.registry import KnowledgeBaseRegistry
+from knowledge_base.utils.period import Calendar
+
+
+class CountingLoader:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.loaded_paths = []
+
+    def __call__(self, path):
+        time.sleep(self.delay)
+        self.loaded_paths.append(path.name)
+        return KnowledgeBase()
+
+
+def _registry(loader, **kwargs) -> KnowledgeBaseRegistry:
+    registry = KnowledgeBaseRegistry(loader=loader, memory_estimator=lambda kb: 100, **kwargs)
+    for wiki in ("asimov", "starwars", "dune"):
+        registry.register(f"https://{wiki}.fandom.com/wiki/", f"kb_{wiki}.json.gz")
+    return registry
+
+
+def test_knowledge_bases_are_loaded_on_first_use(small_kb, tmp_path):
+    small_kb.save_kb(tmp_path / "kb_asimov.json", compress=True)
+    registry = KnowledgeBaseRegistry()
+    registry.register("https://asimov.fandom.com/wiki/", tmp_path / "kb_asimov.json.gz")
+    assert registry.resident_urls == []
+
+    kb = registry.get("https://Asimov.fandom.com/wiki/Hari_Seldon")
+    assert kb.get_entity_by_name("Hari Seldon").name == "Hari Seldon"
+    assert registry.get("https://asimov.fandom.com") is kb
+    assert registry.resident_urls == ["https://asimov.fandom.com"]
+    assert "https://asimov.fandom.com/wiki/Trantor" in registry
+    with pytest.raises(KeyError, match="No knowledge base registered"):
+        registry.get("https://dune.fandom.com/wiki/")
+
+
+def test_least_recently_used_knowledge_bases_are_evicted():
+    loader = CountingLoader()
+    registry = _registry(loader, max_resident=2)
+    asimov = registry.get("https://asimov.fandom.com/")
+    registry.get("https://starwars.fandom.com/")
+    registry.get("https://asimov.fandom.com/")
+    registry.get("https://dune.fandom.com/")
+    assert registry.resident_urls == ["https://asimov.fandom.com", "https://dune.fandom.com"]
+
+    assert registry.get("https://asimov.fandom.com/") is asimov
+    registry.get("https://starwars.fandom.com/")  # Loaded again
+    assert loader.loaded_paths == ["kb_asimov.json.gz", "kb_starwars.json.gz", "kb_dune.json.gz",
+                                   "kb_starwars.json.gz"]
+
+    budget_registry = _registry(CountingLoader(), max_resident=3, memory_budget=150)
+    budget_registry.get("https://asimov.fandom.com/")
+    budget_registry.get("https://dune.fandom.com/")
+    assert budget_registry.resident_urls == ["https://dune.fandom.com"]
+    assert budget_registry.resident_memory == 100
+
+
+def test_evicted_knowledge_bases_are_released_while_views_are_kept(small_kb, tmp_path):
+    small_kb.save_kb(tmp_path / "kb_asimov.json", compress=False)
+    KnowledgeBase().save_kb(tmp_path / "kb_dune.json", compress=False)
+    registry = KnowledgeBaseRegistry(max_resident=1)
+    registry.register("https://asimov.fandom.com/wiki/", tmp_path / "kb_asimov.json")
+    registry.register("https://dune.fandom.com/wiki/", tmp_path / "kb_dune.json")
+    view = registry.scoped_to("https://asimov.fandom.com/wiki/", "Gaal Dornick")  # As kept in an agent state
+    assert view.get_entity_by_name("Hari Seldon").name == "Hari Seldon"
+    with pytest.raises(KeyError, match="unknown to the character"):
+        view.get_entity_by_name("Trantor")
+    with pytest.raises(AttributeError, match="no attribute 'graph'"):
+        view.graph
+
+    released = weakref.ref(registry.get("https://asimov.fandom.com/wiki/"))
+    registry.get("https://dune.fandom.com/")
+    gc.collect()
+    assert released() is None
+
+    assert view.get_entity_by_name("Hari Seldon").name == "Hari Seldon"  # Loaded again
+    assert registry.resident_urls == ["https://asimov.fandom.com"]
+
+
+def test_concurrent_requests_load_once_and_register_replaces():
+    loader = CountingLoader(delay=0.05)
+    registry = _registry(loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("https://dune.fandom.com/")))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loader.loaded_paths == ["kb_dune.json.gz"]
+    assert all(kb is results[0] for kb in results)
+
+    registry.register("https://dune.fandom.com/", "kb_dune_v2.json.gz")
+    assert registry.get("https://dune.fandom.com/") is not results[0]
+    assert loader.loaded_paths[-1] == "kb_dune_v2.json.gz"
+
+
+def test_registered_calendar_is_set_on_the_loaded_knowledge_base(small_kb, tmp_path):
+    small_kb.set_calendar(Calendar())  # Saved without the eras of the Foundation
+    small_kb.save_kb(tmp_path / "kb_asimov.json", compress=False)
+    foundation_calendar = Calendar(eras={"ge": (1, 0)}, default_era="ge")
+    registry = KnowledgeBaseRegistry()
+    registry.register("https://asimov.fandom.com/wiki/", tmp_path / "kb_asimov.json", calendar=foundation_calendar)
+
+    kb = registry.get("https://asimov.fandom.com/wiki/")
+    assert kb.calendar == foundation_calendar
+    assert [entity.name for entity in kb.find_entities_in_period("12,067")] == ["Trial of Hari Seldon"]
+
+
+def test_frozen_knowledge_bases_are_mapped_by_preload(small_kb, tmp_path):
+    frozen_path = FrozenKnowledgeBase.write(small_kb, tmp_path / "kb_asimov.frozen")
+    registry = KnowledgeBaseRegistry()
+    registry.register("https://asimov.fandom.com/wiki/", frozen_path)
+    registry.preload()  # Before forking workers
+    assert registry.resident_urls == ["https://asimov.fandom.com"]
+
+    kb = registry.get("https://asimov.fandom.com/wiki/Hari_Seldon")
+    assert isinstance(kb, FrozenKnowledgeBase)
+    assert registry.resident_memory == 0
+    assert kb.scoped_to("Gaal Dornick").get_entity_by_name("Hari Seldon").name == "Hari Seldon"
@@ -0,0 +1,65 @@
+from tools.compact_text import contains_kb_models, to_compact_text
+from tools.kb_query import get_character_infos, get_entities_by_names, get_neighborhood
+
+
+def test_entities_and_relationships_drop_ids_and_empty_fields(small_kb):
+    hari = small_kb.get_entity_by_name("Hari Seldon")
+    text = to_compact_text(hari)
+    assert text.splitlines() == [
+        "type: Character",
+        "name: Hari Seldon",
+        "description: Hari Seldon is the mathematician who developed psychohistory on Trantor.",
+        "aliases: Raven Seldon",
+    ]
+    relationship = small_kb.top_relationships(hari, k=None)[-1][0]
+    assert to_compact_text(relationship).splitlines() == [
+        "type: KNOWS", "description: Gaal Dornick was recruited by Hari Seldon.", "depth: 7",
+    ]
+    assert to_compact_text([]) == "" and to_compact_text(None) == "None"
+    assert to_compact_text({"score": 0.000012345}) == "score: 1.2345e-05"
+
+
+def test_only_kb_models_are_compacted(small_kb):
+    hari = small_kb.get_entity_by_name("Hari Seldon")
+    assert contains_kb_models({"found": [hari]}) and contains_kb_models(small_kb.top_relationships(hari, k=1))
+    assert not contains_kb_models({"id": 7, "score": 0.123456, "tags": []})
+
+
+def test_lists_of_records_are_tables_and_text_is_cut(small_kb):
+    records = [{"name": "Hari Seldon", "hops": 0, "note": "a | b"}, {"name": "Trantor", "hops": 1, "period": None}]
+    assert to_compact_text({"entities": records}).splitlines() == [
+        "entities:",
+        "name | hops | note",
+        "Hari Seldon | 0 | a / b",
+        "Trantor | 1 | ",
+    ]
+
+    many_records = [{"name": f"Entity {i}", "hops": i} for i in range(100)]
+    text = to_compact_text(many_records, max_length=200)
+    assert len(text) <= 200
+    assert text.splitlines()[0] == "name | hops" and text.splitlines()[-2] == "Entity 11 | 11"
+    assert text.endswith("… (1319 more characters)")
+    assert len(to_compact_text(many_records, max_length=None)) > 1000
+
+
+def test_tools_output_compact_text(small_kb):
+    infos = get_character_infos(kb=small_kb, character_name="Gaal Dornick")
+    assert "id:" not in infos and "occupation" not in infos
+
+    lookup = get_entities_by_names(kb=small_kb, entity_names=["Hari Seldon", "Trantor", "Gall Dornick"])
+    assert lookup.splitlines()[:2] == ["entities:", "type | name | description | aliases | location_type"]
+    assert lookup.splitlines()[3] == (
+        "Place | Trantor | Trantor is the capital planet of the Galactic Empire. |  | Planet"
+    )
+    assert lookup.splitlines()[-1] == "not_found: Gall Dornick: Gaal Dornick"
+
+    neighborhood = get_neighborhood(kb=small_kb, entity_name="Gaal Dornick", hops=1)
+    assert neighborhood.splitlines() == [
+        "entities:",
+        "name | type | hops",
+        "Gaal Dornick | Character | 0",
+        "Hari Seldon | Character | 1",
+        "relationships:",
+        "source | target | type | depth | description",
+        "Gaal Dornick | Hari Seldon | KNOWS | 7 | Gaal Dornick was recruited by Hari Seldon.",
+    ]
@@ -0,0 +1,98 @@
+from uuid import uuid4
+
+from knowledge_base.models.relationships import Relationship, RELATIONSHIP_TYPE_MISC
+from tools.kb_query import get_entities_by_ids, get_relationships_for, get_top_relationships, search_knowledge
+
+
+def test_top_relationships_table_covers_both_directions(small_kb):
+    table = get_top_relationships(kb=small_kb, character_name="Hari Seldon")
+    lines = table.splitlines()
+    assert lines[0] == "source | type | target | depth | description"
+    assert "Gaal Dornick | KNOWS | Hari Seldon | 7 | Gaal Dornick was recruited by Hari Seldon." in lines
+    assert "Hari Seldon | MISC | Trantor |  | Hari Seldon lived on Trantor." in lines
+    assert len(lines) == 5
+    assert str(small_kb.get_entity_by_name("Hari Seldon").id) not in table
+
+
+def test_top_relationships_table_stays_within_budget(small_kb):
+    hari, trantor = small_kb.get_entity_by_name("Hari Seldon"), small_kb.get_entity_by_name("Trantor")
+    small_kb.add_relationship(Relationship(
+        source_entity_id=trantor.id,
+        target_entity_id=hari.id,
+        relationship_type=RELATIONSHIP_TYPE_MISC,
+        description="Trantor | the capital\nof the Empire, " * 20,
+    ))
+    full_table = get_top_relationships(kb=small_kb, character_name="Hari Seldon", max_chars=10_000)
+    long_line = next(line for line in full_table.splitlines() if line.startswith("Trantor"))
+    assert long_line.endswith("…") and len(long_line.split(" | ")) == 5
+
+    table = get_top_relationships(kb=small_kb, character_name="Hari Seldon", max_chars=200)
+    assert len(table) <= 200
+    assert table.splitlines()[-1].endswith("more relationships, raise max_chars to see them)")
+    assert table.splitlines()[1] == full_table.splitlines()[1]  # Most important first
+
+
+def test_unknown_character_gets_closest_names(small_kb):
+    assert "Hari Seldon" in get_top_relationships(kb=small_kb, character_name="Hary Seldon")
+
+
+def test_search_knowledge_returns_named_snippets(small_kb):
+    assert search_knowledge(kb=small_kb, query="capital of the Empire", k=1).splitlines() == [
+        "name | type | snippet",
+        "Trantor | Place | Trantor is the capital planet of the Galactic Empire.",
+    ]
+    lines = search_knowledge(kb=small_kb, query="who built the Prime Radiant", k=2).splitlines()
+    assert lines == [
+        "name | type | snippet",
+        "Hari Seldon → Prime Radiant | MISC | Hari Seldon built the Prime Radiant.",
+        "Prime Radiant | SpecialObject | The Prime Radiant stores the equations of the Seldon Plan.",
+    ]
+    assert search_knowledge(kb=small_kb, query="spaceship") == "Nothing found for 'spaceship'."
+
+
+def test_search_knowledge_keeps_to_what_the_character_knows(small_kb):
+    def names(kb):
+        return [line.split(" | ")[0] for line in search_knowledge(kb=kb, query="Trantor").splitlines()[1:]]
+
+    assert "Trantor" in names(small_kb)
+    assert "Trantor" not in names(small_kb.scoped_to("Gaal Dornick"))
+
+
+def test_top_relationships_table_stays_within_budget_with_hundreds_of_relationships(small_kb):
+    hari, trantor = small_kb.get_entity_by_name("Hari Seldon"), small_kb.get_entity_by_name("Trantor")
+    small_kb.add_relationships([
+        Relationship(source_entity_id=hari.id, target_entity_id=trantor.id, relationship_type=RELATIONSHIP_TYPE_MISC,
+                     description=f"Hari Seldon visited Trantor for the {i}th time.")
+        for i in range(150)
+    ])
+    for max_chars in range(60, 400, 7):
+        table = get_top_relationships(kb=small_kb, character_name="Hari Seldon", max_chars=max_chars)
+        assert len(table) <= max_chars
+        assert table.endswith("more relationships, raise max_chars to see them)")
+
+    full_table = get_top_relationships(kb=small_kb, character_name="Hari Seldon", max_chars=100_000)
+    assert get_top_relationships(kb=small_kb, character_name="Hari Seldon", max_chars=len(full_table)) == full_table
+    assert get_top_relationships(kb=small_kb, character_name="Hari Seldon", max_chars=10) == (
+        "(154 more relationships, raise max_chars to see them)"
+    )
+
+
+def test_get_entities_by_ids_skips_unknown_and_hidden_ids(small_kb):
+    trantor, hari = small_kb.get_entity_by_name("Trantor"), small_kb.get_entity_by_name("Hari Seldon")
+    table = get_entities_by_ids(kb=small_kb, entity_ids=[str(trantor.id), "not an id", str(hari.id)])
+    assert [line.split(" | ")[1] for line in table.splitlines()] == ["name", "Trantor", "Hari Seldon"]
+
+    view = small_kb.scoped_to("Gaal Dornick")  # Trantor is hidden from Gaal
+    assert "Trantor |" not in get_entities_by_ids(kb=view, entity_ids=[str(trantor.id), str(hari.id)])
+
+
+def test_relationships_to_missing_entities_get_a_placeholder_name(small_kb):
+    hari = small_kb.get_entity_by_name("Hari Seldon")
+    small_kb.add_relationship(Relationship(  # To an entity missing from the knowledge base
+        source_entity_id=hari.id, target_entity_id=uuid4(), relationship_type=RELATIONSHIP_TYPE_MISC,
+        description="Hari Seldon wrote to a lost friend.",
+    ))
+    table = get_relationships_for(kb=small_kb, entity_names=["Hari Seldon"])
+    assert "Hari Seldon | (unknown) | MISC |  | Hari Seldon wrote to a lost friend." in table.splitlines()
+    assert "None" not in table
+    assert "Hari Seldon | MISC | (unknown) |" in get_top_relationships(kb=small_kb, character_name="Hari Seldon")
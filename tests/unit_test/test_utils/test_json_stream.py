@@ -0,0 +1,62 @@
+import io
+import json
+
+import pytest
+
+from knowledge_base.utils.json_stream import iter_json_stream
+
+DOCUMENT = {
+    "graph_data": {
+        "directed": True,
+        "graph": {"name": "test"},
+        "nodes": [{"id": i, "value": 1.5e-3 * i, "text": "x" * i} for i in range(20)],
+        "links": [],
+    },
+    "map_entity_name_to_id": {"a": 12345678901234567890, "b": -0.25},
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_iter_json_stream_matches_json_load(chunk_size, indent):
+    stream = io.StringIO(json.dumps(DOCUMENT, indent=indent))
+    events = list(iter_json_stream(
+        stream,
+        array_paths={("graph_data", "nodes"), ("graph_data", "links")},
+        chunk_size=chunk_size,
+    ))
+
+    assert [value for path, value in events if path == ("graph_data", "nodes")] == DOCUMENT["graph_data"]["nodes"]
+    assert (("graph_data", "directed"), True) in events
+    assert (("graph_data", "graph"), {"name": "test"}) in events
+    assert (("map_entity_name_to_id",), DOCUMENT["map_entity_name_to_id"]) in events
+    assert not any(path == ("graph_data", "links") for path, _ in events)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_iter_json_stream_streams_objects_entry_by_entry(chunk_size):
+    stream = io.StringIO(json.dumps(DOCUMENT, indent=4))
+    events = list(iter_json_stream(
+        stream,
+        array_paths={("graph_data", "nodes")},
+        chunk_size=chunk_size,
+        object_paths={("map_entity_name_to_id",), ("graph_data", "graph")},
+    ))
+
+    assert (("graph_data", "graph", "name"), "test") in events
+    assert [(path, value) for path, value in events if path[0] == "map_entity_name_to_id"] == [
+        (("map_entity_name_to_id", key), value) for key, value in DOCUMENT["map_entity_name_to_id"].items()
+    ]
+    assert len([path for path, _ in events if path == ("graph_data", "nodes")]) == 20
+
+
+def test_iter_json_stream_rejects_truncated_document():
+    stream = io.StringIO(json.dumps(DOCUMENT)[:-10])
+    with pytest.raises((ValueError, EOFError)):
+        list(iter_json_stream(stream, array_paths={("graph_data", "nodes")}, chunk_size=16))
+
+
+def test_iter_json_stream_rejects_invalid_value():
+    stream = io.StringIO('{"graph_data": {"nodes": [1, nope]}}')
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_stream(stream, array_paths={("graph_data", "nodes")}, chunk_size=4))
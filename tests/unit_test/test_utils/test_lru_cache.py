@@ -0,0 +1,31 @@
+from knowledge_base.utils.lru_cache import LRUCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c"), len(cache)) == (1, 3, 2)
+    cache.clear()
+    assert cache.get("a", "missing") == "missing"
+
+
+def test_stats_count_hits_and_misses():
+    cache = LRUCache(max_size=3)
+    for key in "abc":
+        cache.put(key, key.upper())
+    cache.get("a")
+    cache.get("a")
+    cache.get("z")
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size, stats.max_size) == (2, 1, 3, 3)
+    assert stats.hit_rate == 2 / 3
+
+    cache.resize(1)
+    assert (len(cache), cache.get("a"), cache.get("b")) == (1, "A", None)
+    cache.reset_stats()
+    assert cache.stats().hit_rate == 0.0
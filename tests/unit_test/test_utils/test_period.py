@@ -0,0 +1,34 @@
+import pytest
+
+from knowledge_base.utils.period import Calendar, COMMON_ERAS, parse_period
+
+FOUNDATION_CALENDAR = Calendar(eras={**COMMON_ERAS, "ge": (1, 0), "fe": (1, 12_067)}, default_era="ge")
+
+
+@pytest.mark.parametrize("time_or_period, expected", [
+    ("12,067 GE", (12067, 12067)),
+    ("c. 11,988-12,069 G.E.", (11988, 12069)),
+    ("12,067 GE – 12,069", (12067, 12069)),
+    ("FE 498", (12565, 12565)),
+    ("1 to 50 FE", (12068, 12117)),
+    ("12,067", (12067, 12067)),
+    ("500 BC to AD 30", (-500, 30)),
+    ("21st century", (2000, 2099)),
+    ("during his 3rd year", None),
+    ("unknown", None),
+    (None, None),
+])
+def test_parse_period(time_or_period, expected):
+    assert parse_period(time_or_period, FOUNDATION_CALENDAR) == expected
+
+
+@pytest.mark.parametrize("time_or_period, expected", [
+    ("1990", (1990, 1990)),
+    ("c. 1990-1995", (1990, 1995)),
+    ("44 BC", (-44, -44)),
+    ("FE 498", None),  # Era unknown to the calendar, the number is not read as a year
+    ("3 moons", None),
+    ("chapter 12", None),
+])
+def test_parse_period_with_default_calendar(time_or_period, expected):
+    assert parse_period(time_or_period) == expected
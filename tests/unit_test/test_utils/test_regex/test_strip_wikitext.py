@@ -0,0 +1,21 @@
+from knowledge_base.utils.regex import split_sentences, strip_wikitext
+
+
+def test_strip_wikitext():
+    wikitext = """{{Infobox|name={{PAGENAME}}|image=[[File:Hari.png|thumb]]}}
+'''Hari Seldon''' was a ''[[Mathematics|mathematician]]''<ref name="p">Prelude</ref> on [[Trantor]].<!-- hidden -->
+== Biography ==
+* He founded the [https://example.com Foundation].
+{| class="wikitable"
+| cell
+|}
+[[Category:Characters]] [[File:Seldon.jpg|thumb|A [[Trantor]] portrait]]"""
+    assert strip_wikitext(wikitext) == "Hari Seldon was a mathematician on Trantor. He founded the Foundation."
+    assert strip_wikitext("") == ""
+
+
+def test_split_sentences():
+    assert split_sentences("Hari Seldon lived on Trantor. Did he? He did!  The 12,067 GE trial.") == [
+        "Hari Seldon lived on Trantor.", "Did he?", "He did!", "The 12,067 GE trial.",
+    ]
+    assert split_sentences("") == []
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from knowledge_base.utils.rw_lock import ReadWriteLock
+
+
+def test_readers_share_the_lock_and_writers_exclude_them():
+    lock = ReadWriteLock()
+    readers_inside = threading.Barrier(3, timeout=5)
+
+    def read():
+        with lock.read():
+            readers_inside.wait()  # Only passes if the 3 readers hold the lock at once
+
+    threads = [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    events = []
+
+    def read_event():
+        with lock.read():
+            events.append("read")
+
+    with lock.write():
+        reader = threading.Thread(target=read_event)
+        reader.start()
+        time.sleep(0.05)
+        events.append("written")
+    reader.join()
+    assert events == ["written", "read"]
+
+
+def test_waiting_writer_goes_before_new_readers():
+    lock = ReadWriteLock()
+    events = []
+    lock.acquire_read()
+
+    def write():
+        with lock.write():
+            events.append("written")
+
+    def read():
+        with lock.read():
+            events.append("read")
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    time.sleep(0.05)  # The writer waits for the first reader
+    reader = threading.Thread(target=read)
+    reader.start()
+    time.sleep(0.05)
+    assert events == []
+    lock.release_read()
+    writer.join()
+    reader.join()
+    assert events == ["written", "read"]
+
+
+def test_lock_is_reentrant():
+    lock = ReadWriteLock()
+    with lock.write():
+        with lock.read(), lock.write():
+            pass
+    with lock.read():
+        with lock.read():
+            pass
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+    with lock.write():  # Nothing is left held
+        pass
+
+
+def test_write_lock_released_before_read_lock():
+    lock = ReadWriteLock()
+    lock.acquire_write()
+    lock.acquire_read()
+    lock.release_write()  # Still reading: other writers wait
+    written = threading.Event()
+
+    def write():
+        with lock.write():
+            written.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    assert not written.wait(0.05)
+    lock.release_read()
+    writer.join()
+    assert lock._readers == 0
+    with lock.read():
+        assert lock._readers == 1